@@ -37,7 +37,13 @@ from collections import defaultdict
 from . import config
 from .utils.logger_utils import setup_logger
 from .database_schema.strategy_trigger_db import StrategyTriggerDB
+from .database_schema.backtest_db_writer import BacktestDBWriter
 from .utils.strategies import BaseStrategy, Position, get_strategy, list_strategies
+from .utils.data_loader.market_panel import MarketPanel, PANEL_FIELDS
+from .utils.data_loader.panel_loader import load_daily_panel
+from .utils.data_loader.indicator_cache import configure_indicator_cache, get_indicator_cache
+from .utils.data_loader.market_mirror import get_market_mirror
+from .utils.backtest_engine.position_book import PositionBook
 import time
 import os
 import json
@@ -54,6 +60,7 @@ BACKTEST_CONFIG = {
     'position_size_pct': 0.01,        # 单只股票仓位比例（%）
     'min_hold_days': 1,               # 最小持仓天数（T+1限制）
     'lookback_days': 365,             # 历史数据回溯天数
+    'indicator_cache_dir': None,      # 指标缓存持久化目录（None 表示只在内存中缓存）
     
     # ========== 回避时间段配置 ==========
     'enable_blackout': False,         # 是否启用回避功能（默认关闭）
@@ -106,15 +113,19 @@ class TimeBasedBacktester:
     支持策略模块化，可以通过 strategy 参数注入不同的策略
     """
     
-    def __init__(self, config_dict=None, strategy=None):
+    def __init__(self, config_dict=None, strategy=None, db_engine=None):
         """
         初始化回测引擎
         
         Args:
             config_dict: 回测配置字典
             strategy: 策略对象（继承自 BaseStrategy），如果为 None 则使用默认价值策略
+            db_engine: 读取行情使用的 SQLAlchemy 引擎，默认使用配置文件中的 MySQL（基准测试等场景可注入其他数据库）；
+                       注入引擎时不读取本地行情镜像，行情只来自该引擎
         """
         self.config = config_dict or BACKTEST_CONFIG.copy()
+        self.engine = db_engine if db_engine is not None else engine
+        self.use_mirror = db_engine is None
         
         # 初始化策略
         if strategy is None:
@@ -131,11 +142,13 @@ class TimeBasedBacktester:
             raise TypeError(f"strategy 参数类型错误，期望 str 或 BaseStrategy，实际为 {type(strategy)}")
         
         self.cash = self.config['initial_cash']
-        self.positions = {}  # {stock_code: Position}
+        self.positions = PositionBook()  # {stock_code: Position}，附带按槽位数组化的持仓数量/成本
         self.trading_records = []  # 交易记录
         self.daily_values = []  # 每日资产记录
         self.trigger_points = []  # 触发点位记录
-        self.all_stock_data = {}  # 预加载的所有股票数据 {stock_code: DataFrame}
+        self.panel = None  # 预加载的全市场日线面板（MarketPanel）
+        self.trading_dates = None  # 交易日历 [Timestamp, ...]
+        self.stock_codes = None  # 股票列表 [(market, code_int, name), ...]
         self.stock_info_map = {}  # 股票信息映射 {stock_code: (market, name)}
         
         # 统计数据
@@ -143,6 +156,7 @@ class TimeBasedBacktester:
         self.total_sell_commission = 0
         self.profit_trade_count = 0
         self.loss_trade_count = 0
+        self.phase_times = defaultdict(float)  # 各阶段累计耗时（秒）
         
     def get_trade_calendar(self, start_date, end_date):
         """获取交易日历"""
@@ -154,7 +168,7 @@ class TimeBasedBacktester:
           AND calendar_date <= '{end_date}'
         ORDER BY calendar_date
         """
-        df = pd.read_sql(query, engine)
+        df = pd.read_sql(query, self.engine)
         df['calendar_date'] = pd.to_datetime(df['calendar_date'])
         return df['calendar_date'].tolist()
     
@@ -167,12 +181,12 @@ class TimeBasedBacktester:
            OR (market = 'sz' AND code_int > 0 AND code_int < 310000)
         ORDER BY code_int
         """
-        df = pd.read_sql(query, engine)
+        df = pd.read_sql(query, self.engine)
         return df
     
     def preload_all_stock_data(self, stock_codes, start_date, end_date, lookback_days=365):
         """
-        预加载所有股票的完整历史数据到内存
+        预加载所有股票的完整历史数据到内存（列式面板）
         
         Args:
             stock_codes: 股票代码列表 [(market, code_int, name), ...]
@@ -181,10 +195,10 @@ class TimeBasedBacktester:
             lookback_days: 历史数据回溯天数
             
         Returns:
-            dict: {stock_code: DataFrame}
+            MarketPanel: 全市场日线面板，无数据时返回 None
         """
         if not stock_codes:
-            return {}
+            return None
         
         # 计算数据起始日期（向前推lookback_days天）
         data_start_date = (pd.to_datetime(start_date) - timedelta(days=lookback_days)).strftime('%Y-%m-%d')
@@ -193,56 +207,42 @@ class TimeBasedBacktester:
         logger.info(f"  数据时间范围: {data_start_date} 至 {end_date}")
         logger.info(f"  股票数量: {len(stock_codes)}")
         
-        # 构建股票代码条件
-        conditions = []
+        # 保存股票信息映射
         for market, code_int, name in stock_codes:
-            conditions.append(f"(market = '{market}' AND code_int = {code_int})")
-            # 保存股票信息映射
             self.stock_info_map[str(code_int)] = (market, name)
         
-        where_clause = " OR ".join(conditions)
-        
-        query = f"""
-        SELECT market, code_int, date, open, high, low, close, volume, amount, 
-               pctChg, peTTM, psTTM, pcfNcfTTM, pbMRQ
-        FROM stock_daily_data
-        WHERE ({where_clause})
-          AND frequency = 'd'
-          AND date >= '{data_start_date}'
-          AND date <= '{end_date}'
-        ORDER BY code_int, date
-        """
-        
-        df = pd.read_sql(query, engine)
+        # 优先读取本地 Parquet 镜像（已启用、覆盖回测区间且未注入数据库引擎时）
+        mirror = get_market_mirror() if self.use_mirror else None
+        if mirror is not None and mirror.covers(data_start_date, end_date):
+            logger.info(f"  数据来源: 本地行情镜像 {mirror.root}")
+            df = mirror.read_daily(
+                data_start_date, end_date,
+                codes=[(market, code_int) for market, code_int, _ in stock_codes],
+                columns=['market', 'code_int', 'date'] + list(PANEL_FIELDS)
+            )
+            # 构建列式面板（按股票连续存储，历史数据按整数偏移切片）
+            self.panel = MarketPanel.from_frame(df) if not df.empty else None
+            del df
+        else:
+            # 按市场分组的 IN 列表 + 按年分区的流式范围扫描，直接写入 NumPy 缓冲区
+            self.panel = load_daily_panel(self.engine, stock_codes, data_start_date, end_date)
         
-        if df.empty:
+        if self.panel is None:
             logger.warning("未查询到任何股票数据")
-            return {}
-        
-        df['date'] = pd.to_datetime(df['date'])
-        
-        # 按股票分组
-        result = {}
-        for (market, code_int), group in df.groupby(['market', 'code_int']):
-            stock_code = str(code_int)
-            group = group.sort_values('date')
-            group.set_index('date', inplace=True)
-            result[stock_code] = group
-        
-        self.all_stock_data = result
+            return None
         
         # 统计信息
-        total_rows = len(df)
-        total_stocks = len(result)
+        total_rows = self.panel.total_rows
+        total_stocks = len(self.panel)
         avg_rows_per_stock = total_rows / total_stocks if total_stocks > 0 else 0
         
         logger.info(f"数据预加载完成:")
         logger.info(f"  总数据行数: {total_rows:,}")
         logger.info(f"  股票数量: {total_stocks}")
         logger.info(f"  平均每只股票数据行数: {avg_rows_per_stock:.0f}")
-        logger.info(f"  内存估算: ~{total_rows * 0.001:.1f} MB")
+        logger.info(f"  内存占用: ~{self.panel.nbytes / 1024 / 1024:.1f} MB")
         
-        return result
+        return self.panel
     
     def get_stock_data_up_to_date(self, stock_code, current_date):
         """
@@ -253,16 +253,12 @@ class TimeBasedBacktester:
             current_date: 当前日期
             
         Returns:
-            DataFrame: 截止到当前日期的历史数据
+            DataFrame: 截止到当前日期的历史数据（面板视图，请勿原地修改）
         """
-        if stock_code not in self.all_stock_data:
+        if self.panel is None:
             return None
         
-        stock_data = self.all_stock_data[stock_code]
-        current_date_dt = pd.to_datetime(current_date)
-        
-        # 筛选截止到当前日期的数据
-        return stock_data[stock_data.index <= current_date_dt]
+        return self.panel.history(stock_code, self.panel.date_pos(current_date))
     
     def get_stock_data_on_date(self, stock_code, current_date):
         """
@@ -275,16 +271,73 @@ class TimeBasedBacktester:
         Returns:
             Series: 当日数据
         """
-        if stock_code not in self.all_stock_data:
+        if self.panel is None:
             return None
         
-        stock_data = self.all_stock_data[stock_code]
-        current_date_dt = pd.to_datetime(current_date)
+        date_pos = self.panel.date_pos(current_date)
+        if not self.panel.is_exact_date(date_pos, current_date):
+            return None
         
-        if current_date_dt not in stock_data.index:
+        row = self.panel.row_on(stock_code, date_pos)
+        if row < 0:
             return None
         
-        return stock_data.loc[current_date_dt]
+        return pd.Series(self.panel.values[row], index=list(self.panel.fields),
+                         name=pd.Timestamp(self.panel.dates[date_pos]))
+    
+    def load_market_data(self):
+        """
+        加载交易日历、股票列表并预加载全部行情到内存
+        
+        加载结果保存在 trading_dates / stock_codes / panel 中，
+        同一份数据可以通过 use_preloaded_data 注入到其他回测实例复用
+        
+        Returns:
+            bool: 是否加载成功
+        """
+        trading_dates = self.get_trade_calendar(
+            self.config['start_date'],
+            self.config['end_date']
+        )
+        if not trading_dates:
+            logger.error("无法获取交易日历")
+            return False
+        
+        stock_list_df = self.get_stock_list()
+        stock_codes = list(zip(stock_list_df['market'], stock_list_df['code_int'], stock_list_df['name']))
+        
+        # ========== 核心优化：预加载所有数据到内存 ==========
+        preload_start = time.time()
+        self.preload_all_stock_data(
+            stock_codes,
+            self.config['start_date'],
+            self.config['end_date'],
+            self.config['lookback_days']
+        )
+        preload_time = time.time() - preload_start
+        self.phase_times['preload'] += preload_time
+        if self.panel is None:
+            logger.error("预加载股票数据失败，回测终止")
+            return False
+        logger.info(f"数据预加载耗时: {preload_time:.2f} 秒")
+        
+        self.trading_dates = trading_dates
+        self.stock_codes = stock_codes
+        return True
+    
+    def use_preloaded_data(self, panel, trading_dates, stock_codes):
+        """
+        注入已加载的行情数据（参数扫描等场景下多个回测共用一次预加载）
+        
+        Args:
+            panel: 全市场日线面板（MarketPanel）
+            trading_dates: 交易日历 [Timestamp, ...]
+            stock_codes: 股票列表 [(market, code_int, name), ...]
+        """
+        self.panel = panel
+        self.trading_dates = list(trading_dates)
+        self.stock_codes = list(stock_codes)
+        self.stock_info_map = {str(code_int): (market, name) for market, code_int, name in self.stock_codes}
     
     def execute_buy(self, stock_code, market, name, price, volume, current_date, signal_info=None):
         """执行买入"""
@@ -347,10 +400,8 @@ class TimeBasedBacktester:
         }
         self.trigger_points.append(trigger_point)
         
-        # 计算当前总资产和盈亏比例
-        total_value = self.cash
-        for pos_code, pos in self.positions.items():
-            total_value += pos.get_current_value(price if pos_code == stock_code else pos.buy_price)
+        # 计算当前总资产和盈亏比例（持仓按买入价估算）
+        total_value = self.cash + self.positions.book_value()
         profit_rate = (total_value / self.config['initial_cash'] - 1) * 100
         
         logger.info(f"[买入] {current_date} | {stock_code:0>6} {name} | "
@@ -422,11 +473,8 @@ class TimeBasedBacktester:
         }
         self.trigger_points.append(trigger_point)
         
-        # 计算当前总资产和盈亏比例（卖出后）
-        total_value = self.cash
-        for pos_code, pos in self.positions.items():
-            if pos_code != stock_code:  # 排除已卖出的股票
-                total_value += pos.get_current_value(pos.buy_price)
+        # 计算当前总资产和盈亏比例（卖出后，排除已卖出的股票）
+        total_value = self.cash + self.positions.book_value() - position.get_current_value(position.buy_price)
         total_profit_rate = (total_value / self.config['initial_cash'] - 1) * 100
         
         logger.info(f"[卖出] {current_date} | {stock_code:0>6} {position.name} | "
@@ -474,6 +522,7 @@ class TimeBasedBacktester:
         
         # 更新持仓信息
         position.update_avg_cost(add_price, add_volume)
+        self.positions.refresh(stock_code)
         
         # 记录交易
         trade_record = {
@@ -505,9 +554,8 @@ class TimeBasedBacktester:
         self.trigger_points.append(trigger_point)
         
         # 计算当前总资产和盈亏比例
-        total_value = self.cash
-        for pos_code, pos in self.positions.items():
-            total_value += pos.get_current_value(add_price if pos_code == stock_code else pos.buy_price)
+        total_value = (self.cash + self.positions.book_value()
+                       - position.get_current_value(position.buy_price) + position.get_current_value(add_price))
         profit_rate = (total_value / self.config['initial_cash'] - 1) * 100
         
         logger.info(f"[补仓] {current_date} | {stock_code:0>6} {position.name} | "
@@ -518,21 +566,58 @@ class TimeBasedBacktester:
         return True
     
     def calculate_portfolio_value(self, current_date):
-        """计算总资产（使用预加载数据）"""
-        total_value = self.cash
-        current_date_dt = pd.to_datetime(current_date)
+        """计算总资产（持仓按当日收盘价向量化估值）"""
+        date_pos = self.panel.date_pos(current_date) if self.panel is not None else -1
+        if self.panel is not None and not self.panel.is_exact_date(date_pos, current_date):
+            date_pos = -1
+        if date_pos != self.positions.date_pos:
+            self.positions.set_date(date_pos)
+        
+        return self.cash + self.positions.market_value()
+    
+    def _scan_buy_signals_bulk(self, date_pos, max_count):
+        """
+        使用策略的 check_buy_signals_bulk 计算全市场买入信号
         
-        for stock_code, position in self.positions.items():
-            if stock_code in self.all_stock_data:
-                stock_data = self.all_stock_data[stock_code]
-                if current_date_dt in stock_data.index:
-                    current_price = stock_data.loc[current_date_dt, 'close']
-                    total_value += position.get_current_value(current_price)
-            else:
-                # 使用买入价格估算
-                total_value += position.get_current_value(position.buy_price)
+        Args:
+            date_pos: 当前交易日在面板中的日期下标
+            max_count: 最多返回的信号数量
+            
+        Returns:
+            list: 按信号强度降序排列的买入信号（格式与逐股扫描一致），
+                  策略不支持向量化时返回 None
+        """
+        bulk_result = self.strategy.check_buy_signals_bulk(self.panel, date_pos)
+        if bulk_result is None:
+            return None
+        
+        signal_mask, signal_strength, signal_info = bulk_result
+        signal_mask = np.array(signal_mask, dtype=bool)
+        signal_strength = np.asarray(signal_strength, dtype=np.float64)
+        
+        # 跳过已持仓股票
+        for stock_code in self.positions:
+            stock_idx = self.panel.code_index.get(stock_code)
+            if stock_idx is not None:
+                signal_mask[stock_idx] = False
+        
+        # 稳定排序，与逐股扫描 list.sort(reverse=True) 的同强度先后顺序一致
+        candidates = np.nonzero(signal_mask)[0]
+        order = candidates[np.argsort(-signal_strength[candidates], kind='stable')]
+        
+        buy_signals = []
+        for stock_idx in order[:max_count]:
+            stock_code = self.panel.codes[stock_idx]
+            market, name = self.stock_info_map.get(stock_code, (self.panel.markets[stock_idx], ''))
+            buy_signals.append({
+                'stock_code': stock_code,
+                'market': market,
+                'name': name,
+                'signal_strength': float(signal_strength[stock_idx]),
+                'signal_info': self.strategy.build_bulk_signal_info(signal_info, stock_idx)
+            })
         
-        return total_value
+        return buy_signals
     
     def _check_blackout_force_sell(self, current_date: str, trading_dates: list):
         """
@@ -598,18 +683,20 @@ class TimeBasedBacktester:
         
         return False, ''
     
-    def run_backtest(self, strategy_name='TimeBasedStrategy', save_to_db=False):
+    def run_backtest(self, strategy_name='TimeBasedStrategy', save_to_db=False, save_csv=True):
         """
         执行回测
         
         Args:
             strategy_name: 策略名称
             save_to_db: 是否保存结果到数据库
+            save_csv: 是否保存交易记录和每日资产CSV
         """
         start_time = time.time()
         
-        # 初始化策略数据库
+        # 初始化策略数据库（每日记录和触发点位由后台线程批量写入，回测循环不等待数据库）
         strategy_db = None
+        db_writer = None
         if save_to_db:
             strategy_db = StrategyTriggerDB()
             # 删除旧的每日记录
@@ -620,17 +707,24 @@ class TimeBasedBacktester:
             )
             if deleted_count > 0:
                 logger.info(f"已删除旧的每日记录: {deleted_count} 条")
-        
-        # 获取交易日历
-        trading_dates = self.get_trade_calendar(
-            self.config['start_date'],
-            self.config['end_date']
-        )
-        
-        if not trading_dates:
-            logger.error("无法获取交易日历")
+            db_writer = BacktestDBWriter(strategy_db)
+        
+        # 回测中途出错时也要写出已缓冲的记录并停止后台写入线程
+        try:
+            return self._run_backtest(strategy_name, save_to_db, save_csv, strategy_db, db_writer, start_time)
+        finally:
+            if db_writer:
+                db_writer.close()
+    
+    def _run_backtest(self, strategy_name, save_to_db, save_csv, strategy_db, db_writer, start_time):
+        """run_backtest 的主体：加载行情、按日期遍历并保存结果（db_writer 由调用方关闭）"""
+        # 加载交易日历、股票列表和行情（已通过 use_preloaded_data 注入时直接复用）
+        if self.panel is None and not self.load_market_data():
             return None
         
+        trading_dates = self.trading_dates
+        stock_codes = self.stock_codes
+        
         logger.info(f"{'='*60}")
         logger.info(f"开始按时间遍历回测")
         logger.info(f"策略: {strategy_name}")
@@ -651,29 +745,27 @@ class TimeBasedBacktester:
         
         logger.info(f"{'='*60}")
         
-        # 获取股票列表
-        stock_list_df = self.get_stock_list()
-        stock_codes = [(row['market'], row['code_int'], row['name']) 
-                       for _, row in stock_list_df.iterrows()]
-        
         logger.info(f"股票总数: {len(stock_codes)}")
         
-        # ========== 核心优化：预加载所有数据到内存 ==========
-        preload_start = time.time()
-        self.preload_all_stock_data(
-            stock_codes,
-            self.config['start_date'],
-            self.config['end_date'],
-            self.config['lookback_days']
-        )
-        preload_time = time.time() - preload_start
-        logger.info(f"数据预加载耗时: {preload_time:.2f} 秒")
+        # 向量化策略在整个日期范围上预计算指标（指标缓存在同一进程的多次回测间共享）
+        if self.config.get('indicator_cache_dir'):
+            configure_indicator_cache(cache_dir=self.config['indicator_cache_dir'])
+        indicator_start = time.time()
+        self.strategy.prepare_bulk_signals(self.panel)
+        self.positions.bind_panel(self.panel)
+        self.phase_times['indicator_prepare'] += time.time() - indicator_start
+        logger.info(f"指标预计算耗时: {time.time() - indicator_start:.2f} 秒 | 缓存: {get_indicator_cache().stats()}")
         logger.info(f"{'='*60}")
         
         # 按日期遍历
         for i, trade_date in enumerate(trading_dates):
             current_date = trade_date.strftime('%Y-%m-%d')
-            current_date_dt = pd.to_datetime(current_date)
+            
+            # 当日在面板中的日期下标：history 使用 date_pos（截止当日），
+            # 当日行情使用 today_pos（当天无任何行情时为 -1）
+            date_pos = self.panel.date_pos(current_date)
+            today_pos = date_pos if self.panel.is_exact_date(date_pos, current_date) else -1
+            self.positions.set_date(today_pos)
             
             # 进度显示
             if (i + 1) % 50 == 0 or i == 0:
@@ -684,17 +776,19 @@ class TimeBasedBacktester:
             daily_sell_count = 0
             daily_add_count = 0
             
+            phase_start = time.perf_counter()
+            
             # ========== 检查是否需要强制卖出（回避时间段开始）==========
             force_sell, force_sell_reason = self._check_blackout_force_sell(current_date, trading_dates)
             if force_sell:
                 # 强制卖出所有持仓
                 for stock_code, position in list(self.positions.items()):
-                    stock_data = self.get_stock_data_up_to_date(stock_code, current_date)
-                    if stock_data is not None and len(stock_data) > 0:
-                        today_data = stock_data.loc[current_date_dt]
-                        sell_price = today_data['open']  # 以开盘价卖出
-                        self.execute_sell(stock_code, sell_price, position.volume, current_date, force_sell_reason)
-                        daily_sell_count += 1
+                    sell_price = self.positions.price_of(stock_code, 'open')  # 以开盘价卖出
+                    if sell_price is None:
+                        logger.warning(f"[回避时间段] {current_date}: {stock_code:0>6} 当日无行情，无法强制卖出")
+                        continue
+                    self.execute_sell(stock_code, sell_price, position.volume, current_date, force_sell_reason)
+                    daily_sell_count += 1
                 logger.warning(f"[回避时间段] {current_date}: {force_sell_reason}, 已清仓 {daily_sell_count} 只股票")
             
             # 1. 先处理卖出信号（检查当前持仓）
@@ -709,7 +803,7 @@ class TimeBasedBacktester:
                     continue
                 
                 # 从预加载数据获取历史数据
-                stock_data = self.get_stock_data_up_to_date(stock_code, current_date)
+                stock_data = self.panel.history(stock_code, date_pos)
                 if stock_data is not None and len(stock_data) > 0:
                     # 先检查补仓信号（如果策略支持）
                     if hasattr(self.strategy, 'check_add_position_signal'):
@@ -737,44 +831,53 @@ class TimeBasedBacktester:
                 self.execute_sell(stock_code, price, volume, current_date, reason)
                 daily_sell_count += 1
             
+            phase_end = time.perf_counter()
+            self.phase_times['sell_scan'] += phase_end - phase_start
+            phase_start = phase_end
+            
             # 2. 处理买入信号（如果还有持仓空间）
             # ========== 检查是否在禁止买入时间段 ==========
             in_blackout, blackout_reason = self._is_in_blackout_period(current_date)
             if in_blackout:
                 logger.debug(f"{current_date}: {blackout_reason}")
             elif len(self.positions) < self.config['max_positions']:
-                buy_signals = []
-                
-                for market, code_int, name in stock_codes:
-                    stock_code = str(code_int)
-                    
-                    # 跳过已持仓股票
-                    if stock_code in self.positions:
-                        continue
-                    
-                    # 从预加载数据获取历史数据
-                    stock_data = self.get_stock_data_up_to_date(stock_code, current_date)
-                    if stock_data is not None and len(stock_data) > 0:
-                        should_buy, signal_strength, signal_info = self.strategy.check_buy_signal(
-                            stock_code, market, stock_data, current_date
-                        )
-                        if should_buy:
-                            buy_signals.append({
-                                'stock_code': stock_code,
-                                'market': market,
-                                'name': name,
-                                'signal_strength': signal_strength,
-                                'signal_info': signal_info
-                            })
-                
-                # 按信号强度排序，选择最强的信号
-                buy_signals.sort(key=lambda x: x['signal_strength'], reverse=True)
-                
                 # 计算可买入数量（考虑持仓上限和每日开仓上限）
                 available_slots = self.config['max_positions'] - len(self.positions)
                 max_daily_buys = self.config.get('max_daily_buys', 10)
                 max_buys_today = min(available_slots, max_daily_buys)
                 
+                # 优先使用策略的横截面向量化信号，不支持时逐股检查
+                buy_signals = None
+                if today_pos >= 0:
+                    buy_signals = self._scan_buy_signals_bulk(today_pos, max_buys_today)
+                
+                if buy_signals is None:
+                    buy_signals = []
+                    for market, code_int, name in stock_codes:
+                        stock_code = str(code_int)
+                        
+                        # 跳过已持仓股票
+                        if stock_code in self.positions:
+                            continue
+                        
+                        # 从预加载数据获取历史数据
+                        stock_data = self.panel.history(stock_code, date_pos)
+                        if stock_data is not None and len(stock_data) > 0:
+                            should_buy, signal_strength, signal_info = self.strategy.check_buy_signal(
+                                stock_code, market, stock_data, current_date
+                            )
+                            if should_buy:
+                                buy_signals.append({
+                                    'stock_code': stock_code,
+                                    'market': market,
+                                    'name': name,
+                                    'signal_strength': signal_strength,
+                                    'signal_info': signal_info
+                                })
+                    
+                    # 按信号强度排序，选择最强的信号
+                    buy_signals.sort(key=lambda x: x['signal_strength'], reverse=True)
+                
                 for signal in buy_signals[:max_buys_today]:
                     stock_code = signal['stock_code']
                     signal_info = signal['signal_info']
@@ -813,6 +916,10 @@ class TimeBasedBacktester:
                             # 更新剩余可用仓位
                             available_slots -= 1
             
+            phase_end = time.perf_counter()
+            self.phase_times['buy_scan'] += phase_end - phase_start
+            phase_start = phase_end
+            
             # 3. 记录每日资产
             portfolio_value = self.calculate_portfolio_value(current_date)
             self.daily_values.append({
@@ -823,30 +930,15 @@ class TimeBasedBacktester:
             })
             
             # 打印每个交易日的摘要日志
-            total_value = self.cash
-            for pos_code, pos in self.positions.items():
-                if pos_code in self.all_stock_data:
-                    stock_data = self.all_stock_data[pos_code]
-                    if current_date_dt in stock_data.index:
-                        current_price = stock_data.loc[current_date_dt, 'close']
-                        total_value += pos.get_current_value(current_price)
-                else:
-                    total_value += pos.get_current_value(pos.buy_price)
-            
+            total_value = portfolio_value
             profit_rate = (total_value / self.config['initial_cash'] - 1) * 100
             
-            # 构建持仓信息
+            # 构建持仓信息（各持仓当日盈亏比例一次向量化计算）
+            position_profit_rates = self.positions.profit_rates()
             position_info = ""
             if self.positions:
-                position_list = []
-                for pos_code, pos in self.positions.items():
-                    pos_profit_rate = 0
-                    if pos_code in self.all_stock_data:
-                        stock_data = self.all_stock_data[pos_code]
-                        if current_date_dt in stock_data.index:
-                            current_price = stock_data.loc[current_date_dt, 'close']
-                            pos_profit_rate = pos.get_profit_rate(current_price) * 100
-                    position_list.append(f"{pos_code:0>6}({pos_profit_rate:+.2f}%)")
+                position_list = [f"{pos_code:0>6}({rate * 100:+.2f}%)"
+                                 for pos_code, rate in position_profit_rates.items()]
                 position_info = " | 持仓: " + ", ".join(position_list)
             
             # 打印当日摘要
@@ -860,54 +952,51 @@ class TimeBasedBacktester:
                            f"总资产: {total_value:,.2f} | 盈亏: {profit_rate:+.2f}% | "
                            f"持仓数: {len(self.positions)}/{self.config['max_positions']}{position_info}")
             
+            phase_end = time.perf_counter()
+            self.phase_times['valuation'] += phase_end - phase_start
+            phase_start = phase_end
+            
             # 保存每日记录到数据库
             if save_to_db:
                 # 构建持仓详情列表
                 position_detail_list = []
                 for pos_code, pos in self.positions.items():
-                    pos_profit_rate = 0
-                    if pos_code in self.all_stock_data:
-                        stock_data = self.all_stock_data[pos_code]
-                        if current_date_dt in stock_data.index:
-                            current_price = stock_data.loc[current_date_dt, 'close']
-                            pos_profit_rate = round(pos.get_profit_rate(current_price) * 100, 2)
                     position_detail_list.append({
                         'code': pos_code,
                         'name': pos.name,
-                        'profit_rate': pos_profit_rate
+                        'profit_rate': round(position_profit_rates[pos_code] * 100, 2)
                     })
                 
-                try:
-                    strategy_db.insert_daily_record(
-                        strategy_name=strategy_name,
-                        backtest_start_date=self.config['start_date'],
-                        backtest_end_date=self.config['end_date'],
-                        trade_date=current_date,
-                        buy_count=daily_buy_count,
-                        sell_count=daily_sell_count,
-                        is_no_action=1 if (daily_buy_count == 0 and daily_sell_count == 0) else 0,
-                        total_asset=round(total_value, 2),
-                        profit_rate=round(profit_rate, 4),
-                        cash=round(self.cash, 2),
-                        position_count=len(self.positions),
-                        max_positions=self.config['max_positions'],
-                        position_detail=position_detail_list
-                    )
-                except Exception as e:
-                    logger.error(f"保存每日记录失败: {str(e)}")
+                db_writer.put_daily_record(dict(
+                    strategy_name=strategy_name,
+                    backtest_start_date=self.config['start_date'],
+                    backtest_end_date=self.config['end_date'],
+                    trade_date=current_date,
+                    buy_count=daily_buy_count,
+                    sell_count=daily_sell_count,
+                    is_no_action=1 if (daily_buy_count == 0 and daily_sell_count == 0) else 0,
+                    total_asset=round(total_value, 2),
+                    profit_rate=round(profit_rate, 4),
+                    cash=round(self.cash, 2),
+                    position_count=len(self.positions),
+                    max_positions=self.config['max_positions'],
+                    position_detail=position_detail_list
+                ))
+            
+            self.phase_times['persistence'] += time.perf_counter() - phase_start
         
         # 回测结束，强制清仓
         logger.info(f"{'='*60}")
         logger.info("回测结束，执行强制清仓...")
         
         last_date = trading_dates[-1].strftime('%Y-%m-%d')
-        last_date_dt = pd.to_datetime(last_date)
+        last_pos = self.panel.date_pos(last_date)
+        self.positions.set_date(last_pos if self.panel.is_exact_date(last_pos, last_date) else -1)
         last_sell_count = 0
         for stock_code, position in list(self.positions.items()):
             # 使用预加载数据获取最后价格
-            today_data = self.get_stock_data_on_date(stock_code, last_date)
-            if today_data is not None:
-                last_price = today_data['close']
+            last_price = self.positions.price_of(stock_code, 'close')
+            if last_price is not None:
                 self.execute_sell(
                     stock_code, 
                     last_price, 
@@ -924,26 +1013,23 @@ class TimeBasedBacktester:
                     f"总资产: {final_value:,.2f} | 盈亏: {final_profit_rate:+.2f}% | "
                     f"持仓数: 0/{self.config['max_positions']}")
         
-        # 保存清仓当日记录
-        if save_to_db and strategy_db:
-            try:
-                strategy_db.insert_daily_record(
-                    strategy_name=strategy_name,
-                    backtest_start_date=self.config['start_date'],
-                    backtest_end_date=self.config['end_date'],
-                    trade_date=last_date,
-                    buy_count=0,
-                    sell_count=last_sell_count,
-                    is_no_action=0 if last_sell_count > 0 else 1,
-                    total_asset=round(final_value, 2),
-                    profit_rate=round(final_profit_rate, 4),
-                    cash=round(self.cash, 2),
-                    position_count=0,
-                    max_positions=self.config['max_positions'],
-                    position_detail=[]
-                )
-            except Exception as e:
-                logger.error(f"保存清仓记录失败: {str(e)}")
+        # 保存清仓当日记录（与当日常规记录同主键，按入队顺序覆盖）
+        if save_to_db and db_writer:
+            db_writer.put_daily_record(dict(
+                strategy_name=strategy_name,
+                backtest_start_date=self.config['start_date'],
+                backtest_end_date=self.config['end_date'],
+                trade_date=last_date,
+                buy_count=0,
+                sell_count=last_sell_count,
+                is_no_action=0 if last_sell_count > 0 else 1,
+                total_asset=round(final_value, 2),
+                profit_rate=round(final_profit_rate, 4),
+                cash=round(self.cash, 2),
+                position_count=0,
+                max_positions=self.config['max_positions'],
+                position_detail=[]
+            ))
         
         # 计算最终结果
         end_time = time.time()
@@ -1018,65 +1104,46 @@ class TimeBasedBacktester:
         }
         
         # 保存到CSV
+        persistence_start = time.perf_counter()
         summary_file = f"csv/time_based_backtest_{self.config['start_date'].replace('-', '')}_to_{self.config['end_date'].replace('-', '')}.csv"
-        pd.DataFrame(self.trading_records).to_csv(summary_file, index=False, encoding='utf-8-sig')
-        logger.info(f"交易记录已保存至: {summary_file}")
+        if save_csv:
+            pd.DataFrame(self.trading_records).to_csv(summary_file, index=False, encoding='utf-8-sig')
+            logger.info(f"交易记录已保存至: {summary_file}")
+            
+            daily_file = f"csv/time_based_daily_values_{self.config['start_date'].replace('-', '')}_to_{self.config['end_date'].replace('-', '')}.csv"
+            pd.DataFrame(self.daily_values).to_csv(daily_file, index=False, encoding='utf-8-sig')
+            logger.info(f"每日资产已保存至: {daily_file}")
         
-        daily_file = f"csv/time_based_daily_values_{self.config['start_date'].replace('-', '')}_to_{self.config['end_date'].replace('-', '')}.csv"
-        pd.DataFrame(self.daily_values).to_csv(daily_file, index=False, encoding='utf-8-sig')
-        logger.info(f"每日资产已保存至: {daily_file}")
+        result['summary_json'] = self.build_summary_json(
+            result, len(trading_dates), summary_file if save_csv else None
+        )
         
         # 保存到数据库
         if save_to_db:
             try:
-                strategy_db = StrategyTriggerDB()
+                # 保存触发点位（按股票分组，交给后台线程批量写入）
+                trigger_by_stock = defaultdict(list)
+                for tp in self.trigger_points:
+                    trigger_by_stock[tp['stock_code']].append(tp)
+                
+                for stock_code, points in trigger_by_stock.items():
+                    db_writer.put_trigger_points(dict(
+                        strategy_name=strategy_name,
+                        stock_code=stock_code,
+                        market=points[0].get('market', 'sh'),
+                        trigger_points_json=points,
+                        backtest_start_date=self.config['start_date'],
+                        backtest_end_date=self.config['end_date'],
+                        trigger_count=len(points)
+                    ))
                 
-                # 保存触发点位
+                # 屏障：等待每日记录和触发点位全部写入后再写汇总
+                db_writer.close()
                 if self.trigger_points:
-                    # 按股票分组保存
-                    trigger_by_stock = defaultdict(list)
-                    for tp in self.trigger_points:
-                        trigger_by_stock[tp['stock_code']].append(tp)
-                    
-                    for stock_code, points in trigger_by_stock.items():
-                        if points:
-                            first_point = points[0]
-                            strategy_db.insert_trigger_points(
-                                strategy_name=strategy_name,
-                                stock_code=stock_code,
-                                market=first_point.get('market', 'sh'),
-                                trigger_points_json=points,
-                                backtest_start_date=self.config['start_date'],
-                                backtest_end_date=self.config['end_date'],
-                                trigger_count=len(points)
-                            )
-                    
                     logger.info(f"触发点位已保存到数据库: 共 {len(self.trigger_points)} 条记录")
                 
                 # 保存汇总结果
-                summary_json = {
-                    "trading_days_count": len(trading_dates),
-                    "initial_cash": self.config['initial_cash'],
-                    "final_value": round(final_value, 2),
-                    "total_return": round(total_return, 2),
-                    "max_drawdown": round(max_drawdown, 2),
-                    "sharpe_ratio": round(sharpe_ratio, 2) if sharpe_ratio != 0 else 0,
-                    "total_trades": len(self.trading_records),
-                    "profit_trade_count": self.profit_trade_count,
-                    "loss_trade_count": self.loss_trade_count,
-                    "win_rate": round(result['win_rate'], 2),
-                    "total_commission": round(total_commission, 2),
-                    "buy_commission": round(self.total_buy_commission, 2),
-                    "sell_commission": round(self.total_sell_commission, 2),
-                    "commission_ratio": round(total_commission/self.config['initial_cash']*100, 2),
-                    "commission": self.config['commission'],
-                    "slippage_perc": self.config['slippage_perc'],
-                    "max_positions": self.config['max_positions'],
-                    "position_size_pct": self.config['position_size_pct'],
-                    "csv_file_path": summary_file,
-                    "execution_time": round(total_time, 2),
-                    "created_by": "time_based_backtest"
-                }
+                summary_json = result['summary_json']
                 
                 strategy_db.insert_or_update_summary(
                     strategy_name=strategy_name,
@@ -1095,8 +1162,47 @@ class TimeBasedBacktester:
                 logger.error(f"保存结果到数据库失败: {str(e)}")
                 import traceback
                 logger.error(traceback.format_exc())
+        self.phase_times['persistence'] += time.perf_counter() - persistence_start
         
         return result
+    
+    def build_summary_json(self, result, trading_days_count, csv_file_path=None):
+        """
+        构建写入 backtest_batch_summary.summary_json 的汇总数据
+        
+        Args:
+            result: run_backtest 的结果字典
+            trading_days_count: 交易日数
+            csv_file_path: 交易记录CSV路径
+            
+        Returns:
+            dict: 汇总数据
+        """
+        total_commission = result['total_commission']
+        sharpe_ratio = result['sharpe_ratio']
+        return {
+            "trading_days_count": trading_days_count,
+            "initial_cash": self.config['initial_cash'],
+            "final_value": round(result['final_value'], 2),
+            "total_return": round(result['total_return'], 2),
+            "max_drawdown": round(result['max_drawdown'], 2),
+            "sharpe_ratio": round(sharpe_ratio, 2) if sharpe_ratio != 0 else 0,
+            "total_trades": result['total_trades'],
+            "profit_trade_count": result['profit_trade_count'],
+            "loss_trade_count": result['loss_trade_count'],
+            "win_rate": round(result['win_rate'], 2),
+            "total_commission": round(total_commission, 2),
+            "buy_commission": round(result['buy_commission'], 2),
+            "sell_commission": round(result['sell_commission'], 2),
+            "commission_ratio": round(total_commission/self.config['initial_cash']*100, 2),
+            "commission": self.config['commission'],
+            "slippage_perc": self.config['slippage_perc'],
+            "max_positions": self.config['max_positions'],
+            "position_size_pct": self.config['position_size_pct'],
+            "csv_file_path": csv_file_path,
+            "execution_time": round(result['execution_time'], 2),
+            "created_by": "time_based_backtest"
+        }
 
 
 def main():
@@ -31,6 +31,8 @@ def get_web_config():
     return {
         "host": config.get("webserver", "host"),
         "port": config.get("webserver", "port"),
+        "kline_cache_size": config.getint("webserver", "kline_cache_size", fallback=256),
+        "kline_cache_ttl": config.getfloat("webserver", "kline_cache_ttl", fallback=300),
     }
 
 def get_backtrade_date_config():
@@ -40,9 +42,54 @@ def get_backtrade_date_config():
         "frequency": config.get("backtradedate", "frequency"),
     }
 
+def get_mirror_config():
+    root = config.get("mirror", "root", fallback="./data/mirror")
+    if not os.path.isabs(root):
+        root = os.path.normpath(os.path.join(PROJECT_ROOT, root))
+    return {
+        "enabled": config.getboolean("mirror", "enabled", fallback=False),
+        "root": root,
+    }
+
+def get_collector_config():
+    manifest_path = config.get("collector", "manifest_path", fallback="./data/collector_manifest.sqlite")
+    if not os.path.isabs(manifest_path):
+        manifest_path = os.path.normpath(os.path.join(PROJECT_ROOT, manifest_path))
+    return {
+        "workers": config.getint("collector", "workers", fallback=1),
+        "rate_per_second": config.getfloat("collector", "rate_per_second", fallback=0),
+        "max_retries": config.getint("collector", "max_retries", fallback=3),
+        "retry_base_delay": config.getfloat("collector", "retry_base_delay", fallback=1.0),
+        "manifest_path": manifest_path,
+        "write_method": config.get("collector", "write_method", fallback="upsert"),
+        "derive_minute": config.getboolean("collector", "derive_minute", fallback=True),
+        "minute_storage": config.get("collector", "minute_storage", fallback="legacy"),
+    }
+
+def get_indicator_config():
+    return {
+        "workers": config.getint("indicator", "workers", fallback=4),
+        "shards_per_market": config.getint("indicator", "shards_per_market", fallback=4),
+        "seed_bars": config.getint("indicator", "seed_bars", fallback=250),
+        "write_method": config.get("indicator", "write_method", fallback="upsert"),
+    }
+
+def get_kronos_config():
+    return {
+        "device": config.get("kronos", "device", fallback="cpu"),
+        "quantize": config.getboolean("kronos", "quantize", fallback=False),
+        "num_threads": config.getint("kronos", "num_threads", fallback=0),
+        "cache_size": config.getint("kronos", "cache_size", fallback=256),
+        "latest_date_ttl": config.getfloat("kronos", "latest_date_ttl", fallback=60),
+    }
+
 
 if __name__ == "__main__":
     print(get_db_config())
     print(get_log_config())
     print(get_web_config())
-    print(get_backtrade_date_config())
\ No newline at end of file
+    print(get_backtrade_date_config())
+    print(get_mirror_config())
+    print(get_collector_config())
+    print(get_indicator_config())
+    print(get_kronos_config())
\ No newline at end of file
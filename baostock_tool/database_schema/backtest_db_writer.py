@@ -0,0 +1,139 @@
+"""
+回测结果异步批量写入模块
+回测主循环只把每日记录、触发点位放入有界队列，
+由后台线程攒批后以多行 INSERT ... ON DUPLICATE KEY UPDATE 写入数据库
+
+使用方式：
+    writer = BacktestDBWriter(StrategyTriggerDB())
+    writer.put_daily_record({...})          # 字段同 insert_daily_record 的参数
+    writer.put_trigger_points({...})        # 字段同 insert_trigger_points 的参数
+    writer.flush()                          # 屏障：等待已入队的记录全部写入
+    writer.close()                          # 刷新并停止后台线程
+"""
+
+import queue
+import threading
+import time
+
+from baostock_tool import config
+from baostock_tool.utils.logger_utils import setup_logger
+
+log_config = config.get_log_config()
+logger = setup_logger(logger_name=__name__,
+                      log_level=log_config["log_level"],
+                      log_dir=log_config["log_dir"])
+
+# 队列中的记录类型
+_DAILY = 'daily'
+_TRIGGER = 'trigger'
+_FLUSH = 'flush'
+_STOP = 'stop'
+
+
+class BacktestDBWriter:
+    """回测结果异步批量写入器（单个后台线程）"""
+
+    def __init__(self, strategy_db, max_queue_size=10000, batch_size=500, flush_interval=1.0):
+        """
+        初始化写入器并启动后台线程
+
+        Args:
+            strategy_db (StrategyTriggerDB): 数据库管理对象
+            max_queue_size (int): 队列容量，写入跟不上时 put 会阻塞等待（反压）
+            batch_size (int): 每批写入的最大记录数
+            flush_interval (float): 队列空闲时最长等待多少秒即写入已攒的记录
+        """
+        self.strategy_db = strategy_db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+
+        # 统计数据
+        self.written = {_DAILY: 0, _TRIGGER: 0}
+        self.failed = {_DAILY: 0, _TRIGGER: 0}
+        self.write_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name='BacktestDBWriter', daemon=True)
+        self._thread.start()
+
+    def put_daily_record(self, record):
+        """加入一条每日记录"""
+        self._put((_DAILY, record))
+
+    def put_trigger_points(self, item):
+        """加入一只股票的触发点位"""
+        self._put((_TRIGGER, item))
+
+    def _put(self, entry):
+        if self._closed:
+            raise RuntimeError("写入器已关闭")
+        self._queue.put(entry)
+
+    def flush(self, timeout=None):
+        """
+        屏障：等待此前入队的记录全部写入数据库
+
+        Args:
+            timeout (float, optional): 最长等待秒数
+
+        Returns:
+            bool: 是否在超时前完成
+        """
+        done = threading.Event()
+        self._put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """刷新剩余记录并停止后台线程"""
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self._queue.put((_STOP, None))
+        self._thread.join(timeout)
+        logger.info(f"异步写入完成: 每日记录 {self.written[_DAILY]} 条, 触发点位 {self.written[_TRIGGER]} 条, "
+                    f"失败 {self.failed[_DAILY] + self.failed[_TRIGGER]} 条, 写库耗时 {self.write_seconds:.2f} 秒")
+
+    def _run(self):
+        """后台线程：攒批写入，遇到 flush 标记或队列空闲超时即写出"""
+        pending = {_DAILY: [], _TRIGGER: []}
+        while True:
+            try:
+                kind, payload = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._write_all(pending)
+                continue
+
+            if kind in pending:
+                pending[kind].append(payload)
+                if len(pending[kind]) >= self.batch_size:
+                    self._write(kind, pending[kind])
+                    pending[kind] = []
+            elif kind == _FLUSH:
+                self._write_all(pending)
+                payload.set()
+            elif kind == _STOP:
+                self._write_all(pending)
+                return
+
+    def _write_all(self, pending):
+        for kind in pending:
+            if pending[kind]:
+                self._write(kind, pending[kind])
+                pending[kind] = []
+
+    def _write(self, kind, batch):
+        """写出一批记录（异常只记录日志，不影响后台线程继续运行）"""
+        start_time = time.time()
+        try:
+            if kind == _DAILY:
+                written = self.strategy_db.bulk_upsert_daily_records(batch)
+            else:
+                written = self.strategy_db.bulk_upsert_trigger_points(batch)
+        except Exception as e:
+            logger.error(f"异步批量写入失败: {str(e)}")
+            written = 0
+        self.write_seconds += time.time() - start_time
+        self.written[kind] += written
+        self.failed[kind] += len(batch) - written
@@ -0,0 +1,231 @@
+"""
+行情数据批量写入模块（stock_daily_data / stock_daily_raw_price / stock_minute_data / stock_minute_bar / stock_daily_indicator）
+
+REPLACE INTO 在主键冲突时是 删除 + 插入，分区表上每行都要维护全部二级索引。
+本模块提供两种替代写法：
+
+    upsert     多行 INSERT ... ON DUPLICATE KEY UPDATE（pymysql executemany 自动合并为多行语句），
+               主键冲突时原地更新，值未变化的行不产生写入
+    load_data  行写入临时 TSV 文件，LOAD DATA LOCAL INFILE 装入会话级暂存表，
+               再按分区（日线按年、分钟线按月）INSERT ... SELECT ... ON DUPLICATE KEY UPDATE 合并，
+               需要服务端 local_infile=ON，连接时传 local_infile=True
+    replace    原有的 executemany + REPLACE INTO（对比基准）
+
+分钟线按 minute_storage 写入原表 stock_minute_data（legacy）、紧凑表 stock_minute_bar（compact）
+或两者（both，迁移期间），调用方始终按 MINUTE_COLUMNS 传入行。
+
+使用方式：
+    loader = BulkLoader(conn, method='load_data')
+    loader.load('daily', rows)      # rows 字段顺序同 DAILY_COLUMNS
+    conn.commit()
+"""
+
+import os
+import tempfile
+from datetime import date, datetime
+
+import pymysql
+
+from baostock_tool import config
+from baostock_tool.utils.logger_utils import setup_logger
+
+log_config = config.get_log_config()
+logger = setup_logger(logger_name=__name__,
+                      log_level=log_config["log_level"],
+                      log_dir=log_config["log_dir"])
+
+DAILY_COLUMNS = ('date', 'market', 'code_int', 'frequency', 'open', 'high', 'low', 'close', 'preclose',
+                 'volume', 'amount', 'adjustflag', 'turn', 'tradestatus', 'pctChg', 'peTTM', 'pbMRQ',
+                 'psTTM', 'pcfNcfTTM', 'isST')
+# 日线原始（不复权）价格：新除权事件时前复权价按 原始价格 × 新因子 重算
+DAILY_RAW_COLUMNS = ('date', 'market', 'code_int', 'open', 'high', 'low', 'close', 'preclose')
+MINUTE_COLUMNS = ('date', 'time', 'market', 'code_int', 'frequency', 'open', 'high', 'low', 'close',
+                  'volume', 'amount', 'adjustflag')
+# 紧凑分钟线：time 改为 bar_minute（当日分钟数）
+MINUTE_BAR_COLUMNS = ('date', 'market', 'code_int', 'frequency', 'bar_minute', 'open', 'high', 'low', 'close',
+                      'volume', 'amount', 'adjustflag')
+# 技术指标值字段（stock_daily_indicator，由 update_stock_indicators.py 计算）
+INDICATOR_FIELDS = ('close_fcap', 'is_raising_limit', 'macd_dif', 'macd_dea', 'macd_histogram',
+                    'ma_5', 'ma_8', 'ma_13', 'ma_21', 'ma_34', 'kdj_k', 'kdj_d', 'kdj_j',
+                    'rsi_6', 'rsi_12', 'rsi_24', 'cci_10', 'cci_20')
+INDICATOR_COLUMNS = ('date', 'market', 'code_int', 'base_close') + INDICATOR_FIELDS
+
+# kind -> (表名, 字段, 主键字段, 分区粒度)
+TABLE_SPECS = {
+    'daily': ('stock_daily_data', DAILY_COLUMNS, ('date', 'market', 'code_int', 'frequency'), 'year'),
+    'daily_raw': ('stock_daily_raw_price', DAILY_RAW_COLUMNS, ('market', 'code_int', 'date'), 'year'),
+    'minute': ('stock_minute_data', MINUTE_COLUMNS, ('market', 'code_int', 'date', 'time', 'frequency'), 'month'),
+    'minute_bar': ('stock_minute_bar', MINUTE_BAR_COLUMNS, ('market', 'code_int', 'frequency', 'date', 'bar_minute'),
+                   'month'),
+    'indicator': ('stock_daily_indicator', INDICATOR_COLUMNS, ('date', 'market', 'code_int'), 'year'),
+}
+
+WRITE_METHODS = ('replace', 'upsert', 'load_data')
+MINUTE_STORAGES = ('legacy', 'both', 'compact')
+# 不带 created_at / updated_at 的表
+_WITHOUT_TIMESTAMPS = ('minute_bar', 'daily_raw')
+
+# LOAD DATA LOCAL 被客户端或服务端禁用时的错误码
+_LOCAL_INFILE_DISABLED = (1148, 2068, 3948)
+
+
+def _quote(column):
+    return f"`{column}`"
+
+
+def minute_of_day(time_value):
+    """time 字段（YYYYMMDDHHMMSSsss）转换为当日分钟数，如 '20250102103000000' -> 630"""
+    time_value = str(time_value)
+    return int(time_value[8:10]) * 60 + int(time_value[10:12])
+
+
+def compact_minute_rows(rows):
+    """MINUTE_COLUMNS 顺序的行转换为 MINUTE_BAR_COLUMNS 顺序"""
+    return [(row[0], row[2], row[3], row[4], minute_of_day(row[1])) + tuple(row[5:]) for row in rows]
+
+
+def _partition_key(value, granularity):
+    """日期所属分区 (year,) 或 (year, month)"""
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], '%Y-%m-%d').date()
+    elif isinstance(value, datetime):
+        value = value.date()
+    return (value.year,) if granularity == 'year' else (value.year, value.month)
+
+
+def _partition_range(key):
+    """分区键对应的日期区间 [start, end)"""
+    if len(key) == 1:
+        return date(key[0], 1, 1), date(key[0] + 1, 1, 1)
+    year, month = key
+    return date(year, month, 1), (date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1))
+
+
+class BulkLoader:
+    """行情数据批量写入器（调用方负责提交事务）"""
+
+    def __init__(self, conn, method='upsert', tables=None, minute_storage='legacy'):
+        """
+        Args:
+            conn: pymysql 连接（load_data 方式需以 local_infile=True 创建）
+            method (str): 'replace' / 'upsert' / 'load_data'
+            tables (dict, optional): 目标表名覆盖 {kind: 表名}（基准测试写入临时表时使用）
+            minute_storage (str): 'minute' 行写入的表：'legacy' / 'both' / 'compact'
+        """
+        if method not in WRITE_METHODS:
+            raise ValueError(f"不支持的写入方式: {method}，可选 {WRITE_METHODS}")
+        if minute_storage not in MINUTE_STORAGES:
+            raise ValueError(f"不支持的分钟线存储: {minute_storage}，可选 {MINUTE_STORAGES}")
+        self.conn = conn
+        self.method = method
+        self.tables = tables or {}
+        self.minute_storage = minute_storage
+        self._staging_ready = set()
+
+    def _spec(self, kind):
+        """(表名, 字段, 主键字段, 分区粒度)"""
+        table, columns, key_columns, granularity = TABLE_SPECS[kind]
+        return self.tables.get(kind, table), columns, key_columns, granularity
+
+    def load(self, kind, rows):
+        """
+        写入一批行
+
+        Args:
+            kind (str): 'daily' / 'daily_raw' / 'minute' / 'minute_bar' / 'indicator'
+            rows (list): 元组列表，字段顺序同 DAILY_COLUMNS / DAILY_RAW_COLUMNS / MINUTE_COLUMNS /
+                MINUTE_BAR_COLUMNS / INDICATOR_COLUMNS
+
+        Returns:
+            int: 服务端返回的影响行数（upsert 中新插入计 1、有变化的更新计 2、无变化计 0）
+        """
+        if not rows:
+            return 0
+        if kind == 'minute' and self.minute_storage != 'legacy':
+            affected = self._load('minute', rows) if self.minute_storage == 'both' else 0
+            return affected + self._load('minute_bar', compact_minute_rows(rows))
+        return self._load(kind, rows)
+
+    def _load(self, kind, rows):
+        if self.method == 'load_data':
+            try:
+                return self._load_data(kind, rows)
+            except pymysql.err.OperationalError as e:
+                if e.args and e.args[0] in _LOCAL_INFILE_DISABLED:
+                    logger.warning(f"LOAD DATA LOCAL 不可用（{e}），改用多行 upsert")
+                    self.method = 'upsert'
+                    return self._executemany(kind, rows, upsert=True)
+                raise
+        return self._executemany(kind, rows, upsert=self.method == 'upsert')
+
+    # ==================== executemany ====================
+
+    def insert_sql(self, kind, upsert=True):
+        """INSERT ... ON DUPLICATE KEY UPDATE（upsert=False 时为 REPLACE INTO）语句"""
+        table, columns, key_columns, _ = self._spec(kind)
+        column_list = ', '.join(_quote(c) for c in columns)
+        placeholders = ', '.join(['%s'] * len(columns))
+        if not upsert:
+            if kind in _WITHOUT_TIMESTAMPS:
+                return f"REPLACE INTO {table} ({column_list}) VALUES ({placeholders})"
+            return (f"REPLACE INTO {table} ({column_list}, created_at, updated_at) "
+                    f"VALUES ({placeholders}, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)")
+        updates = ', '.join(f"{_quote(c)} = VALUES({_quote(c)})" for c in columns if c not in key_columns)
+        return (f"INSERT INTO {table} ({column_list}) VALUES ({placeholders}) "
+                f"ON DUPLICATE KEY UPDATE {updates}")
+
+    def _executemany(self, kind, rows, upsert):
+        with self.conn.cursor(pymysql.cursors.Cursor) as cursor:
+            return cursor.executemany(self.insert_sql(kind, upsert), rows)
+
+    # ==================== LOAD DATA + 暂存表 ====================
+
+    def _ensure_staging(self, cursor, kind):
+        """创建会话级暂存表（字段类型与目标表一致，不带分区和索引）"""
+        table, columns, _, _ = self._spec(kind)
+        staging = f"_stage_{table}"
+        if kind not in self._staging_ready:
+            cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+            cursor.execute(f"CREATE TEMPORARY TABLE {staging} ENGINE=InnoDB "
+                           f"AS SELECT {', '.join(_quote(c) for c in columns)} FROM {table} LIMIT 0")
+            self._staging_ready.add(kind)
+        else:
+            cursor.execute(f"DELETE FROM {staging}")
+        return staging
+
+    @staticmethod
+    def _write_tsv(rows, path):
+        """写入 TSV：None 写为 \\N，日期写为 YYYY-MM-DD（行情字段均为数字、代码和日期，不含制表符/换行）"""
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            for row in rows:
+                f.write('\t'.join('\\N' if v is None else str(v) for v in row))
+                f.write('\n')
+
+    def _load_data(self, kind, rows):
+        table, columns, key_columns, granularity = self._spec(kind)
+        column_list = ', '.join(_quote(c) for c in columns)
+        updates = ', '.join(f"{_quote(c)} = VALUES({_quote(c)})" for c in columns if c not in key_columns)
+
+        fd, path = tempfile.mkstemp(prefix=f"{table}_", suffix='.tsv')
+        os.close(fd)
+        try:
+            self._write_tsv(rows, path)
+            with self.conn.cursor(pymysql.cursors.Cursor) as cursor:
+                staging = self._ensure_staging(cursor, kind)
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging} CHARACTER SET utf8mb4 "
+                    f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({column_list})",
+                    (path,)
+                )
+
+                # 按分区合并：每条语句只触及目标表的一个分区
+                affected = 0
+                partitions = sorted({_partition_key(row[0], granularity) for row in rows})
+                merge_sql = (f"INSERT INTO {table} ({column_list}) "
+                             f"SELECT {column_list} FROM {staging} WHERE `date` >= %s AND `date` < %s "
+                             f"ON DUPLICATE KEY UPDATE {updates}")
+                for key in partitions:
+                    affected += cursor.execute(merge_sql, _partition_range(key))
+            return affected
+        finally:
+            os.remove(path)
@@ -0,0 +1,174 @@
+"""
+行情写库方式基准测试：replace（原 executemany + REPLACE INTO） / upsert / load_data
+
+在本地 MySQL（需已按 scripts/sql/create_database.sql 建好 stock_daily_data / stock_minute_data）中
+用 CREATE TABLE ... LIKE 复制出带相同分区和索引的临时基准表，依次测试三种场景：
+    insert     空表写入新行
+    unchanged  同样的行再写一遍（增量采集时与已有数据重叠的部分）
+    changed    10% 的行收盘价变化后再写一遍
+基准表在测试结束后删除（--keep 保留）。
+
+使用方式：
+    python -m baostock_tool.database_schema.bulk_loader_benchmark --stocks 200 --days 250
+    python -m baostock_tool.database_schema.bulk_loader_benchmark --kind minute --stocks 20 --days 20
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+import pymysql
+
+from baostock_tool import config
+from baostock_tool.database_schema.bulk_loader import BulkLoader, TABLE_SPECS, WRITE_METHODS
+
+# 与采集写库线程一致的每批行数
+DEFAULT_BATCH_ROWS = 20000
+# 5 分钟线每个交易日的 bar 时间（上午 09:35-11:30，下午 13:05-15:00）
+MINUTE_TIMES = ([f"{h:02d}{m:02d}" for h in (9, 10, 11) for m in range(0, 60, 5) if (935 <= h * 100 + m <= 1130)] +
+                [f"{h:02d}{m:02d}" for h in (13, 14, 15) for m in range(0, 60, 5) if (1305 <= h * 100 + m <= 1500)])
+
+
+def trading_days(n_days, end=None):
+    """最近 n_days 个工作日（升序）"""
+    day = end or date.today()
+    days = []
+    while len(days) < n_days:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    return days[::-1]
+
+
+def generate_rows(kind, n_stocks, n_days, seed=42):
+    """生成合成行情行（字段顺序同 DAILY_COLUMNS / MINUTE_COLUMNS）"""
+    rng = random.Random(seed)
+    days = trading_days(n_days)
+    rows = []
+    for i in range(n_stocks):
+        market, code_int = ('sh', 600000 + i) if i % 2 == 0 else ('sz', 1 + i)
+        price = rng.uniform(5, 50)
+        for day in days:
+            bars = MINUTE_TIMES if kind == 'minute' else [None]
+            for bar in bars:
+                open_price = round(price, 2)
+                price = max(1.0, price * (1 + rng.gauss(0, 0.02 if bar is None else 0.002)))
+                close = round(price, 2)
+                high = round(max(open_price, close) * 1.01, 2)
+                low = round(min(open_price, close) * 0.99, 2)
+                volume = rng.randint(1000, 10000000)
+                amount = round(volume * close, 2)
+                if kind == 'daily':
+                    rows.append((day.isoformat(), market, code_int, 'd', open_price, high, low, close, open_price,
+                                 volume, amount, 2, round(rng.uniform(0, 10), 2), 1,
+                                 round((close / open_price - 1) * 100, 2), 15.0, 1.5, 2.0, 8.0, 0))
+                else:
+                    time_value = f"{day.strftime('%Y%m%d')}{bar}00000"
+                    rows.append((day.isoformat(), time_value, market, code_int, 5, open_price, high, low, close,
+                                 volume, amount, 2))
+    return rows
+
+
+def change_rows(kind, rows, fraction=0.1, seed=7):
+    """按比例修改收盘价"""
+    rng = random.Random(seed)
+    close_idx = 7 if kind == 'daily' else 8
+    changed = []
+    for row in rows:
+        if rng.random() < fraction:
+            row = list(row)
+            row[close_idx] = round(row[close_idx] * 1.01, 2)
+            row = tuple(row)
+        changed.append(row)
+    return changed
+
+
+def timed_load(conn, loader, kind, rows, batch_rows):
+    """分批写入并提交，返回耗时（秒）"""
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch_rows):
+        loader.load(kind, rows[i:i + batch_rows])
+        conn.commit()
+    return time.perf_counter() - start
+
+
+def run_benchmark(db_config, kind='daily', n_stocks=200, n_days=250, methods=WRITE_METHODS,
+                  batch_rows=DEFAULT_BATCH_ROWS, keep=False):
+    """
+    运行基准测试
+
+    Returns:
+        dict: {method: {scenario: {seconds, rows_per_second}}}
+    """
+    source_table = TABLE_SPECS[kind][0]
+    bench_table = f"bench_{source_table}"
+    rows = generate_rows(kind, n_stocks, n_days)
+    changed = change_rows(kind, rows)
+    print(f"{kind}: {len(rows):,} 行（{n_stocks} 只 × {n_days} 天），每批 {batch_rows} 行")
+
+    conn = pymysql.connect(host=db_config['host'], port=db_config['port'], user=db_config['user'],
+                           password=db_config['password'], database=db_config['database'],
+                           charset='utf8mb4', local_infile=True)
+    results = {}
+    try:
+        for method in methods:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {bench_table}")
+                cursor.execute(f"CREATE TABLE {bench_table} LIKE {source_table}")
+            loader = BulkLoader(conn, method, tables={kind: bench_table})
+            results[method] = {}
+            for scenario, scenario_rows in (('insert', rows), ('unchanged', rows), ('changed', changed)):
+                seconds = timed_load(conn, loader, kind, scenario_rows, batch_rows)
+                results[method][scenario] = {
+                    'seconds': round(seconds, 3),
+                    'rows_per_second': round(len(scenario_rows) / seconds, 1) if seconds > 0 else None,
+                }
+            if loader.method != method:
+                results[method]['fallback'] = loader.method
+    finally:
+        if not keep:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {bench_table}")
+        conn.close()
+    return results
+
+
+def print_results(results):
+    scenarios = ('insert', 'unchanged', 'changed')
+    print(f"{'method':<10}" + ''.join(f"{s + ' (s)':>16}{'rows/s':>12}" for s in scenarios))
+    for method, result in results.items():
+        line = f"{method:<10}"
+        for scenario in scenarios:
+            item = result[scenario]
+            line += f"{item['seconds']:>16.3f}{item['rows_per_second'] or 0:>12.0f}"
+        if 'fallback' in result:
+            line += f"  （回退为 {result['fallback']}）"
+        print(line)
+
+
+def main():
+    db_config = config.get_db_config()
+    parser = argparse.ArgumentParser(description='行情写库方式基准测试')
+    parser.add_argument('--kind', choices=('daily', 'minute'), default='daily', help='日线或分钟线')
+    parser.add_argument('--stocks', type=int, default=200, help='股票数量')
+    parser.add_argument('--days', type=int, default=250, help='交易日数量')
+    parser.add_argument('--methods', nargs='+', choices=WRITE_METHODS, default=list(WRITE_METHODS))
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS, help='每批提交的行数')
+    parser.add_argument('--database', default=db_config['database'], help='基准测试使用的数据库')
+    parser.add_argument('--output', default=None, help='结果 JSON 文件路径')
+    parser.add_argument('--keep', action='store_true', help='保留基准表')
+    args = parser.parse_args()
+
+    db_config['database'] = args.database
+    results = run_benchmark(db_config, args.kind, args.stocks, args.days, args.methods, args.batch_rows, args.keep)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'kind': args.kind, 'stocks': args.stocks, 'days': args.days,
+                       'batch_rows': args.batch_rows, 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+分钟线迁移到紧凑表：stock_minute_data -> stock_minute_bar
+
+原表主键中的 time 为 varchar(17)（YYYYMMDDHHMMSSsss），每个二级索引都重复存储；
+紧凑表改存 bar_minute SMALLINT（当日分钟数），价格 DECIMAL(9,3)，去掉 created_at / updated_at
+和与主键前缀重复的索引（建表语句见 scripts/sql/create_database.sql）。
+
+迁移步骤：
+    1. [collector] minute_storage = both，新数据同时写入两张表，读取时紧凑表缺少的日期用原表补齐
+    2. migrate 按月（与分区一致）INSERT IGNORE ... SELECT 搬运历史数据，中断后重跑跳过已搬运的行
+    3. measure 对比两表大小和单股区间读取耗时（含 Python 端解码）
+    4. 确认无误后改为 minute_storage = compact
+
+使用方式：
+    python -m baostock_tool.database_schema.minute_time_migration migrate --start 2020-01 --end 2025-10
+    python -m baostock_tool.database_schema.minute_time_migration measure --stocks 20 --days 60 --output minute_time.json
+"""
+
+import argparse
+import json
+import statistics
+import time
+from datetime import date, timedelta
+
+import pymysql
+
+from baostock_tool import config
+from baostock_tool.utils.data_loader.minute_loader import read_compact, read_legacy
+from baostock_tool.utils.logger_utils import setup_logger
+
+log_config = config.get_log_config()
+logger = setup_logger(logger_name=__name__,
+                      log_level=log_config["log_level"],
+                      log_dir=log_config["log_dir"])
+
+LEGACY_TABLE = 'stock_minute_data'
+COMPACT_TABLE = 'stock_minute_bar'
+
+MIGRATE_SQL = f"""
+    INSERT IGNORE INTO {COMPACT_TABLE}
+        (date, market, code_int, frequency, bar_minute, open, high, low, close, volume, amount, adjustflag)
+    SELECT date, market, code_int, frequency,
+           CAST(SUBSTRING(time, 9, 2) AS UNSIGNED) * 60 + CAST(SUBSTRING(time, 11, 2) AS UNSIGNED),
+           open, high, low, close, volume, amount, adjustflag
+    FROM {LEGACY_TABLE}
+    WHERE date >= %s AND date < %s
+"""
+
+TABLE_SIZE_SQL = """
+    SELECT table_name, table_rows, data_length, index_length
+    FROM information_schema.TABLES
+    WHERE table_schema = DATABASE() AND table_name IN (%s, %s)
+"""
+
+
+def _connect(db_config):
+    return pymysql.connect(host=db_config['host'], port=db_config['port'], user=db_config['user'],
+                           password=db_config['password'], database=db_config['database'], charset='utf8mb4')
+
+
+def _months(start, end):
+    """'YYYY-MM' 区间内每个月的 [开始, 结束) 日期"""
+    year, month = map(int, start.split('-'))
+    end_year, end_month = map(int, end.split('-'))
+    while (year, month) <= (end_year, end_month):
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        yield date(year, month, 1), date(next_year, next_month, 1)
+        year, month = next_year, next_month
+
+
+def migrate(conn, start_month, end_month):
+    """
+    按月搬运历史分钟线，每月一个事务
+
+    Returns:
+        int: 新插入的行数
+    """
+    total = 0
+    with conn.cursor() as cursor:
+        for month_start, month_end in _months(start_month, end_month):
+            began = time.perf_counter()
+            try:
+                inserted = cursor.execute(MIGRATE_SQL, (month_start, month_end))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"{month_start:%Y-%m} 迁移失败: {e}")
+                raise
+            total += inserted
+            logger.info(f"{month_start:%Y-%m}: 插入 {inserted} 行，耗时 {time.perf_counter() - began:.1f} 秒")
+    return total
+
+
+def table_sizes(conn):
+    """
+    两张表的行数估计和占用空间（先 ANALYZE TABLE 刷新统计信息）
+
+    Returns:
+        dict: {表名: {rows, data_mb, index_mb, total_mb, bytes_per_row}}
+    """
+    sizes = {}
+    with conn.cursor() as cursor:
+        cursor.execute(f"ANALYZE TABLE {LEGACY_TABLE}, {COMPACT_TABLE}")
+        cursor.fetchall()
+        cursor.execute(TABLE_SIZE_SQL, (LEGACY_TABLE, COMPACT_TABLE))
+        for name, rows, data_length, index_length in cursor.fetchall():
+            total = data_length + index_length
+            sizes[name] = {
+                'rows': rows,
+                'data_mb': round(data_length / 2 ** 20, 1),
+                'index_mb': round(index_length / 2 ** 20, 1),
+                'total_mb': round(total / 2 ** 20, 1),
+                'bytes_per_row': round(total / rows, 1) if rows else None,
+            }
+    return sizes
+
+
+def scan_timings(conn, n_stocks=20, n_days=60, frequency=5, repeats=3):
+    """
+    单股区间读取耗时：最近 n_days 天、n_stocks 只股票，两张表各读 repeats 轮取中位数
+
+    Returns:
+        dict: {表名: {seconds_median, rows, rows_per_second}}
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT MAX(date) FROM {COMPACT_TABLE} WHERE frequency = %s", (frequency,))
+        end_date = cursor.fetchone()[0]
+        if end_date is None:
+            return {}
+        start_date = end_date - timedelta(days=n_days)
+        cursor.execute(f"SELECT DISTINCT market, code_int FROM {COMPACT_TABLE} "
+                       f"WHERE date = %s AND frequency = %s LIMIT %s", (end_date, frequency, n_stocks))
+        stocks = cursor.fetchall()
+
+    results = {}
+    for name, reader in ((LEGACY_TABLE, read_legacy), (COMPACT_TABLE, read_compact)):
+        timings, rows = [], 0
+        for _ in range(repeats):
+            began = time.perf_counter()
+            rows = sum(len(reader(conn, market, code_int, start_date, end_date, frequency))
+                       for market, code_int in stocks)
+            timings.append(time.perf_counter() - began)
+        seconds = statistics.median(timings)
+        results[name] = {
+            'seconds_median': round(seconds, 3),
+            'rows': rows,
+            'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None,
+        }
+    return results
+
+
+def measure(conn, n_stocks=20, n_days=60, frequency=5):
+    """表大小 + 区间读取耗时"""
+    return {
+        'sizes': table_sizes(conn),
+        'scan': scan_timings(conn, n_stocks, n_days, frequency),
+        'stocks': n_stocks,
+        'days': n_days,
+        'frequency': frequency,
+    }
+
+
+def print_measurement(result):
+    print(f"{'table':<20}{'rows':>14}{'data MB':>10}{'index MB':>10}{'total MB':>10}{'B/row':>8}")
+    for name, item in result['sizes'].items():
+        print(f"{name:<20}{item['rows']:>14,}{item['data_mb']:>10.1f}{item['index_mb']:>10.1f}"
+              f"{item['total_mb']:>10.1f}{item['bytes_per_row'] or 0:>8.1f}")
+    print(f"区间读取（{result['stocks']} 只 × {result['days']} 天，{result['frequency']} 分钟线，含解码）:")
+    for name, item in result['scan'].items():
+        print(f"  {name:<20}{item['seconds_median']:>8.3f} 秒  {item['rows']:>10,} 行  "
+              f"{item['rows_per_second'] or 0:>12,.0f} 行/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分钟线迁移到紧凑时间编码表')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = subparsers.add_parser('migrate', help='按月搬运历史数据')
+    migrate_parser.add_argument('--start', required=True, help='开始月份 YYYY-MM')
+    migrate_parser.add_argument('--end', required=True, help='结束月份 YYYY-MM')
+    measure_parser = subparsers.add_parser('measure', help='对比两表大小与读取耗时')
+    measure_parser.add_argument('--stocks', type=int, default=20, help='参与读取测试的股票数')
+    measure_parser.add_argument('--days', type=int, default=60, help='读取的自然日区间')
+    measure_parser.add_argument('--frequency', type=int, default=5, help='分钟频率')
+    measure_parser.add_argument('--output', default=None, help='结果 JSON 文件路径')
+    args = parser.parse_args()
+
+    conn = _connect(config.get_db_config())
+    try:
+        if args.command == 'migrate':
+            total = migrate(conn, args.start, args.end)
+            logger.info(f"迁移完成，共插入 {total} 行")
+        else:
+            result = measure(conn, args.stocks, args.days, args.frequency)
+            print_measurement(result)
+            if args.output:
+                with open(args.output, 'w', encoding='utf-8') as f:
+                    json.dump(result, f, ensure_ascii=False, indent=2, default=str)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
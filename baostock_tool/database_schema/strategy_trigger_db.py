@@ -7,6 +7,9 @@
 from sqlalchemy import create_engine, text, Column, BigInteger, String, Enum, Date, Integer, JSON, Numeric, TIMESTAMP, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.engine import URL
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+import json
+import numpy as np
 from baostock_tool import config
 import pymysql
 from baostock_tool.utils.logger_utils import setup_logger
@@ -20,6 +23,28 @@ logger = setup_logger(logger_name=__name__,
 Base = declarative_base()
 
 
+class NumpyEncoder(json.JSONEncoder):
+    """JSON编码器，处理numpy/pandas类型"""
+
+    def default(self, obj):
+        if isinstance(obj, np.integer):
+            return int(obj)
+        elif isinstance(obj, np.floating):
+            return float(obj)
+        elif isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return super().default(obj)
+
+
+def to_json_str(value):
+    """字典/列表转换为JSON字符串，None 保持为 None，其他类型转换为字符串"""
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, cls=NumpyEncoder)
+    return str(value)
+
+
 class StrategyTriggerPoints(Base):
     """策略触发点位表
     该模型类既可以用于查询也可以用于写入，它是一个完整的数据库模型定义，支持CRUD（创建、读取、更新、删除）所有操作
@@ -264,6 +289,91 @@ class StrategyTriggerDB:
             traceback.logger.debug_exc()
             return False
 
+    def _upsert_chunks(self, table, rows, chunk_size, update_columns, key_columns, label):
+        """
+        分块执行 INSERT ... ON DUPLICATE KEY UPDATE，每块在独立事务中提交
+
+        某块失败时回滚该块并逐条重试，只有出错的记录写入失败，其余记录不受影响
+
+        Args:
+            table: SQLAlchemy Table
+            rows (list): 行字典列表
+            chunk_size (int): 每条 INSERT 语句包含的最大行数
+            update_columns (tuple): 主键/唯一键冲突时更新的列
+            key_columns (tuple): 写入失败时日志中用于定位记录的列
+            label (str): 日志中的数据名称
+
+        Returns:
+            int: 成功写入的记录数
+        """
+        def upsert(conn, chunk):
+            stmt = mysql_insert(table).values(chunk)
+            stmt = stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in update_columns})
+            conn.execute(stmt)
+
+        written = 0
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                with self.engine.begin() as conn:
+                    upsert(conn, chunk)
+                written += len(chunk)
+                continue
+            except Exception as e:
+                logger.error(f"批量写入{label}失败（第 {start + 1}-{start + len(chunk)} 条），逐条重试: {str(e)}")
+
+            for row in chunk:
+                try:
+                    with self.engine.begin() as conn:
+                        upsert(conn, [row])
+                    written += 1
+                except Exception as e:
+                    key = {col: row.get(col) for col in key_columns}
+                    logger.error(f"写入{label}失败 {key}: {str(e)}")
+        return written
+
+    def bulk_upsert_trigger_points(self, items, chunk_size=200):
+        """
+        批量插入或更新策略触发点位（INSERT ... ON DUPLICATE KEY UPDATE，多行一条语句）
+
+        Args:
+            items (list): 记录列表，每条记录为字典，字段同 insert_trigger_points 的参数：
+                strategy_name, stock_code, market, trigger_points_json,
+                backtest_start_date, backtest_end_date, trigger_count
+            chunk_size (int): 每条 INSERT 语句包含的最大行数
+
+        Returns:
+            int: 成功写入的记录数
+        """
+        if not items:
+            return 0
+
+        rows = []
+        for item in items:
+            points = item['trigger_points_json']
+            trigger_count = item.get('trigger_count')
+            if trigger_count is None:
+                trigger_count = len(points) if isinstance(points, (list, dict)) else 0
+            rows.append({
+                'strategy_name': item['strategy_name'],
+                'stock_code': item['stock_code'],
+                'market': item.get('market', 'sh'),
+                # 先按 NumpyEncoder 序列化再解析，保证 JSON 列中只有原生类型
+                'trigger_points_json': json.loads(to_json_str(points)) if isinstance(points, (list, dict)) else points,
+                'backtest_start_date': item['backtest_start_date'],
+                'backtest_end_date': item['backtest_end_date'],
+                'trigger_count': trigger_count,
+            })
+
+        written = self._upsert_chunks(
+            StrategyTriggerPoints.__table__, rows, chunk_size,
+            update_columns=('trigger_points_json', 'trigger_count'),
+            key_columns=('strategy_name', 'stock_code', 'market', 'backtest_start_date', 'backtest_end_date'),
+            label='策略触发点位'
+        )
+        logger.debug(f"批量写入策略触发点位: 成功 {written}/{len(rows)} 条")
+        return written
+
     def query_trigger_points(self, strategy_name=None, stock_code=None, market=None,
                            backtest_start_date=None, backtest_end_date=None):
         """
@@ -428,35 +538,12 @@ class StrategyTriggerDB:
         """
         try:
             from sqlalchemy.orm import sessionmaker
-            import json
-            import numpy as np
             Session = sessionmaker(bind=self.engine)
             session = Session()
 
-            # 自定义JSON编码器，处理numpy/pandas类型
-            class NumpyEncoder(json.JSONEncoder):
-                def default(self, obj):
-                    if isinstance(obj, (np.integer, np.int64, np.int32)):
-                        return int(obj)
-                    elif isinstance(obj, (np.floating, np.float64, np.float32)):
-                        return float(obj)
-                    elif isinstance(obj, np.ndarray):
-                        return obj.tolist()
-                    return super().default(obj)
-
-            # 转换summary_json为JSON字符串
-            if isinstance(summary_json, (dict, list)):
-                summary_json_str = json.dumps(summary_json, ensure_ascii=False, cls=NumpyEncoder)
-            else:
-                summary_json_str = str(summary_json)
-
-            # 转换strategy_params_json为JSON字符串
-            strategy_params_str = None
-            if strategy_params_json is not None:
-                if isinstance(strategy_params_json, dict):
-                    strategy_params_str = json.dumps(strategy_params_json, ensure_ascii=False, cls=NumpyEncoder)
-                else:
-                    strategy_params_str = str(strategy_params_json)
+            # 转换为JSON字符串（使用模块级 NumpyEncoder，与批量写入一致）
+            summary_json_str = to_json_str(summary_json)
+            strategy_params_str = to_json_str(strategy_params_json)
 
             # 检查是否已存在相同记录
             existing = session.query(BacktestBatchSummary).filter(
@@ -498,6 +585,42 @@ class StrategyTriggerDB:
             traceback.print_exc()
             return False
 
+    def bulk_upsert_summaries(self, summaries, chunk_size=500):
+        """
+        批量插入或更新回测汇总结果（INSERT ... ON DUPLICATE KEY UPDATE，多行一条语句）
+
+        Args:
+            summaries (list): 汇总记录列表，每条记录为字典，字段同 insert_or_update_summary 的参数：
+                strategy_name, backtest_start_date, backtest_end_date, summary_json,
+                stock_count, execution_time, backtest_framework, strategy_params_json
+            chunk_size (int): 每条 INSERT 语句包含的最大行数
+
+        Returns:
+            int: 成功写入的记录数
+        """
+        if not summaries:
+            return 0
+
+        rows = [{
+            'strategy_name': item['strategy_name'],
+            'backtest_start_date': item['backtest_start_date'],
+            'backtest_end_date': item['backtest_end_date'],
+            'backtest_framework': item.get('backtest_framework', 'backtrader'),
+            'summary_json': to_json_str(item['summary_json']),
+            'strategy_params_json': to_json_str(item.get('strategy_params_json')),
+            'stock_count': item.get('stock_count', 0),
+            'execution_time': item.get('execution_time', 0.0),
+        } for item in summaries]
+
+        written = self._upsert_chunks(
+            BacktestBatchSummary.__table__, rows, chunk_size,
+            update_columns=('summary_json', 'strategy_params_json', 'stock_count', 'execution_time'),
+            key_columns=('strategy_name', 'backtest_start_date', 'backtest_end_date', 'backtest_framework'),
+            label='回测汇总'
+        )
+        logger.debug(f"批量写入回测汇总: 成功 {written}/{len(rows)} 条")
+        return written
+
     def query_summary(self, strategy_name=None, backtest_start_date=None, backtest_end_date=None, backtest_framework=None):
         """
         查询批量回测汇总结果
@@ -784,19 +907,52 @@ class StrategyTriggerDB:
         Returns:
             tuple: (成功数量, 失败数量)
         """
-        success_count = 0
-        fail_count = 0
-
-        for record in records:
-            result = self.insert_daily_record(**record)
-            if result:
-                success_count += 1
-            else:
-                fail_count += 1
+        success_count = self.bulk_upsert_daily_records(records)
+        fail_count = len(records) - success_count
 
         logger.info(f"批量插入每日记录完成: 成功 {success_count} 条, 失败 {fail_count} 条")
         return success_count, fail_count
 
+    def bulk_upsert_daily_records(self, records, chunk_size=1000):
+        """
+        批量插入或更新回测每日记录（INSERT ... ON DUPLICATE KEY UPDATE，多行一条语句）
+
+        Args:
+            records (list): 记录列表，每条记录为字典，字段同 insert_daily_record 的参数
+            chunk_size (int): 每条 INSERT 语句包含的最大行数
+
+        Returns:
+            int: 成功写入的记录数
+        """
+        if not records:
+            return 0
+
+        rows = [{
+            'strategy_name': record['strategy_name'],
+            'backtest_start_date': record['backtest_start_date'],
+            'backtest_end_date': record['backtest_end_date'],
+            'trade_date': record['trade_date'],
+            'buy_count': record.get('buy_count', 0),
+            'sell_count': record.get('sell_count', 0),
+            'is_no_action': record.get('is_no_action', 0),
+            'total_asset': record.get('total_asset'),
+            'profit_rate': record.get('profit_rate'),
+            'cash': record.get('cash'),
+            'position_count': record.get('position_count', 0),
+            'max_positions': record.get('max_positions', 5),
+            'position_detail': to_json_str(record.get('position_detail')),
+        } for record in records]
+
+        written = self._upsert_chunks(
+            BacktestDailyRecords.__table__, rows, chunk_size,
+            update_columns=('buy_count', 'sell_count', 'is_no_action', 'total_asset', 'profit_rate',
+                            'cash', 'position_count', 'max_positions', 'position_detail'),
+            key_columns=('strategy_name', 'backtest_start_date', 'backtest_end_date', 'trade_date'),
+            label='每日记录'
+        )
+        logger.debug(f"批量写入每日记录: 成功 {written}/{len(rows)} 条")
+        return written
+
     def query_daily_records(self, strategy_name, backtest_start_date, backtest_end_date,
                            start_trade_date=None, end_trade_date=None):
         """
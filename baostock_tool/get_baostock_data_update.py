@@ -5,8 +5,18 @@ import pandas_ta as ta
 import pymysql
 from datetime import datetime, timedelta
 from baostock_tool.utils.logger_utils import setup_logger
-from baostock_tool.config import get_db_config, get_log_config
+from baostock_tool.config import get_db_config, get_log_config, get_collector_config
+from baostock_tool.utils.throttle import RateLimiter, retry_call
+from baostock_tool.utils.run_manifest import RunManifest
+from baostock_tool.database_schema.bulk_loader import BulkLoader
+from baostock_tool.utils.data_loader.minute_resampler import derivable_frequencies, resample_minute_bars
+from baostock_tool.utils.data_loader.market_mirror import get_market_mirror
 import sys
+import os
+import multiprocessing
+import queue
+import threading
+import time
 import numpy as np
 
 db_config_ = get_db_config()
@@ -23,6 +33,193 @@ ADJUSTFLAG_NONE = 3      # 不复权
 ADJUSTFLAG_FRONT = 2     # 前复权
 ADJUSTFLAG_BACK = 1      # 后复权
 
+# 流水线参数
+PIPELINE_QUEUE_SIZE = 64       # 抓取/转换队列容量（按股票计），写库跟不上时抓取线程阻塞等待
+WRITER_BATCH_ROWS = 20000      # 写库线程每次提交的最大行数
+WRITER_FLUSH_INTERVAL = 5      # 写库线程空闲多少秒后提交已攒的行
+WRITER_RESULT_POLL_INTERVAL = 10  # 多进程采集等待写库进程统计结果时，检查其是否存活的间隔（秒）
+
+ADJUST_FACTOR_REPLACE_SQL = """
+REPLACE INTO stock_adjust_factor 
+(date, market, code_int, fore_adjust_factor, back_adjust_factor, dividend_rate, created_at, updated_at) 
+VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+"""
+
+DAILY_DELETE_SQL = """
+DELETE FROM stock_daily_data 
+WHERE market = %s AND code_int = %s
+"""
+
+RAW_PRICE_DELETE_SQL = """
+DELETE FROM stock_daily_raw_price 
+WHERE market = %s AND code_int = %s
+"""
+
+# 新除权事件前缺少原始价格的旧日线（本表启用前写入）按 已存前复权价格 / 旧因子 补齐：
+# 只引入一次舍入误差，之后每次重算都从原始价格出发，误差不再随除权事件累积
+RAW_PRICE_BACKFILL_SQL = """
+INSERT IGNORE INTO stock_daily_raw_price (date, market, code_int, open, high, low, close, preclose) 
+SELECT date, market, code_int, open / %s, high / %s, low / %s, close / %s, preclose / %s 
+FROM stock_daily_data 
+WHERE market = %s AND code_int = %s AND frequency = 'd'
+"""
+
+# 新除权事件：已存前复权价格按 原始价格 × 新因子 重算，与按新因子全量重建的结果一致
+# （不在已舍入到两位小数的前复权价格上连乘比例；成交量、成交额、涨跌幅不受复权影响）
+DAILY_RESCALE_SQL = """
+UPDATE stock_daily_data d 
+JOIN stock_daily_raw_price r ON r.market = d.market AND r.code_int = d.code_int AND r.date = d.date 
+SET d.open = r.open * %s, d.high = r.high * %s, d.low = r.low * %s, d.close = r.close * %s, 
+    d.preclose = r.preclose * %s 
+WHERE d.market = %s AND d.code_int = %s AND d.frequency = 'd'
+"""
+
+# 复权因子全量拉取的起始日期
+FULL_HISTORY_START = '1999-01-01'
+
+# baostock 会话失效（未登录）错误码，重试前需要重新登录
+BAOSTOCK_NOT_LOGGED_IN = '10001001'
+
+# 估值/涨跌幅字段的写库范围（DECIMAL(8,4)）
+CLAMP_BOUND = 9999.9999
+# 前复权作用的价格字段
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'preclose')
+
+
+# ==================== 按列转换（替代逐行 iterrows） ====================
+
+def numeric_column(df, name, default=0.0):
+    """
+    DataFrame 列转换为 float64 数组
+
+    baostock 返回的字段均为字符串，空字符串、缺失列或无法解析的值填充为 default
+
+    参数:
+        df: DataFrame
+        name: 列名
+        default: 缺失值填充（None 表示保留 NaN）
+
+    返回:
+        np.ndarray: float64 数组
+    """
+    if name not in df.columns:
+        return np.full(len(df), np.nan if default is None else default, dtype=np.float64)
+    values = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    if default is not None:
+        values = np.where(np.isnan(values), default, values)
+    return values
+
+
+def flag_column(df, name, true_value, default):
+    """字符串标志列转换为 0/1 整数数组，缺失列按 default 处理"""
+    if name not in df.columns:
+        return np.full(len(df), 1 if default == true_value else 0, dtype=np.int64)
+    return (df[name].astype(str).to_numpy() == true_value).astype(np.int64)
+
+
+def clamp_column(values):
+    """限制到写库范围 [-CLAMP_BOUND, CLAMP_BOUND]"""
+    return np.clip(values, -CLAMP_BOUND, CLAMP_BOUND)
+
+
+def align_factors(row_dates, factor_dates, factor_values, default=1.0):
+    """
+    为每个交易日匹配复权因子：取日期不晚于该交易日的最近一个因子
+
+    参数:
+        row_dates: 交易日数组（datetime64[D]）
+        factor_dates: 因子日期数组（datetime64[D]，升序）
+        factor_values: 因子数组（与 factor_dates 对齐）
+        default: 早于第一个因子的交易日使用的因子
+
+    返回:
+        np.ndarray: 与 row_dates 对齐的因子数组
+    """
+    positions = np.searchsorted(factor_dates, row_dates, side='right') - 1
+    factors = np.full(len(row_dates), default, dtype=np.float64)
+    matched = positions >= 0
+    factors[matched] = np.asarray(factor_values, dtype=np.float64)[positions[matched]]
+    return factors
+
+
+def rows_from_columns(*columns):
+    """
+    按列组装写库元组
+
+    numpy 数组先 tolist() 转成 Python 原生 int/float（pymysql 不能直接转义 numpy 整数），
+    标量列（如 market、code_int）自动广播
+
+    返回:
+        list: 元组列表
+    """
+    n = max(len(c) for c in columns if isinstance(c, (np.ndarray, list)))
+    lists = []
+    for column in columns:
+        if isinstance(column, np.ndarray):
+            lists.append(column.tolist())
+        elif isinstance(column, list):
+            lists.append(column)
+        else:
+            lists.append([column] * n)
+    return list(zip(*lists))
+
+
+def _shard_worker(shard_id, db_config, codes, start_date, end_date, minute_frequencies,
+                  shard_state, write_queue, rate_per_second):
+    """
+    采集进程：独立登录 baostock，拉取并转换一个分片的股票，写库数据发往写库进程
+
+    每只股票处理完后发送 ('done', code, {'factor_version': 前复权因子})，
+    失败发送 ('failed', code, 错误信息)，结束时发送 None
+    """
+    collector = BaostockDataCollector(db_config)
+    collector.stock_state = shard_state
+    collector.rate_limiter = RateLimiter(rate_per_second) if rate_per_second > 0 else None
+
+    class _TransformQueue:
+        """_fetch_stock 的抓取结果在本进程内转换后再发往写库进程"""
+
+        @staticmethod
+        def put(item):
+            kind, code, df, extra = item
+            write_queue.put((kind, code, collector.transform_item(kind, code, df, extra)))
+
+    transform_queue = _TransformQueue()
+    try:
+        if not collector.login_baostock():
+            for code in codes:
+                write_queue.put(('failed', code, 'baostock登录失败'))
+            return
+        # 预加载状态缺失时回退到逐只查询数据库
+        if shard_state is None and not collector.connect_database():
+            for code in codes:
+                write_queue.put(('failed', code, '数据库连接失败'))
+            return
+
+        for idx, code in enumerate(codes):
+            logger.info(f"[分片{shard_id}] 处理股票 [{idx + 1}/{len(codes)}]: {code}")
+            try:
+                factor_version = collector._fetch_stock(code, start_date, end_date, minute_frequencies,
+                                                        transform_queue)
+                write_queue.put(('done', code, {'factor_version': factor_version}))
+            except Exception as e:
+                logger.error(f"[分片{shard_id}] 处理股票{code}数据异常: {e}")
+                write_queue.put(('failed', code, str(e)))
+    finally:
+        write_queue.put(None)
+        collector.close_database()
+        collector.logout_baostock()
+
+
+def _shard_writer(db_config, write_queue, result_queue, producers, manifest_path, run_id):
+    """写库进程：汇总所有采集进程的数据，单连接攒批写入，返回统计信息"""
+    collector = BaostockDataCollector(db_config)
+    stats = {'fetched': 0, 'written_rows': 0, 'failed': []}
+    try:
+        collector._writer_worker(write_queue, stats, producers=producers, manifest_path=manifest_path, run_id=run_id)
+    finally:
+        result_queue.put(stats)
+
 
 class BaostockDataCollector:
     def __init__(self, db_config):
@@ -32,19 +229,38 @@ class BaostockDataCollector:
         self.db_config = db_config
         self.conn = None
         self.cursor = None
+        # 每只股票的增量状态 {(market, code_int): {'latest_date': date, 'factors': {date: 前复权因子}}}
+        # 由 prefetch_stock_state 一次性加载，None 表示未加载（逐只查询数据库）
+        self.stock_state = None
+
+        # baostock 请求限流与重试（多进程模式下每个进程分得总速率的 1/N）
+        self.collector_config = get_collector_config()
+        rate = self.collector_config['rate_per_second']
+        self.rate_limiter = RateLimiter(rate) if rate > 0 else None
+        self.max_retries = self.collector_config['max_retries']
+        self.retry_base_delay = self.collector_config['retry_base_delay']
+        # 日线/分钟线写库方式：replace / upsert / load_data（见 database_schema/bulk_loader.py）
+        self.write_method = self.collector_config['write_method']
+        # 分钟线写入的表：legacy / both / compact（见 database_schema/minute_time_migration.py）
+        self.minute_storage = self.collector_config['minute_storage']
+
+    def _new_connection(self, cursorclass=pymysql.cursors.DictCursor):
+        """创建新的数据库连接（pymysql 连接不能跨线程共享，每个线程使用独立连接）"""
+        return pymysql.connect(
+            host=self.db_config['host'],
+            port=self.db_config['port'],
+            user=self.db_config['user'],
+            password=self.db_config['password'],
+            database=self.db_config['database'],
+            charset='utf8mb4',
+            cursorclass=cursorclass,
+            local_infile=self.write_method == 'load_data'
+        )
 
     def connect_database(self):
         """连接MySQL数据库"""
         try:
-            self.conn = pymysql.connect(
-                host=self.db_config['host'],
-                port=self.db_config['port'],
-                user=self.db_config['user'],
-                password=self.db_config['password'],
-                database=self.db_config['database'],
-                charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor
-            )
+            self.conn = self._new_connection()
             self.cursor = self.conn.cursor()
             logger.info("数据库连接成功")
             return True
@@ -74,6 +290,29 @@ class BaostockDataCollector:
             logger.error(f"Baostock登录异常: {e}")
             return False
 
+    def _query_baostock(self, query_func, **kwargs):
+        """
+        调用 baostock 查询接口：先限流，失败（异常或 error_code 非 0）时按抖动退避重试，
+        会话失效时重新登录后再重试
+
+        返回:
+            ResultData: 最后一次查询结果
+        """
+        def on_retry(attempt, reason, delay):
+            error_code = getattr(reason, 'error_code', None)
+            error_msg = getattr(reason, 'error_msg', reason)
+            logger.warning(f"baostock查询失败（{error_code}: {error_msg}），{delay:.1f} 秒后第 {attempt + 1} 次重试")
+            if error_code == BAOSTOCK_NOT_LOGGED_IN:
+                self.login_baostock()
+
+        def limited_query():
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            return query_func(**kwargs)
+
+        return retry_call(limited_query, retries=self.max_retries, base_delay=self.retry_base_delay,
+                          should_retry=lambda rs: rs.error_code != '0', on_retry=on_retry)
+
     def logout_baostock(self):
         """登出Baostock系统"""
         try:
@@ -125,6 +364,122 @@ class BaostockDataCollector:
             logger.error(f"创建复权因子表失败: {e}")
             return False
 
+    def create_raw_price_table(self):
+        """创建日线原始价格表（如果不存在）"""
+        create_sql = """
+        CREATE TABLE IF NOT EXISTS stock_daily_raw_price (
+            date DATE NOT NULL COMMENT '交易所行情日期',
+            market VARCHAR(2) NOT NULL COMMENT '市场代码：sh=上海, sz=深圳',
+            code_int INT(10) UNSIGNED NOT NULL COMMENT '6位数字股票代码',
+            open DECIMAL(12,4) NOT NULL COMMENT '开盘价（不复权）',
+            high DECIMAL(12,4) NOT NULL COMMENT '最高价（不复权）',
+            low DECIMAL(12,4) NOT NULL COMMENT '最低价（不复权）',
+            close DECIMAL(12,4) NOT NULL COMMENT '收盘价（不复权）',
+            preclose DECIMAL(12,4) DEFAULT NULL COMMENT '前收盘价（不复权）',
+            PRIMARY KEY (market, code_int, date)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='日线原始价格（前复权重算的基准）'
+        """
+        try:
+            self.cursor.execute(create_sql)
+            self.conn.commit()
+            logger.info("日线原始价格表创建/检查完成")
+            return True
+        except Exception as e:
+            logger.error(f"创建日线原始价格表失败: {e}")
+            return False
+
+    def prefetch_stock_state(self):
+        """
+        一次性加载所有股票的最新日线日期和复权因子，
+        替代逐只股票的 MAX(date) / COUNT(*) / 最新因子查询
+
+        返回:
+            bool: 是否加载成功（失败时回退到逐只查询）
+        """
+        try:
+            start = time.time()
+            state = {}
+
+            self.cursor.execute("""
+            SELECT market, code_int, MAX(date) AS latest_date
+            FROM stock_daily_data
+            GROUP BY market, code_int
+            """)
+            for row in self.cursor.fetchall():
+                state[(row['market'], int(row['code_int']))] = {'latest_date': row['latest_date'], 'factors': {}}
+
+            self.cursor.execute("""
+            SELECT market, code_int, date, fore_adjust_factor
+            FROM stock_adjust_factor
+            """)
+            factor_count = 0
+            for row in self.cursor.fetchall():
+                entry = state.setdefault((row['market'], int(row['code_int'])), {'latest_date': None, 'factors': {}})
+                entry['factors'][row['date']] = float(row['fore_adjust_factor'])
+                factor_count += 1
+
+            self.stock_state = state
+            logger.info(f"预加载股票增量状态完成: {len(state)} 只股票, {factor_count} 条复权因子, "
+                        f"耗时 {time.time() - start:.2f} 秒")
+            return True
+
+        except Exception as e:
+            self.stock_state = None
+            logger.error(f"预加载股票增量状态失败，回退到逐只查询: {e}")
+            return False
+
+    def _state_entry(self, code):
+        """获取股票的预加载状态，未加载时返回 None"""
+        if self.stock_state is None:
+            return None
+        market, code_int = self.parse_stock_code(code)
+        return self.stock_state.setdefault((market, code_int), {'latest_date': None, 'factors': {}})
+
+    @staticmethod
+    def _to_date(value):
+        """字符串/日期统一转换为 date"""
+        if isinstance(value, str):
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        if isinstance(value, datetime):
+            return value.date()
+        return value
+
+    def _record_daily_rows(self, rows):
+        """日线写库成功后同步预加载状态中的最新日期（rows 字段顺序同 bulk_loader.DAILY_COLUMNS）"""
+        if self.stock_state is None:
+            return
+        latest = {}
+        for row in rows:
+            key = (row[1], int(row[2]))
+            if key not in latest or row[0] > latest[key]:
+                latest[key] = row[0]
+        for key, date_value in latest.items():
+            date_value = self._to_date(date_value)
+            entry = self.stock_state.setdefault(key, {'latest_date': None, 'factors': {}})
+            if entry['latest_date'] is None or date_value > entry['latest_date']:
+                entry['latest_date'] = date_value
+
+    def get_latest_date(self, code):
+        """
+        获取股票在stock_daily_data表中的最新日期
+
+        返回:
+            date: 最新日期，无数据时返回 None
+        """
+        entry = self._state_entry(code)
+        if entry is not None:
+            return entry['latest_date']
+
+        market, code_int = self.parse_stock_code(code)
+        sql = """
+        SELECT MAX(date) AS latest_date
+        FROM stock_daily_data
+        WHERE market = %s AND code_int = %s
+        """
+        self.cursor.execute(sql, (market, code_int))
+        result = self.cursor.fetchone()
+        return result['latest_date'] if result else None
+
     def get_adjust_factor(self, code, start_date, end_date):
         """
         获取股票复权因子数据
@@ -147,7 +502,7 @@ class BaostockDataCollector:
             market, code_int = self.parse_stock_code(code)
             
             # 查询baostock获取复权因子
-            rs = bs.query_adjust_factor(code=code, start_date=start_date, end_date=end_date)
+            rs = self._query_baostock(bs.query_adjust_factor, code=code, start_date=start_date, end_date=end_date)
             
             if rs.error_code != '0':
                 logger.warning(f"获取股票{code}复权因子失败: {rs.error_msg}")
@@ -181,39 +536,15 @@ class BaostockDataCollector:
             return False
         
         try:
-            market, code_int = self.parse_stock_code(code)
-            
-            # baostock query_adjust_factor 返回字段: code, dividOperateDate, foreAdjustFactor, backAdjustFactor, adjustFactor
-            logger.debug(f"复权因子DataFrame字段: {factor_df.columns.tolist()}")
-            
-            data_tuples = []
-            for _, row in factor_df.iterrows():
-                # baostock复权因子接口返回的日期字段名是 'dividOperateDate'
-                if 'dividOperateDate' in row:
-                    date = row['dividOperateDate']
-                elif 'tradeDate' in row:
-                    date = row['tradeDate']
-                elif 'date' in row:
-                    date = row['date']
-                else:
-                    logger.error(f"复权因子数据缺少日期字段，当前字段: {row.index.tolist()}")
-                    continue
-                
-                fore_factor = float(row['foreAdjustFactor']) if 'foreAdjustFactor' in row and row['foreAdjustFactor'] != '' and pd.notna(row['foreAdjustFactor']) else 1.0
-                back_factor = float(row['backAdjustFactor']) if 'backAdjustFactor' in row and row['backAdjustFactor'] != '' and pd.notna(row['backAdjustFactor']) else 1.0
-                dividend_rate = float(row['dividendRate']) if 'dividendRate' in row and row['dividendRate'] != '' and pd.notna(row.get('dividendRate', '')) else None
-                
-                data_tuples.append((date, market, code_int, fore_factor, back_factor, dividend_rate))
+            data_tuples = self.adjust_factor_rows(code, factor_df)
+            if data_tuples is None:
+                return False
             
             # 批量插入
-            insert_sql = """
-            REPLACE INTO stock_adjust_factor 
-            (date, market, code_int, fore_adjust_factor, back_adjust_factor, dividend_rate, created_at, updated_at) 
-            VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """
-            
-            self.cursor.executemany(insert_sql, data_tuples)
+            self.cursor.executemany(ADJUST_FACTOR_REPLACE_SQL, data_tuples)
             self.conn.commit()
+            self._record_factor_rows(code, data_tuples)
+
             logger.info(f"股票{code} 复权因子保存 {len(data_tuples)} 条")
             return True
             
@@ -222,6 +553,41 @@ class BaostockDataCollector:
             logger.error(f"保存复权因子异常: {e}")
             return False
 
+    def adjust_factor_rows(self, code, factor_df):
+        """
+        复权因子DataFrame转换为写库元组（字段顺序同 ADJUST_FACTOR_REPLACE_SQL）
+
+        返回:
+            list: 元组列表，缺少日期字段时返回 None
+        """
+        market, code_int = self.parse_stock_code(code)
+
+        # baostock query_adjust_factor 返回字段: code, dividOperateDate, foreAdjustFactor, backAdjustFactor, adjustFactor
+        logger.debug(f"复权因子DataFrame字段: {factor_df.columns.tolist()}")
+
+        # baostock复权因子接口返回的日期字段名是 'dividOperateDate'
+        date_column = next((c for c in ('dividOperateDate', 'tradeDate', 'date') if c in factor_df.columns), None)
+        if date_column is None:
+            logger.error(f"复权因子数据缺少日期字段，当前字段: {factor_df.columns.tolist()}")
+            return None
+
+        fore_factor = numeric_column(factor_df, 'foreAdjustFactor', default=1.0)
+        back_factor = numeric_column(factor_df, 'backAdjustFactor', default=1.0)
+        # 分红率缺失时写入 NULL
+        dividend_rate = numeric_column(factor_df, 'dividendRate', default=None)
+        dividend_rate = [None if np.isnan(v) else v for v in dividend_rate.tolist()]
+
+        return rows_from_columns(
+            factor_df[date_column].tolist(), market, code_int, fore_factor, back_factor, dividend_rate
+        )
+
+    def _record_factor_rows(self, code, rows):
+        """复权因子写库成功后同步预加载状态"""
+        entry = self._state_entry(code)
+        if entry is not None:
+            for item in rows:
+                entry['factors'][self._to_date(item[0])] = item[3]
+
     def get_adjust_factor_from_db(self, code, start_date=None, end_date=None):
         """
         从数据库获取复权因子数据
@@ -280,6 +646,11 @@ class BaostockDataCollector:
             float: 最新的前复权因子，如果没有返回1.0
         """
         try:
+            entry = self._state_entry(code)
+            if entry is not None:
+                factors = entry['factors']
+                return factors[max(factors)] if factors else 1.0
+
             market, code_int = self.parse_stock_code(code)
             
             sql = """
@@ -300,9 +671,22 @@ class BaostockDataCollector:
             logger.error(f"获取最新复权因子异常: {e}")
             return 1.0
 
-    def rebuild_stock_all_data(self, code, end_date, full_start_date='1999-01-01'):
+    def _invalidate_mirror(self, market, code_int):
+        """
+        已存日线被改写（前复权重算、删除重建）后，标记本地行情镜像下次同步时重新拉取该股票
+        镜像未启用时不做任何事
+        """
+        try:
+            mirror = get_market_mirror()
+            if mirror is not None:
+                mirror.invalidate(market, code_int)
+        except Exception as e:
+            logger.error(f"标记本地行情镜像 {market}.{code_int} 过期失败: {e}")
+
+    def rebuild_stock_all_data(self, code, end_date, full_start_date=FULL_HISTORY_START):
         """
-        重新拉取股票的所有历史数据（当检测到新除权事件时调用）
+        重新拉取股票的所有历史数据（手动修复数据时使用；
+        采集中检测到新除权事件时按原始价格重算已存数据，见 fetch_rescale_factors）
         
         参数:
             code: 股票代码
@@ -317,11 +701,12 @@ class BaostockDataCollector:
             logger.info(f"股票{code} 检测到新除权事件，开始重新拉取全部历史数据...")
             
             # 1. 删除该股票的所有日线数据
-            delete_sql = """
-            DELETE FROM stock_daily_data 
-            WHERE market = %s AND code_int = %s
-            """
-            self.cursor.execute(delete_sql, (market, code_int))
+            self.cursor.execute(DAILY_DELETE_SQL, (market, code_int))
+            self.cursor.execute(RAW_PRICE_DELETE_SQL, (market, code_int))
+            self._invalidate_mirror(market, code_int)
+            entry = self._state_entry(code)
+            if entry is not None:
+                entry['latest_date'] = None
             logger.info(f"股票{code} 已删除旧日线数据")
             
             # 2. 重新获取复权因子（全量）
@@ -337,12 +722,13 @@ class BaostockDataCollector:
             daily_df = self.get_stock_k_data(code, full_start_date, end_date, frequency='d')
             
             if daily_df is not None and not daily_df.empty:
-                # 5. 应用前复权
+                # 5. 应用前复权（原始价格另存，之后的除权事件从原始价格重算）
+                raw_df = daily_df
                 if latest_factor != 1.0:
                     daily_df = self.apply_front_adjust(daily_df, latest_factor=latest_factor)
                 
                 # 6. 保存数据
-                self.save_daily_data_batch(code, daily_df, adjustflag=ADJUSTFLAG_FRONT)
+                self.save_daily_data_batch(code, daily_df, adjustflag=ADJUSTFLAG_FRONT, raw_df=raw_df)
                 logger.info(f"股票{code} 历史数据重建完成，共 {len(daily_df)} 条")
                 return True
             else:
@@ -354,6 +740,35 @@ class BaostockDataCollector:
             logger.error(f"重建股票{code}历史数据异常: {e}")
             return False
 
+    def fetch_rescale_factors(self, code, end_date):
+        """
+        新除权事件：拉取全量复权因子，返回重算已存价格所需的新旧因子
+
+        已存日线的原始价格保存在 stock_daily_raw_price，写库阶段按 原始价格 × 新因子 重算
+        前复权价格，与按新因子重新拉取全部历史的结果一致（不在已舍入的前复权价格上连乘比例，
+        误差不随除权次数累积），只需增量拉取最新日期之后的数据，不再从 1999 年起全量重建。
+
+        参数:
+            code: 股票代码
+            end_date: 结束日期
+
+        返回:
+            tuple: (factor_df, old_factor, new_factor)
+
+        异常:
+            RuntimeError: 复权因子拉取失败
+        """
+        old_factor = self.get_latest_adjust_factor(code)
+        factor_df = self.get_adjust_factor(code, FULL_HISTORY_START, end_date)
+        if factor_df is None or factor_df.empty:
+            raise RuntimeError(f"股票{code} 复权因子拉取失败")
+        # 按日期排序后最后一条即最新前复权因子
+        date_column = next((c for c in ('dividOperateDate', 'tradeDate', 'date') if c in factor_df.columns), None)
+        if date_column is not None:
+            factor_df = factor_df.sort_values(date_column, kind='stable')
+        new_factor = float(numeric_column(factor_df, 'foreAdjustFactor', default=1.0)[-1])
+        return factor_df, old_factor, new_factor
+
     def check_need_adjust(self, code, start_date, end_date):
         """
         检查股票在指定日期范围内是否需要复权处理
@@ -379,14 +794,19 @@ class BaostockDataCollector:
             # 检查数据库中是否已有这些复权因子
             market, code_int = self.parse_stock_code(code)
             
-            # 查询数据库中该股票在日期范围内的复权因子记录数
-            sql = """
-            SELECT COUNT(*) as cnt FROM stock_adjust_factor 
-            WHERE market = %s AND code_int = %s AND date >= %s AND date <= %s
-            """
-            self.cursor.execute(sql, (market, code_int, start_date, end_date))
-            result = self.cursor.fetchone()
-            db_count = result['cnt'] if result else 0
+            # 查询数据库中该股票在日期范围内的复权因子记录数（已预加载时直接计数）
+            entry = self._state_entry(code)
+            if entry is not None:
+                range_start, range_end = self._to_date(start_date), self._to_date(end_date)
+                db_count = sum(1 for d in entry['factors'] if range_start <= d <= range_end)
+            else:
+                sql = """
+                SELECT COUNT(*) as cnt FROM stock_adjust_factor 
+                WHERE market = %s AND code_int = %s AND date >= %s AND date <= %s
+                """
+                self.cursor.execute(sql, (market, code_int, start_date, end_date))
+                result = self.cursor.fetchone()
+                db_count = result['cnt'] if result else 0
             
             # 如果baostock返回的记录数大于数据库中的记录数，说明有新的复权因子
             has_new_factor = len(factor_df) > db_count
@@ -428,44 +848,27 @@ class BaostockDataCollector:
             df = daily_df.copy()
             
             # 将date列转换为日期类型
-            df['date'] = pd.to_datetime(df['date']).dt.date
+            row_dates = pd.to_datetime(df['date'])
+            df['date'] = row_dates.dt.date
             
             # 方式1：使用最新因子对所有数据复权（推荐）
             if latest_factor is not None:
                 factor = latest_factor
                 logger.debug(f"使用最新复权因子: {factor}")
-                
-                # 对价格字段应用前复权
-                for idx, row in df.iterrows():
-                    df.at[idx, 'open'] = float(row['open']) * factor if row['open'] != '' else 0
-                    df.at[idx, 'high'] = float(row['high']) * factor if row['high'] != '' else 0
-                    df.at[idx, 'low'] = float(row['low']) * factor if row['low'] != '' else 0
-                    df.at[idx, 'close'] = float(row['close']) * factor if row['close'] != '' else 0
-                    df.at[idx, 'preclose'] = float(row['preclose']) * factor if 'preclose' in row and row['preclose'] != '' else 0
             
             # 方式2：根据日期匹配因子
-            elif factor_dict:
-                # 需要为每个日期找到合适的因子
-                # 前复权：使用该日期之后最近的因子（或累积因子）
-                sorted_dates = sorted(factor_dict.keys(), reverse=True)
-                
-                for idx, row in df.iterrows():
-                    date = row['date']
-                    
-                    # 查找该日期对应的因子
-                    # 前复权：使用该日期或之后最近的因子
-                    factor = 1.0
-                    for factor_date in sorted_dates:
-                        if factor_date <= date:
-                            factor = factor_dict[factor_date][0]
-                            break
-                    
-                    # 对价格字段应用前复权
-                    df.at[idx, 'open'] = float(row['open']) * factor if row['open'] != '' else 0
-                    df.at[idx, 'high'] = float(row['high']) * factor if row['high'] != '' else 0
-                    df.at[idx, 'low'] = float(row['low']) * factor if row['low'] != '' else 0
-                    df.at[idx, 'close'] = float(row['close']) * factor if row['close'] != '' else 0
-                    df.at[idx, 'preclose'] = float(row['preclose']) * factor if 'preclose' in row and row['preclose'] != '' else 0
+            else:
+                # 前复权：使用该日期或之前最近的因子（升序因子日期上 searchsorted 一次对齐）
+                sorted_dates = sorted(factor_dict.keys())
+                factor = align_factors(
+                    row_dates.to_numpy(dtype='datetime64[D]'),
+                    np.array(pd.to_datetime(sorted_dates), dtype='datetime64[D]'),
+                    [factor_dict[d][0] for d in sorted_dates]
+                )
+            
+            # 对价格字段应用前复权（空值按 0 处理）
+            for column in PRICE_COLUMNS:
+                df[column] = numeric_column(df, column) * factor
             
             logger.debug(f"前复权处理完成，处理了{len(df)}条数据")
             return df
@@ -637,7 +1040,8 @@ class BaostockDataCollector:
                 fields = "date,time,code,open,high,low,close,volume,amount,adjustflag"
 
         try:
-            rs = bs.query_history_k_data_plus(
+            rs = self._query_baostock(
+                bs.query_history_k_data_plus,
                 code=code,
                 fields=fields,
                 start_date=start_date,
@@ -666,53 +1070,27 @@ class BaostockDataCollector:
             logger.error(f"获取股票{code}K线数据异常: {e}")
             return None
 
-    def save_daily_data_batch(self, code, daily_df, adjustflag=ADJUSTFLAG_FRONT):
+    def save_daily_data_batch(self, code, daily_df, adjustflag=ADJUSTFLAG_FRONT, raw_df=None):
         """批量保存日线数据到数据库（新表结构）
         
         参数:
             code: 股票代码
             daily_df: 日线数据DataFrame
             adjustflag: 复权标志，默认为前复权(2)
+            raw_df: 复权前的日线DataFrame，提供时同一事务写入原始价格表
         """
         if daily_df is None or daily_df.empty:
             return False
 
+        data_tuples = []
         try:
-            # 解析股票代码
-            market, code_int = self.parse_stock_code(code)
-            data_tuples = []
-            for _, row in daily_df.iterrows():
-                # 数据清洗和转换
-                date = row['date']
-                open_price = float(row['open']) if row['open'] != '' else 0
-                high = float(row['high']) if row['high'] != '' else 0
-                low = float(row['low']) if row['low'] != '' else 0
-                close = float(row['close']) if row['close'] != '' else 0
-                preclose = float(row['preclose']) if 'preclose' in row and row['preclose'] != '' else 0
-                volume = int(float(row['volume'])) if row['volume'] != '' else 0
-                amount = float(row['amount']) if row['amount'] != '' else 0
-                turn = float(row['turn']) if 'turn' in row and row['turn'] != '' else 0     # 换手*成交额算出来的是流通市值
-                pctchg = self.clamp(float(row['pctChg']) if 'pctChg' in row and row['pctChg'] != '' else 0)
-                peTTM = self.clamp(float(row['peTTM']) if 'peTTM' in row and row['peTTM'] != '' else 0)
-                pbMRQ = self.clamp(float(row['pbMRQ']) if 'pbMRQ' in row and row['pbMRQ'] != '' else 0)
-                psTTM = self.clamp(float(row['psTTM']) if 'psTTM' in row and row['psTTM'] != '' else 0)
-                pcfNcfTTM = self.clamp(float(row['pcfNcfTTM']) if 'pcfNcfTTM' in row and row['pcfNcfTTM'] != '' else 0)
-                tradestatus = 1 if row.get('tradestatus', '1') == '1' else 0
-                isst = 1 if row.get('isST', '0') == '1' else 0
-                data_tuples.append((
-                    date, market, code_int, 'd', open_price, high, low, close, preclose,
-                    volume, amount, adjustflag, turn, tradestatus, pctchg, peTTM, pbMRQ, psTTM, pcfNcfTTM, isst
-                ))
-            # 批量插入
-            insert_sql = """
-            REPLACE INTO stock_daily_data 
-            (date, market, code_int, frequency, open, high, low, close, preclose, volume, amount, 
-             adjustflag, turn, tradestatus, pctChg, peTTM, pbMRQ, psTTM, pcfNcfTTM, isST, created_at, updated_at) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 
-                    CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """
-            self.cursor.executemany(insert_sql, data_tuples)
+            data_tuples = self.daily_rows(code, daily_df, adjustflag)
+            loader = BulkLoader(self.conn, self.write_method, minute_storage=self.minute_storage)
+            loader.load('daily', data_tuples)
+            if raw_df is not None:
+                loader.load('daily_raw', self.raw_price_rows(code, raw_df))
             self.conn.commit()
+            self._record_daily_rows(data_tuples)
             adjust_desc = {ADJUSTFLAG_FRONT: '前复权', ADJUSTFLAG_BACK: '后复权', ADJUSTFLAG_NONE: '不复权'}
             logger.info(f"股票{code} 日线数据批量保存 {len(data_tuples)} 条 ({adjust_desc.get(adjustflag, '未知')})")
             return True
@@ -733,45 +1111,45 @@ class BaostockDataCollector:
                 f.write("\n")
             return False
 
+    def daily_rows(self, code, daily_df, adjustflag=ADJUSTFLAG_FRONT):
+        """
+        日线DataFrame转换为写库元组（字段顺序同 bulk_loader.DAILY_COLUMNS）
+
+        参数:
+            code: 股票代码
+            daily_df: 日线数据DataFrame
+            adjustflag: 复权标志
+        """
+        # 解析股票代码
+        market, code_int = self.parse_stock_code(code)
+        # 数据清洗和转换（按列，空值按 0 处理）
+        prices = [numeric_column(daily_df, column) for column in PRICE_COLUMNS]
+        volume = numeric_column(daily_df, 'volume').astype(np.int64)
+        amount = numeric_column(daily_df, 'amount')
+        turn = numeric_column(daily_df, 'turn')     # 换手*成交额算出来的是流通市值
+        ratios = [clamp_column(numeric_column(daily_df, column))
+                  for column in ('pctChg', 'peTTM', 'pbMRQ', 'psTTM', 'pcfNcfTTM')]
+        tradestatus = flag_column(daily_df, 'tradestatus', '1', default='1')
+        isst = flag_column(daily_df, 'isST', '1', default='0')
+        return rows_from_columns(
+            daily_df['date'].tolist(), market, code_int, 'd', *prices,
+            volume, amount, adjustflag, turn, tradestatus, *ratios, isst
+        )
+
+    def raw_price_rows(self, code, daily_df):
+        """复权前的日线DataFrame转换为原始价格写库元组（字段顺序同 bulk_loader.DAILY_RAW_COLUMNS）"""
+        market, code_int = self.parse_stock_code(code)
+        prices = [numeric_column(daily_df, column) for column in PRICE_COLUMNS]
+        return rows_from_columns(daily_df['date'].tolist(), market, code_int, *prices)
+
     def save_minute_data_batch(self, code, minute_df, frequency):
         """批量保存分钟线数据到数据库（新表结构）"""
         if minute_df is None or minute_df.empty:
             return False
 
         try:
-            # 解析股票代码
-            market, code_int = self.parse_stock_code(code)
-
-            freq_map = {'5': 5, '15': 15, '30': 30, '60': 60}
-            freq_value = freq_map.get(frequency, 5)
-
-            data_tuples = []
-            for _, row in minute_df.iterrows():
-                date = row['date']
-                time_val = row.get('time', '000000')
-
-                open_price = float(row['open']) if row['open'] != '' else 0
-                high = float(row['high']) if row['high'] != '' else 0
-                low = float(row['low']) if row['low'] != '' else 0
-                close = float(row['close']) if row['close'] != '' else 0
-                volume = int(float(row['volume'])) if row['volume'] != '' else 0
-                amount = float(row['amount']) if row['amount'] != '' else 0
-
-                data_tuples.append((
-                    date, time_val, market, code_int, freq_value, open_price, high, low, close,
-                    volume, amount, 2
-                ))
-
-            # 批量插入
-            insert_sql = """
-            REPLACE INTO stock_minute_data 
-            (date, time, market, code_int, frequency, open, high, low, close, volume, amount, 
-             adjustflag, created_at, updated_at) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 
-                    CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """
-
-            self.cursor.executemany(insert_sql, data_tuples)
+            data_tuples = self.minute_rows(code, minute_df, frequency)
+            BulkLoader(self.conn, self.write_method, minute_storage=self.minute_storage).load('minute', data_tuples)
             self.conn.commit()
             logger.info(f"股票{code} {frequency}分钟线数据批量保存 {len(data_tuples)} 条")
             return True
@@ -781,11 +1159,488 @@ class BaostockDataCollector:
             logger.error(f"批量保存分钟线数据异常: {e}")
             return False
 
-    def collect_all_data(self, minute_frequencies=['5']):
+    def minute_rows(self, code, minute_df, frequency):
+        """分钟线DataFrame转换为写库元组（字段顺序同 bulk_loader.MINUTE_COLUMNS）"""
+        # 解析股票代码
+        market, code_int = self.parse_stock_code(code)
+
+        freq_map = {'5': 5, '15': 15, '30': 30, '60': 60}
+        freq_value = freq_map.get(frequency, 5)
+
+        time_values = minute_df['time'].tolist() if 'time' in minute_df.columns else '000000'
+        prices = [numeric_column(minute_df, column) for column in ('open', 'high', 'low', 'close')]
+        volume = numeric_column(minute_df, 'volume').astype(np.int64)
+        amount = numeric_column(minute_df, 'amount')
+        return rows_from_columns(
+            minute_df['date'].tolist(), time_values, market, code_int, freq_value, *prices,
+            volume, amount, 2
+        )
+
+    def _fetch_stock(self, code, start_date, end_date, minute_frequencies, fetch_queue):
+        """
+        抓取阶段：查询单只股票的增量起始日期并拉取K线，结果放入抓取队列
+
+        检测到新除权事件时先放入 'rescale' 项（全量复权因子 + 重算比例），由写库阶段在一个事务中
+        更新因子表并按原始价格重算已存价格，之后的增量日线按新因子前复权
+
+        返回:
+            float: 日线使用的前复权因子（记录到运行清单），未处理日线时返回 None
+        """
+        factor_version = None
+        # 查询该股票在stock_daily_data表中的最新date（已预加载时直接读取）
+        latest_date = self.get_latest_date(code)
+
+        # 如果存在最新日期，则使用该日期的下一个交易日作为start_date
+        if latest_date:
+            # 使用原始的start_date（数据库中最新日期）
+            stock_start_date = latest_date.strftime('%Y-%m-%d')
+            logger.info(f"股票{code} 数据库最新日期: {stock_start_date}")
+        else:
+            # 如果数据库中没有该股票的数据，使用全局start_date
+            stock_start_date = start_date
+            logger.info(f"股票{code} 无历史数据，使用起始日期: {stock_start_date}")
+
+        # 只拉取最细的分钟频率，更粗的分钟频率由其本地合成
+        if self.collector_config['derive_minute']:
+            fetch_frequencies, derived = derivable_frequencies(minute_frequencies)
+        else:
+            fetch_frequencies, derived = minute_frequencies, {}
+
+        for freq in fetch_frequencies:
+            if freq != 'd':
+                minute_df = self.get_stock_k_data(code, stock_start_date, end_date, frequency=freq)
+                if minute_df is not None:
+                    fetch_queue.put(('minute', code, minute_df, freq))
+                    for target, source in derived.items():
+                        if source == freq:
+                            fetch_queue.put(('minute', code, resample_minute_bars(minute_df, int(target)), target))
+            else:
+                # 日线数据处理 - 支持前复权
+                # 先检查是否有新的除权事件
+                need_adjust, has_new_factor = self.check_need_adjust(code, stock_start_date, end_date)
+
+                if has_new_factor:
+                    # 检测到新的除权事件，已存数据按原始价格 × 新因子重算，不再全量重新拉取
+                    factor_df, old_factor, latest_factor = self.fetch_rescale_factors(code, end_date)
+                    logger.warning(f"股票{code} 检测到新的除权事件，前复权因子 {old_factor:.6f} -> {latest_factor:.6f}，"
+                                   f"按原始价格重算已存数据")
+                    fetch_queue.put(('rescale', code, factor_df, (old_factor, latest_factor)))
+                else:
+                    # 获取最新的复权因子，前复权在转换阶段处理
+                    latest_factor = self.get_latest_adjust_factor(code)
+
+                # 增量更新（从数据库最新日期开始）
+                daily_df = self.get_stock_k_data(code, stock_start_date, end_date, frequency=freq)
+                if daily_df is not None:
+                    fetch_queue.put(('daily', code, daily_df, latest_factor))
+                factor_version = latest_factor
+        return factor_version
+
+    def _transform_worker(self, fetch_queue, write_queue, stats):
+        """转换阶段：前复权 + 转换为写库元组，结果放入写库队列"""
+        while True:
+            item = fetch_queue.get()
+            if item is None:
+                write_queue.put(None)
+                return
+
+            kind, code, df, extra = item
+            if kind in ('done', 'failed'):
+                # 完成/失败标记原样传给写库阶段
+                write_queue.put((kind, code, extra))
+                continue
+            try:
+                write_queue.put((kind, code, self.transform_item(kind, code, df, extra)))
+            except Exception as e:
+                logger.error(f"转换股票{code}数据异常: {e}")
+                write_queue.put(('failed', code, str(e)))
+
+    def transform_item(self, kind, code, df, extra):
+        """
+        抓取结果转换为写库数据
+
+        参数:
+            kind: 'daily'（extra 为最新前复权因子）/ 'minute'（extra 为频率）/
+                  'rescale'（df 为全量复权因子，extra 为 (旧因子, 新因子)）
+
+        返回:
+            minute 为元组列表，daily 为 (前复权元组列表, 原始价格元组列表)，
+            rescale 为 (因子元组列表, 旧因子, 新因子)
+        """
+        if kind == 'minute':
+            return self.minute_rows(code, df, extra)
+
+        if kind == 'rescale':
+            factor_rows = self.adjust_factor_rows(code, df)
+            if factor_rows is None:
+                raise ValueError(f"股票{code} 复权因子缺少日期字段")
+            return (factor_rows,) + tuple(extra)
+
+        latest_factor = extra
+        raw_rows = self.raw_price_rows(code, df)
+        if latest_factor != 1.0:
+            # 有历史复权因子，应用前复权
+            df = self.apply_front_adjust(df, latest_factor=latest_factor)
+            logger.debug(f"股票{code} 使用历史复权因子: {latest_factor:.6f}")
+        return self.daily_rows(code, df, ADJUSTFLAG_FRONT), raw_rows
+
+    def _writer_worker(self, write_queue, stats, producers=1, manifest_path=None, run_id=None):
+        """
+        写库阶段：使用独立连接，跨股票攒批后 executemany 写入并提交
+
+        参数:
+            write_queue: 写库队列，元素为 (kind, code, payload)，None 为一个生产者的结束标记
+                - 'minute': payload 为写库元组列表
+                - 'daily': payload 为 (前复权元组列表, 原始价格元组列表)，两者在同一事务中提交
+                - 'rescale': payload 为 (因子元组列表, 旧因子, 新因子)，立即在一个事务中
+                             写入复权因子并按 原始价格 × 新因子 重算已存日线价格
+                - 'done': 该股票的数据已全部入队，payload 为 {'factor_version': 前复权因子}，
+                          未失败的股票计入 stats['fetched']
+                - 'failed': 该股票处理失败，payload 为错误信息
+            stats: 统计信息
+            producers: 生产者数量（收到同样数量的 None 后退出）
+            manifest_path: 运行清单路径，收到 'done' 后记为 fetched，
+                           待该股票之前的数据全部提交再记为 stored
+            run_id: 运行清单中的运行标识
+        """
+        pending_rows = {'daily': [], 'minute': []}
+        pending_codes = {'daily': [], 'minute': []}
+        pending_raw = []
+        pending_done = []
+        failed_codes = set()
+        # 每只股票写入的行数和最新数据日期 {code: [rows, max_date]}
+        progress = {}
+
+        manifest = RunManifest(manifest_path) if manifest_path else None
+
+        try:
+            conn = self._new_connection(cursorclass=pymysql.cursors.Cursor)
+            cursor = conn.cursor()
+            loader = BulkLoader(conn, self.write_method, minute_storage=self.minute_storage)
+        except Exception as e:
+            logger.error(f"写库线程连接数据库失败: {e}")
+            conn = cursor = loader = None
+
+        def fail(codes, error):
+            stats['failed'].extend(codes)
+            failed_codes.update(codes)
+            if manifest is not None:
+                manifest.mark_failed(run_id, codes, str(error))
+
+        def track(code, rows):
+            entry = progress.setdefault(code, [0, None])
+            entry[0] += len(rows)
+            if rows:
+                max_date = max(str(row[0]) for row in rows)
+                if entry[1] is None or max_date > entry[1]:
+                    entry[1] = max_date
+
+        def flush(kind):
+            rows, codes = pending_rows[kind], pending_codes[kind]
+            if not rows:
+                return
+            try:
+                if conn is None:
+                    raise RuntimeError("写库线程无可用数据库连接")
+                loader.load(kind, rows)
+                if kind == 'daily':
+                    loader.load('daily_raw', pending_raw)
+                conn.commit()
+                if kind == 'daily':
+                    self._record_daily_rows(rows)
+                stats['written_rows'] += len(rows)
+                logger.info(f"写库: {kind} {len(rows)} 条（{len(codes)} 只股票）")
+            except Exception as e:
+                if conn is not None:
+                    conn.rollback()
+                logger.error(f"批量写入{kind}数据异常（{codes[0]} 等 {len(codes)} 只股票）: {e}")
+                fail(codes, e)
+            pending_rows[kind] = []
+            pending_codes[kind] = []
+            if kind == 'daily':
+                pending_raw.clear()
+            mark_stored()
+
+        def mark_stored():
+            # 所有已攒的行都已提交后，之前收到完成标记的股票才算写库完成
+            if not pending_done or any(pending_rows.values()):
+                return
+            if manifest is not None:
+                manifest.mark_stored(run_id, [code for code in pending_done if code not in failed_codes])
+            pending_done.clear()
+
+        def rescale(code, payload):
+            # 因子写入与价格重算在同一事务中提交：中断重跑时因子数量已一致，不会重复重算
+            factor_rows, old_factor, new_factor = payload
+            market, code_int = self.parse_stock_code(code)
+            try:
+                if conn is None:
+                    raise RuntimeError("写库线程无可用数据库连接")
+                cursor.executemany(ADJUST_FACTOR_REPLACE_SQL, factor_rows)
+                updated = 0
+                if old_factor and new_factor != old_factor:
+                    backfilled = cursor.execute(RAW_PRICE_BACKFILL_SQL, (old_factor,) * 5 + (market, code_int))
+                    if backfilled:
+                        logger.warning(f"股票{code} {backfilled} 条日线缺少原始价格，按旧因子 {old_factor:.6f} 反算补齐")
+                    updated = cursor.execute(DAILY_RESCALE_SQL, (new_factor,) * 5 + (market, code_int))
+                conn.commit()
+                self._record_factor_rows(code, factor_rows)
+                if updated:
+                    # 已同步到本地镜像的旧前复权价格需要重新同步
+                    self._invalidate_mirror(market, code_int)
+                logger.info(f"股票{code} 复权因子更新 {len(factor_rows)} 条，已存日线按原始价格重算 {updated} 条")
+            except Exception as e:
+                if conn is not None:
+                    conn.rollback()
+                logger.error(f"重算股票{code}前复权价格异常: {e}")
+                fail([code], e)
+
+        finished = 0
+        try:
+            while True:
+                try:
+                    item = write_queue.get(timeout=WRITER_FLUSH_INTERVAL)
+                except queue.Empty:
+                    for kind in pending_rows:
+                        flush(kind)
+                    continue
+
+                if item is None:
+                    finished += 1
+                    if finished < producers:
+                        continue
+                    for kind in pending_rows:
+                        flush(kind)
+                    mark_stored()
+                    return
+
+                kind, code, payload = item
+                if kind == 'done':
+                    if code not in failed_codes:
+                        # 以写库阶段实际收到的完成标记计数（多进程时异常退出的分片未报告的股票不计入）
+                        stats['fetched'] += 1
+                        rows, max_date = progress.pop(code, (0, None))
+                        if manifest is not None:
+                            manifest.mark_fetched(run_id, [(code, rows, max_date, (payload or {}).get('factor_version'))])
+                        pending_done.append(code)
+                        mark_stored()
+                    continue
+                if kind == 'failed':
+                    fail([code], payload)
+                    continue
+                if code in failed_codes:
+                    # 同一股票之前的数据已失败（如重算失败），后续数据不再写入，下次运行重试
+                    continue
+                if kind == 'rescale':
+                    rescale(code, payload)
+                    continue
+
+                if kind == 'daily':
+                    payload, raw_rows = payload
+                    pending_raw.extend(raw_rows)
+                track(code, payload)
+                pending_rows[kind].extend(payload)
+                pending_codes[kind].append(code)
+                if len(pending_rows[kind]) >= WRITER_BATCH_ROWS:
+                    flush(kind)
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
+            if manifest is not None:
+                manifest.close()
+
+    def _log_manifest_summary(self, run_id):
+        """输出运行清单摘要（状态计数与吞吐量）"""
+        manifest = RunManifest(self.collector_config['manifest_path'])
+        try:
+            manifest.finish_run(run_id)
+            logger.info(manifest.summary(run_id))
+        finally:
+            manifest.close()
+
+    def _start_manifest_run(self, run_id, codes):
+        """在运行清单中开始（或续传）一次运行，返回尚未写库完成的股票"""
+        manifest = RunManifest(self.collector_config['manifest_path'])
+        try:
+            pending = manifest.start_run(run_id, codes)
+        finally:
+            manifest.close()
+        if len(pending) < len(codes):
+            logger.info(f"断点续传: 已完成 {len(codes) - len(pending)} 只，剩余 {len(pending)} 只")
+        return pending
+
+    def run_pipeline(self, codes, start_date, end_date, minute_frequencies):
+        """
+        流水线处理股票K线数据
+
+        抓取（当前线程，baostock 会话不支持多线程）→ 转换线程 → 写库线程，
+        阶段之间通过有界队列连接：下游处理不过来时上游阻塞等待，内存占用有上限。
+        每只股票的状态记录在运行清单中（运行标识为 end_date），中断后重跑只处理未完成的股票。
+
+        参数:
+            codes: 股票代码列表
+            start_date: 无历史数据时的起始日期
+            end_date: 结束日期
+            minute_frequencies: 频率列表
+
+        返回:
+            dict: 统计信息 {fetched, written_rows, failed}
+        """
+        run_id = end_date
+        codes = self._start_manifest_run(run_id, codes)
+
+        fetch_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        write_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        stats = {'fetched': 0, 'written_rows': 0, 'failed': []}
+
+        transformer = threading.Thread(target=self._transform_worker, args=(fetch_queue, write_queue, stats),
+                                       name='collector-transform', daemon=True)
+        writer = threading.Thread(target=self._writer_worker, args=(write_queue, stats),
+                                  kwargs={'manifest_path': self.collector_config['manifest_path'], 'run_id': run_id},
+                                  name='collector-writer', daemon=True)
+        transformer.start()
+        writer.start()
+
+        pipeline_start = time.time()
+        total_stocks = len(codes)
+        try:
+            for idx, code in enumerate(codes):
+                logger.info(f"处理股票 [{idx + 1}/{total_stocks}]: {code}")
+                try:
+                    factor_version = self._fetch_stock(code, start_date, end_date, minute_frequencies, fetch_queue)
+                    fetch_queue.put(('done', code, None, {'factor_version': factor_version}))
+                except Exception as e:
+                    logger.error(f"抓取股票{code}数据异常: {e}")
+                    fetch_queue.put(('failed', code, None, str(e)))
+        finally:
+            # 结束标记依次传递到转换、写库线程，等待全部数据落库
+            fetch_queue.put(None)
+            transformer.join()
+            writer.join()
+
+        elapsed = time.time() - pipeline_start
+        logger.info(f"流水线完成: 抓取 {stats['fetched']}/{total_stocks} 只股票，写入 {stats['written_rows']} 条，"
+                    f"失败 {len(stats['failed'])} 只，耗时 {elapsed:.1f} 秒")
+        if stats['failed']:
+            logger.warning(f"失败股票（下次运行续传）: {stats['failed']}")
+        self._log_manifest_summary(run_id)
+        return stats
+
+    def run_sharded(self, codes, start_date, end_date, minute_frequencies, workers):
+        """
+        多进程采集：股票列表分片到 workers 个采集进程（各自独立的 baostock 会话），
+        拉取与转换在采集进程完成，数据汇总到一个写库进程。
+
+        - 限流：rate_per_second 按进程数均分
+        - 重试：接口失败按抖动退避重试，会话失效时重新登录
+        - 断点续传：写库进程提交后在运行清单中记录已完成股票，同一截止日期重跑时跳过
+
+        参数:
+            codes: 股票代码列表
+            start_date: 无历史数据时的起始日期
+            end_date: 结束日期
+            minute_frequencies: 频率列表
+            workers: 采集进程数
+
+        返回:
+            dict: 统计信息 {fetched, written_rows, failed}
+        """
+        run_id = end_date
+        manifest_path = self.collector_config['manifest_path']
+        pending = self._start_manifest_run(run_id, codes)
+        if not pending:
+            self._log_manifest_summary(run_id)
+            return {'fetched': 0, 'written_rows': 0, 'failed': []}
+
+        workers = max(1, min(workers, len(pending)))
+        shards = [pending[i::workers] for i in range(workers)]
+        rate_per_worker = self.collector_config['rate_per_second'] / workers
+
+        # spawn 启动：子进程不继承父进程的数据库连接和 baostock 会话
+        ctx = multiprocessing.get_context('spawn')
+        write_queue = ctx.Queue(maxsize=PIPELINE_QUEUE_SIZE * workers)
+        result_queue = ctx.Queue()
+
+        writer = ctx.Process(target=_shard_writer, name='collector-writer',
+                             args=(self.db_config, write_queue, result_queue, workers, manifest_path, run_id))
+        writer.start()
+
+        processes = []
+        for shard_id, shard_codes in enumerate(shards):
+            shard_state = None
+            if self.stock_state is not None:
+                keys = [self.parse_stock_code(code) for code in shard_codes]
+                shard_state = {key: self.stock_state[key] for key in keys if key in self.stock_state}
+            process = ctx.Process(target=_shard_worker, name=f'collector-shard-{shard_id}',
+                                  args=(shard_id, self.db_config, shard_codes, start_date, end_date,
+                                        minute_frequencies, shard_state, write_queue, rate_per_worker))
+            process.start()
+            processes.append(process)
+
+        pipeline_start = time.time()
+        failed_shards = []
+        for shard_id, process in enumerate(processes):
+            process.join(timeout=WRITER_RESULT_POLL_INTERVAL)
+            while process.exitcode is None:
+                # 写库进程已退出时采集分片会阻塞在已满的写库队列上，直接终止
+                if not writer.is_alive():
+                    logger.error(f"写库进程已退出，终止采集分片{shard_id}")
+                    process.terminate()
+                process.join(timeout=WRITER_RESULT_POLL_INTERVAL)
+            if process.exitcode != 0:
+                failed_shards.append(shard_id)
+                logger.error(f"采集分片{shard_id} 异常退出（exitcode={process.exitcode}），"
+                             f"未完成的股票下次运行续传")
+        # 异常退出的分片可能没有发出结束标记，全部分片结束后补发，避免写库进程一直等待
+        # （多发的标记在写库进程退出后留在队列中，不影响结果）
+        for _ in failed_shards:
+            try:
+                write_queue.put(None, timeout=WRITER_RESULT_POLL_INTERVAL)
+            except queue.Full:
+                logger.error("写库队列已满，无法补发分片结束标记")
+                break
+
+        # 写库进程收齐结束标记后提交剩余数据并返回统计；进程意外退出时不再等待
+        stats = None
+        while stats is None:
+            try:
+                stats = result_queue.get(timeout=WRITER_RESULT_POLL_INTERVAL)
+            except queue.Empty:
+                if not writer.is_alive():
+                    break
+        if stats is None:
+            try:
+                stats = result_queue.get(timeout=WRITER_RESULT_POLL_INTERVAL)
+            except queue.Empty:
+                logger.error(f"写库进程异常退出（exitcode={writer.exitcode}），未返回统计，"
+                             f"未提交的股票下次运行续传")
+                stats = {'fetched': 0, 'written_rows': 0, 'failed': list(pending)}
+        write_queue.cancel_join_thread()
+        writer.join()
+        if failed_shards:
+            stats['failed_shards'] = failed_shards
+
+        elapsed = time.time() - pipeline_start
+        logger.info(f"多进程采集完成（{workers} 进程）: 抓取 {stats['fetched']}/{len(pending)} 只股票，"
+                    f"写入 {stats['written_rows']} 条，失败 {len(set(stats['failed']))} 只，耗时 {elapsed:.1f} 秒")
+        if stats['failed']:
+            logger.warning(f"失败股票（下次运行续传）: {sorted(set(stats['failed']))}")
+        self._log_manifest_summary(run_id)
+        return stats
+
+    def collect_all_data(self, minute_frequencies=['5'], workers=None):
         """
         主函数：收集所有数据（全量拉取，无存在性检查）
         支持前复权处理
+
+        参数:
+            minute_frequencies: 频率列表
+            workers: 采集进程数，默认读取配置 [collector] workers，大于 1 时使用多进程采集
         """
+        if workers is None:
+            workers = self.collector_config['workers']
 
         # 1. 登录Baostock
         if not self.login_baostock():
@@ -796,8 +1651,12 @@ class BaostockDataCollector:
             self.logout_baostock()
             return False
 
-        # 2.1 创建复权因子表（如果不存在）
+        # 2.1 创建复权因子表和日线原始价格表（如果不存在）
         self.create_adjust_factor_table()
+        self.create_raw_price_table()
+
+        # 2.2 一次性加载每只股票的最新日期和复权因子
+        self.prefetch_stock_state()
 
         sql = """
         SELECT MAX(DATE) AS latest_date
@@ -865,60 +1724,11 @@ class BaostockDataCollector:
 
                 logger.info(f"需要处理 {len(stocks_to_process)} 只A股股票的K线数据")
 
-                # 6. 逐个获取未处理股票的K线数据
-                total_stocks = len(stocks_to_process)
-                for idx, code in enumerate(stocks_to_process):
-                    logger.info(f"处理股票 [{idx + 1}/{total_stocks}]: {code}")
-
-                    # 查询该股票在stock_daily_data表中的最新date
-                    market, code_int = self.parse_stock_code(code)
-                    sql = """
-                    SELECT MAX(date) AS latest_date
-                    FROM stock_daily_data
-                    WHERE market = %s AND code_int = %s
-                    """
-                    self.cursor.execute(sql, (market, code_int))
-                    result = self.cursor.fetchone()
-
-                    # 如果存在最新日期，则使用该日期的下一个交易日作为start_date
-                    if result and result['latest_date']:
-                        # 使用原始的start_date（数据库中最新日期）
-                        stock_start_date = result['latest_date'].strftime('%Y-%m-%d')
-                        logger.info(f"股票{code} 数据库最新日期: {stock_start_date}")
-                    else:
-                        # 如果数据库中没有该股票的数据，使用全局start_date
-                        stock_start_date = start_date
-                        logger.info(f"股票{code} 无历史数据，使用起始日期: {stock_start_date}")
-
-                    for freq in minute_frequencies:
-                        if freq != 'd':
-                            minute_df = self.get_stock_k_data(code, stock_start_date, end_date, frequency=freq)
-                            if minute_df is not None:
-                                self.save_minute_data_batch(code, minute_df, freq)
-                        else:
-                            # 日线数据处理 - 支持前复权
-                            # 先检查是否有新的除权事件
-                            need_adjust, has_new_factor = self.check_need_adjust(code, stock_start_date, end_date)
-                            
-                            if has_new_factor:
-                                # 检测到新的除权事件，重新拉取该股票的全部历史数据
-                                logger.warning(f"股票{code} 检测到新的除权事件，触发全量重建")
-                                self.rebuild_stock_all_data(code, end_date)  # 使用默认开始日期1999-01-01
-                            else:
-                                # 没有新除权事件，正常增量更新
-                                daily_df = self.get_stock_k_data(code, stock_start_date, end_date, frequency=freq)
-                                if daily_df is not None:
-                                    # 获取最新的复权因子
-                                    latest_factor = self.get_latest_adjust_factor(code)
-                                    
-                                    if latest_factor != 1.0:
-                                        # 有历史复权因子，应用前复权
-                                        daily_df = self.apply_front_adjust(daily_df, latest_factor=latest_factor)
-                                        self.save_daily_data_batch(code, daily_df, adjustflag=ADJUSTFLAG_FRONT)
-                                        logger.debug(f"股票{code} 使用历史复权因子: {latest_factor:.6f}")
-                                    else:
-                                        # 无复权因子，直接保存
-                                        self.save_daily_data_batch(code, daily_df, adjustflag=ADJUSTFLAG_FRONT)
+                # 6. 流水线获取并保存K线数据（抓取、转换、写库并行）
+                if workers > 1:
+                    self.run_sharded(stocks_to_process, start_date, end_date, minute_frequencies, workers)
+                else:
+                    self.run_pipeline(stocks_to_process, start_date, end_date, minute_frequencies)
 
                 logger.info("全量数据收集完成")
                 return True
@@ -935,12 +1745,6 @@ class BaostockDataCollector:
             self.close_database()
             self.logout_baostock()
 
-    @staticmethod
-    def clamp(value):
-        lower_bound = -9999.9999
-        upper_bound = 9999.9999
-        return max(lower_bound, min(upper_bound, value))
-
 
 def main():
     """主函数"""
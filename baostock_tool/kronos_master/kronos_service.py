@@ -19,11 +19,11 @@ _MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
 
 import datetime
 from dataclasses import dataclass, field
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 import matplotlib.pyplot as plt
-from sqlalchemy import create_engine
+from sqlalchemy import bindparam, create_engine, text
 from sqlalchemy.engine import URL
 
 # 导入配置模块
@@ -44,16 +44,17 @@ KRONOS_AVAILABLE = False
 KronosTokenizer = None
 Kronos = None
 KronosPredictor = None
+quantize_dynamic_int8 = None
 
 # 方式1: 尝试相对导入（当作为包使用时）
 try:
-    from .model import Kronos, KronosTokenizer, KronosPredictor
+    from .model import Kronos, KronosTokenizer, KronosPredictor, quantize_dynamic_int8
     KRONOS_AVAILABLE = True
     print("✅ Kronos模块加载成功 (from .model)")
 except ImportError:
     # 方式2: 尝试绝对导入
     try:
-        from baostock_tool.kronos_master.model import Kronos, KronosTokenizer, KronosPredictor
+        from baostock_tool.kronos_master.model import Kronos, KronosTokenizer, KronosPredictor, quantize_dynamic_int8
         KRONOS_AVAILABLE = True
         print("✅ Kronos模块加载成功 (from baostock_tool.kronos_master.model)")
     except ImportError:
@@ -63,7 +64,7 @@ except ImportError:
             project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
             if project_root not in sys.path:
                 sys.path.insert(0, project_root)
-            from baostock_tool.kronos_master.model import Kronos, KronosTokenizer, KronosPredictor
+            from baostock_tool.kronos_master.model import Kronos, KronosTokenizer, KronosPredictor, quantize_dynamic_int8
             KRONOS_AVAILABLE = True
             print(f"✅ Kronos模块加载成功 (from {project_root})")
         except ImportError as e3:
@@ -78,6 +79,16 @@ except ImportError:
     print("⚠️ mplfinance未安装，K线图绘制功能不可用")
     print("   安装方法: pip install mplfinance")
 
+# psutil 可选导入（批量预测按可用内存估算微批大小）
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# 批量查询时单条语句 IN 列表中的股票数量上限
+CODES_PER_QUERY = 1000
+
 
 @dataclass
 class KronosConfig:
@@ -91,6 +102,9 @@ class KronosConfig:
     )
     device: str = "cpu"
     max_context: int = 512
+    use_kv_cache: bool = True  # 增量解码（KV 缓存），False 时每步重新编码整个上下文窗口
+    quantize: bool = False  # CPU 推理时对 TransformerBlock / FeedForward / DualHead 的 Linear 做 int8 动态量化
+    num_threads: int = 0  # torch 算子内（intra-op）线程数，0 时使用 torch 默认值
 
     # 预测参数
     lookback: int = 360  # 历史数据回看天数
@@ -103,6 +117,11 @@ class KronosConfig:
     default_limit_rate: float = 0.1  # 默认涨跌停幅度 10%
     gem_limit_rate: float = 0.2  # 创业板涨跌停幅度 20%
 
+    # 批量预测配置
+    batch_size: int = 0  # 每个微批的股票数，0 时按可用内存估算
+    max_batch_size: int = 64  # 估算的微批大小上限
+    batch_memory_fraction: float = 0.5  # 估算时可占用的可用内存比例
+
 
 @dataclass
 class PredictionResult:
@@ -190,13 +209,24 @@ class KronosPredictorService:
             print(f"⚠️ Failed to load from hub: {e}")
             raise RuntimeError(f"模型加载失败: {e}")
 
+        import torch
+        if self.config.num_threads > 0:
+            torch.set_num_threads(self.config.num_threads)
+        if self.config.quantize:
+            if self.config.device.startswith('cpu'):
+                self._model = quantize_dynamic_int8(self._model)
+                print("✅ Model quantized to int8 (dynamic)")
+            else:
+                print(f"⚠️ int8 动态量化仅支持 CPU，{self.config.device} 上使用 fp32")
+
         self._predictor = KronosPredictor(
             self._model,
             self._tokenizer,
             device=self.config.device,
-            max_context=self.config.max_context
+            max_context=self.config.max_context,
+            use_kv_cache=self.config.use_kv_cache
         )
-        print(f"✅ Model loaded on {self.config.device}")
+        print(f"✅ Model loaded on {self.config.device} ({torch.get_num_threads()} threads)")
 
     def get_stock_name(self, symbol: str) -> str:
         """从数据库获取股票名称"""
@@ -223,6 +253,42 @@ class KronosPredictorService:
             print(f"⚠️ Failed to get stock name: {e}")
             return "Unknown"
 
+    def get_stock_names(self, symbols: List[str]) -> Dict[str, str]:
+        """
+        批量获取股票名称（每个市场一条查询）
+
+        Returns:
+            dict: {symbol: 股票名称}，查不到的为 "Unknown"
+        """
+        parsed = {symbol: self._parse_symbol(symbol) for symbol in symbols}
+        missing = {}
+        for market, code_int in parsed.values():
+            if f"{market}.{code_int}" not in self._stock_name_cache:
+                missing.setdefault(market, set()).add(code_int)
+
+        query = text("""
+            SELECT market, code_int, name FROM stock_basic_info
+            WHERE market = :market AND code_int IN :code_ints
+        """).bindparams(bindparam('code_ints', expanding=True))
+        try:
+            with self._engine.connect() as conn:
+                for market, code_ints in missing.items():
+                    code_ints = sorted(code_ints)
+                    for i in range(0, len(code_ints), CODES_PER_QUERY):
+                        rows = conn.execute(query, {
+                            'market': market,
+                            'code_ints': code_ints[i:i + CODES_PER_QUERY],
+                        }).fetchall()
+                        for row_market, row_code, name in rows:
+                            self._stock_name_cache.setdefault(f"{row_market}.{int(row_code)}", name)
+        except Exception as e:
+            print(f"⚠️ Failed to get stock names: {e}")
+
+        return {
+            symbol: self._stock_name_cache.get(f"{market}.{code_int}", "Unknown")
+            for symbol, (market, code_int) in parsed.items()
+        }
+
     def _parse_symbol(self, symbol: str) -> Tuple[str, int]:
         """解析股票代码，返回 (market, code_int)"""
         if symbol.startswith(('sh.', 'sz.')):
@@ -266,6 +332,59 @@ class KronosPredictorService:
         except Exception as e:
             raise RuntimeError(f"Failed to fetch data for {symbol}: {e}")
 
+    def load_data_batch(self, symbols: List[str]) -> Dict[str, pd.DataFrame]:
+        """
+        批量获取多只股票的历史数据（每个市场按 IN 列表分块查询，而不是每只股票一条查询）
+
+        Returns:
+            dict: {symbol: 清洗后的 DataFrame}，无数据的股票不在结果中
+        """
+        end_date = datetime.datetime.now().strftime('%Y-%m-%d')
+        start_date = (
+            datetime.datetime.now() - datetime.timedelta(days=self.config.lookback)
+        ).strftime('%Y-%m-%d')
+
+        symbols_by_key = {}
+        codes_by_market = {}
+        for symbol in symbols:
+            market, code_int = self._parse_symbol(symbol)
+            symbols_by_key.setdefault((market, code_int), []).append(symbol)
+            codes_by_market.setdefault(market, set()).add(code_int)
+
+        query = text("""
+            SELECT market, code_int, date, open, high, low, close, volume, amount
+            FROM stock_daily_data
+            WHERE market = :market
+              AND code_int IN :code_ints
+              AND frequency = 'd'
+              AND date BETWEEN :start_date AND :end_date
+        """).bindparams(bindparam('code_ints', expanding=True))
+
+        print(f"📥 Fetching daily data for {len(symbols_by_key)} stocks from database...")
+        frames = []
+        with self._engine.connect() as conn:
+            for market, code_ints in codes_by_market.items():
+                code_ints = sorted(code_ints)
+                for i in range(0, len(code_ints), CODES_PER_QUERY):
+                    frames.append(pd.read_sql(query, conn, params={
+                        'market': market,
+                        'code_ints': code_ints[i:i + CODES_PER_QUERY],
+                        'start_date': start_date,
+                        'end_date': end_date,
+                    }))
+
+        data = {}
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return data
+        for (market, code_int), df in pd.concat(frames, ignore_index=True).groupby(['market', 'code_int']):
+            df = self._clean_data(df.drop(columns=['market', 'code_int']))
+            if df.empty:
+                continue
+            for symbol in symbols_by_key.get((market, int(code_int)), []):
+                data[symbol] = df
+        return data
+
     def _clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """数据清洗"""
         df['date'] = pd.to_datetime(df['date'])
@@ -356,24 +475,50 @@ class KronosPredictorService:
         Returns:
             PredictionResult: 预测结果对象
         """
-        # 确保模型已加载
-        self._ensure_model_loaded()
-
-        # 解析股票代码
-        market, code_int = self._parse_symbol(symbol)
-        formatted_symbol = f"{market}.{code_int}"
-
         # 获取股票名称
         stock_name = self.get_stock_name(symbol)
 
         # 加载数据
         df = self.load_data(symbol)
 
+        result = self.predict_history(symbol, df, stock_name)
+
+        # 保存文件
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            self._save_outputs(result, output_dir, save_csv, save_chart)
+
+        return result
+
+    def predict_history(
+            self,
+            symbol: str,
+            df: pd.DataFrame,
+            stock_name: Optional[str] = None
+    ) -> PredictionResult:
+        """
+        对已加载的历史数据执行预测（不查询数据库中的 K 线）
+
+        Args:
+            symbol: 股票代码
+            df: 清洗后的历史数据（见 _clean_data），按日期升序
+            stock_name: 股票名称，为 None 时从数据库获取
+
+        Returns:
+            PredictionResult: 预测结果对象
+        """
+        # 确保模型已加载
+        self._ensure_model_loaded()
+
+        market, code_int = self._parse_symbol(symbol)
+        if stock_name is None:
+            stock_name = self.get_stock_name(symbol)
+
         # 准备输入
         x_df, x_timestamp, y_timestamp = self._prepare_inputs(df)
 
         # 生成预测
-        print(f"🔮 Generating predictions for {formatted_symbol}...")
+        print(f"🔮 Generating predictions for {market}.{code_int}...")
         pred_df = self._predictor.predict(
             df=x_df,
             x_timestamp=x_timestamp,
@@ -383,6 +528,20 @@ class KronosPredictorService:
             top_p=self.config.top_p,
             sample_count=self.config.sample_count,
         )
+
+        return self._build_result(symbol, stock_name, df, pred_df, y_timestamp)
+
+    def _build_result(
+            self,
+            symbol: str,
+            stock_name: str,
+            df: pd.DataFrame,
+            pred_df: pd.DataFrame,
+            y_timestamp: pd.Series
+    ) -> PredictionResult:
+        """模型输出 -> 涨跌停限制、合并历史数据、计算涨跌幅"""
+        market, code_int = self._parse_symbol(symbol)
+        formatted_symbol = f"{market}.{code_int}"
         pred_df["date"] = y_timestamp.values
 
         # 应用涨跌停限制
@@ -405,8 +564,7 @@ class KronosPredictorService:
                 (pred_df['close'].iloc[-1] - last_close) / last_close * 100
         )
 
-        # 创建结果对象
-        result = PredictionResult(
+        return PredictionResult(
             symbol=formatted_symbol,
             stock_name=stock_name,
             historical_df=df,
@@ -416,12 +574,117 @@ class KronosPredictorService:
             predicted_change_pct=pred_change_pct
         )
 
-        # 保存文件
-        if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
-            self._save_outputs(result, output_dir, save_csv, save_chart)
+    def _micro_batch_size(self, seq_len: int) -> int:
+        """
+        单次 predict_batch 的股票数
 
-        return result
+        config.batch_size > 0 时直接使用；否则按每条序列的峰值内存（注意力分数、KV 缓存、
+        前馈激活和 s1 logits，每只股票展开 sample_count 条）和可用内存估算，
+        不超过 config.max_batch_size。非 CPU 设备或无法获取可用内存时使用 max_batch_size。
+        """
+        if self.config.batch_size > 0:
+            return self.config.batch_size
+        if not self.config.device.startswith('cpu'):
+            return self.config.max_batch_size
+
+        if PSUTIL_AVAILABLE:
+            available = psutil.virtual_memory().available
+        else:
+            try:
+                available = os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+            except (ValueError, OSError, AttributeError):
+                return self.config.max_batch_size
+
+        model = self._model
+        length = min(seq_len + self.config.pred_len, self.config.max_context)
+        floats_per_row = length * (
+            model.n_heads * length
+            + (2 * model.n_layers + 2) * model.d_model
+            + model.ff_dim + 4 * model.d_model
+            + 2 ** model.s1_bits
+        )
+        # float32，再留一倍余量给分词器编码和中间张量
+        bytes_per_series = floats_per_row * 4 * 2 * max(1, self.config.sample_count)
+        size = int(available * self.config.batch_memory_fraction // bytes_per_series)
+        return max(1, min(size, self.config.max_batch_size))
+
+    def predict_many(
+            self,
+            symbols: List[str],
+            output_dir: Optional[str] = None,
+            save_csv: bool = True,
+            save_chart: bool = True
+    ) -> Tuple[List[PredictionResult], Dict[str, str]]:
+        """
+        批量预测：一次加载全部历史数据，按序列长度分组后以微批调用 predict_batch
+
+        predict_batch 要求同一批内历史长度相同，停牌、次新股等长度不同的股票各自成组；
+        每组按 _micro_batch_size 切分，整个微批一次自回归解码。
+
+        Args:
+            symbols: 股票代码列表
+            output_dir: 输出目录，为 None 时不保存文件
+            save_csv: 是否保存 CSV
+            save_chart: 是否保存图表
+
+        Returns:
+            tuple: (预测结果列表（与 symbols 顺序一致，失败的除外）, {失败的股票代码: 原因})
+        """
+        self._ensure_model_loaded()
+
+        symbols = list(dict.fromkeys(symbols))
+        failures = {}
+        try:
+            data = self.load_data_batch(symbols)
+        except Exception as e:
+            return [], {symbol: f"Failed to fetch data: {e}" for symbol in symbols}
+        names = self.get_stock_names([symbol for symbol in symbols if symbol in data])
+
+        # 按历史长度分组
+        groups = {}
+        for symbol in symbols:
+            if symbol not in data:
+                failures[symbol] = "No data found"
+                continue
+            x_df, x_timestamp, y_timestamp = self._prepare_inputs(data[symbol])
+            groups.setdefault(len(x_df), []).append((symbol, x_df, x_timestamp, y_timestamp))
+
+        results = {}
+        for seq_len, items in sorted(groups.items()):
+            step = self._micro_batch_size(seq_len)
+            for start in range(0, len(items), step):
+                chunk = items[start:start + step]
+                print(f"🔮 Generating predictions for {len(chunk)} stocks (length {seq_len})...")
+                try:
+                    pred_dfs = self._predictor.predict_batch(
+                        df_list=[item[1] for item in chunk],
+                        x_timestamp_list=[item[2] for item in chunk],
+                        y_timestamp_list=[item[3] for item in chunk],
+                        pred_len=self.config.pred_len,
+                        T=self.config.temperature,
+                        top_p=self.config.top_p,
+                        sample_count=self.config.sample_count,
+                        verbose=False,
+                    )
+                except Exception as e:
+                    for item in chunk:
+                        failures[item[0]] = str(e)
+                    continue
+
+                for (symbol, _, _, y_timestamp), pred_df in zip(chunk, pred_dfs):
+                    try:
+                        results[symbol] = self._build_result(
+                            symbol, names[symbol], data[symbol], pred_df.reset_index(drop=True), y_timestamp
+                        )
+                    except Exception as e:
+                        failures[symbol] = str(e)
+
+        ordered = [results[symbol] for symbol in symbols if symbol in results]
+        if output_dir and (save_csv or save_chart):
+            os.makedirs(output_dir, exist_ok=True)
+            for result in ordered:
+                self._save_outputs(result, output_dir, save_csv, save_chart)
+        return ordered, failures
 
     def _save_outputs(
             self,
@@ -565,6 +828,9 @@ def batch_predict(
     """
     批量预测多只股票
 
+    历史数据一次加载，模型按微批并行预测（见 KronosPredictorService.predict_many），
+    报告在全部预测完成后一次写出。
+
     Args:
         symbols: 股票代码列表
         output_dir: 输出目录
@@ -575,34 +841,29 @@ def batch_predict(
         预测结果列表
     """
     service = KronosPredictorService(config)
-    results = []
 
-    # 创建报告文件
     if report_path is None:
         date_str = datetime.datetime.now().strftime("%Y%m%d")
         report_path = os.path.join(output_dir, f"{date_str}_report.csv")
 
+    results, failures = service.predict_many(symbols, output_dir)
+    for symbol, reason in failures.items():
+        print(f"❌ Failed to predict {symbol}: {reason}")
+
+    report = pd.DataFrame(
+        [{
+            "code": result.symbol,
+            "name": result.stock_name,
+            "last_close": f"{result.last_close:.2f}",
+            "pred_close_max": f"{result.prediction_df['close'].max():.2f}",
+            "change_pct": f"{result.predicted_change_pct:+.2f}",
+            "pred_days": len(result.prediction_df),
+        } for result in results],
+        columns=["code", "name", "last_close", "pred_close_max", "change_pct", "pred_days"]
+    )
     os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
-
-    with open(report_path, "w", encoding="utf-8") as f:
-        f.write("code,name,last_close,pred_close_max,change_pct,pred_days\n")
-
-    for symbol in symbols:
-        try:
-            result = service.predict(symbol, output_dir)
-            results.append(result)
-
-            # 追加报告
-            with open(report_path, "a", encoding="utf-8") as f:
-                f.write(
-                    f"{result.symbol},{result.stock_name},"
-                    f"{result.last_close:.2f},"
-                    f"{result.prediction_df['close'].max():.2f},"
-                    f"{result.predicted_change_pct:+.2f},"
-                    f"{len(result.prediction_df)}\n"
-                )
-        except Exception as e:
-            print(f"❌ Failed to predict {symbol}: {e}")
+    report.to_csv(report_path, index=False, encoding="utf-8")
+    print(f"✅ Report saved: {report_path} ({len(results)}/{len(symbols)} stocks)")
 
     return results
 
@@ -631,6 +892,10 @@ if __name__ == '__main__':
     parser.add_argument('--device', type=str, default='cpu', 
                         choices=['cpu', 'cuda', 'cuda:0', 'cuda:1'],
                         help='计算设备（默认: cpu）')
+    parser.add_argument('--quantize', action='store_true',
+                        help='CPU 上使用 int8 动态量化')
+    parser.add_argument('--threads', type=int, default=0,
+                        help='torch 线程数（默认: 0，使用 torch 默认值）')
     
     args = parser.parse_args()
     
@@ -644,6 +909,7 @@ if __name__ == '__main__':
     print(f"采样概率: {args.top_p}")
     print(f"采样次数: {args.sample_count}")
     print(f"计算设备: {args.device}")
+    print(f"int8量化: {'是' if args.quantize else '否'}")
     print("=" * 50)
     
     # 检查 Kronos 模块是否可用
@@ -663,7 +929,9 @@ if __name__ == '__main__':
             temperature=args.temperature,
             top_p=args.top_p,
             sample_count=args.sample_count,
-            device=args.device
+            device=args.device,
+            quantize=args.quantize,
+            num_threads=args.threads
         )
         
         # 创建服务
@@ -1,4 +1,4 @@
-from .kronos import KronosTokenizer, Kronos, KronosPredictor
+from .kronos import KronosTokenizer, Kronos, KronosPredictor, quantize_dynamic_int8
 
 model_dict = {
     'kronos_tokenizer': KronosTokenizer,
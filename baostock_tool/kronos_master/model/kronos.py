@@ -274,7 +274,22 @@ class Kronos(nn.Module, PyTorchModelHubMixin):
         s2_logits = self.head.cond_forward(x2)
         return s1_logits, s2_logits
 
-    def decode_s1(self, s1_ids, s2_ids, stamp=None, padding_mask=None):
+    def init_kv_cache(self, max_context):
+        """
+        Creates empty caches for incremental decoding (see `decode_s1` / `decode_s2`).
+
+        Args:
+            max_context (int): Sliding-window size; the oldest position is evicted beyond it.
+
+        Returns:
+            dict: {'blocks': one KVCache per Transformer block, 'dep': KVCache for the dependency-aware layer}
+        """
+        return {
+            'blocks': [KVCache(max_context) for _ in range(self.n_layers)],
+            'dep': KVCache(max_context),
+        }
+
+    def decode_s1(self, s1_ids, s2_ids, stamp=None, padding_mask=None, kv_cache=None):
         """
         Decodes only the s1 tokens.
 
@@ -286,6 +301,8 @@ class Kronos(nn.Module, PyTorchModelHubMixin):
             s2_ids (torch.Tensor): Input tensor of s2 token IDs. Shape: [batch_size, seq_len]
             stamp (torch.Tensor, optional): Temporal stamp tensor. Shape: [batch_size, seq_len]. Defaults to None.
             padding_mask (torch.Tensor, optional): Mask for padding tokens. Shape: [batch_size, seq_len]. Defaults to None.
+            kv_cache (dict, optional): Caches from `init_kv_cache`. When given, the inputs are only the new
+                tokens (the whole prompt on the first call, then one token per step) and padding_mask is ignored.
 
         Returns:
             Tuple[torch.Tensor, torch.Tensor]:
@@ -298,15 +315,19 @@ class Kronos(nn.Module, PyTorchModelHubMixin):
             x = x + time_embedding
         x = self.token_drop(x)
 
-        for layer in self.transformer:
-            x = layer(x, key_padding_mask=padding_mask)
+        if kv_cache is not None:
+            for layer, layer_cache in zip(self.transformer, kv_cache['blocks']):
+                x = layer(x, kv_cache=layer_cache)
+        else:
+            for layer in self.transformer:
+                x = layer(x, key_padding_mask=padding_mask)
 
         x = self.norm(x)
 
         s1_logits = self.head(x)
         return s1_logits, x
 
-    def decode_s2(self, context, s1_ids, padding_mask=None):
+    def decode_s2(self, context, s1_ids, padding_mask=None, kv_cache=None):
         """
         Decodes the s2 tokens, conditioned on the context and s1 tokens.
 
@@ -318,15 +339,44 @@ class Kronos(nn.Module, PyTorchModelHubMixin):
                                      Shape: [batch_size, seq_len, d_model]
             s1_ids (torch.torch.Tensor): Input tensor of s1 token IDs. Shape: [batch_size, seq_len]
             padding_mask (torch.Tensor, optional): Mask for padding tokens. Shape: [batch_size, seq_len]. Defaults to None.
+            kv_cache (dict, optional): Caches from `init_kv_cache`. When given, context holds only the new
+                positions returned by the matching `decode_s1` call and s1_ids a single token.
 
         Returns:
-            torch.Tensor: s2 logits. Shape: [batch_size, seq_len, s2_vocab_size]
+            torch.Tensor: s2 logits. Shape: [batch_size, seq_len, s2_vocab_size] ([batch_size, 1, s2_vocab_size] with kv_cache)
         """
         sibling_embed = self.embedding.emb_s1(s1_ids)
-        x2 = self.dep_layer(context, sibling_embed, key_padding_mask=padding_mask)
+        x2 = self.dep_layer(context, sibling_embed, key_padding_mask=padding_mask,
+                            kv_cache=kv_cache['dep'] if kv_cache is not None else None)
         return self.head.cond_forward(x2)
 
 
+def quantize_dynamic_int8(model, module_types=(TransformerBlock, FeedForward, DualHead)):
+    """
+    Apply dynamic int8 quantization (CPU only) to the nn.Linear layers inside the given module types.
+
+    Weights are stored as int8 and activations are quantized on the fly, so the matmuls in the
+    attention projections, feed-forward network and prediction heads run through the int8 kernels.
+    Embeddings, norms and the remaining Linear layers stay in fp32. The model is modified in place.
+
+    Args:
+        model (nn.Module): Model to quantize, e.g. Kronos.
+        module_types (tuple): Module classes whose Linear layers are quantized.
+
+    Returns:
+        nn.Module: The quantized model (same object), in eval mode.
+    """
+    quantization = getattr(torch, 'ao', torch).quantization
+    model.eval()
+    targets = [module for module in model.modules() if isinstance(module, module_types)]
+    # Skip modules nested in another target (e.g. FeedForward inside TransformerBlock); they are covered by their parent.
+    nested = {id(child) for module in targets for child in module.modules() if child is not module}
+    for module in targets:
+        if id(module) not in nested:
+            quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
 def top_k_top_p_filtering(
         logits,
         top_k: int = 0,
@@ -385,7 +435,102 @@ def sample_from_logits(logits, temperature=1.0, top_k=None, top_p=None, sample_l
     return x
 
 
-def auto_regressive_inference(tokenizer, model, x, x_stamp, y_stamp, max_context, pred_len, clip=5, T=1.0, top_k=0, top_p=0.99, sample_count=5, verbose=False):
+def _kv_cached_generate(model, x_token, full_stamp, max_context, pred_len, T, top_k, top_p, verbose):
+    """
+    Incremental generation: the prompt is encoded once, then every step runs only the new token
+    through the model against the cached keys/values.
+
+    Identical to the window-recompute path while prompt + generated tokens fit in max_context; beyond
+    that the cache slides (the oldest position is evicted), whereas the recompute path re-encodes the
+    shifted window from scratch.
+    """
+    initial_seq_len = x_token[0].size(1)
+    batch_size = x_token[0].size(0)
+    generated_pre = x_token[0].new_empty(batch_size, pred_len)
+    generated_post = x_token[1].new_empty(batch_size, pred_len)
+
+    cache = model.init_kv_cache(max_context)
+    start_idx = max(0, initial_seq_len - max_context)
+    s1_logits, context = model.decode_s1(x_token[0][:, start_idx:], x_token[1][:, start_idx:],
+                                         full_stamp[:, start_idx:initial_seq_len].contiguous(), kv_cache=cache)
+
+    ran = trange if verbose else range
+    for i in ran(pred_len):
+        sample_pre = sample_from_logits(s1_logits[:, -1, :], temperature=T, top_k=top_k, top_p=top_p, sample_logits=True)
+        s2_logits = model.decode_s2(context, sample_pre, kv_cache=cache)
+        sample_post = sample_from_logits(s2_logits[:, -1, :], temperature=T, top_k=top_k, top_p=top_p, sample_logits=True)
+
+        generated_pre[:, i] = sample_pre.squeeze(-1)
+        generated_post[:, i] = sample_post.squeeze(-1)
+
+        if i + 1 < pred_len:
+            pos = initial_seq_len + i
+            s1_logits, context = model.decode_s1(sample_pre, sample_post, full_stamp[:, pos:pos + 1].contiguous(),
+                                                 kv_cache=cache)
+    return generated_pre, generated_post
+
+
+def _window_recompute_generate(model, x_token, full_stamp, max_context, pred_len, T, top_k, top_p, verbose):
+    """
+    Reference generation: every step re-encodes the whole context window (up to max_context tokens).
+    """
+    initial_seq_len = x_token[0].size(1)
+    batch_size = x_token[0].size(0)
+    generated_pre = x_token[0].new_empty(batch_size, pred_len)
+    generated_post = x_token[1].new_empty(batch_size, pred_len)
+
+    pre_buffer = x_token[0].new_zeros(batch_size, max_context)
+    post_buffer = x_token[1].new_zeros(batch_size, max_context)
+    buffer_len = min(initial_seq_len, max_context)
+    if buffer_len > 0:
+        start_idx = max(0, initial_seq_len - max_context)
+        pre_buffer[:, :buffer_len] = x_token[0][:, start_idx:start_idx + buffer_len]
+        post_buffer[:, :buffer_len] = x_token[1][:, start_idx:start_idx + buffer_len]
+
+    if verbose:
+        ran = trange
+    else:
+        ran = range
+    for i in ran(pred_len):
+        current_seq_len = initial_seq_len + i
+        window_len = min(current_seq_len, max_context)
+
+        if current_seq_len <= max_context:
+            input_tokens = [
+                pre_buffer[:, :window_len],
+                post_buffer[:, :window_len]
+            ]
+        else:
+            input_tokens = [pre_buffer, post_buffer]
+
+        context_end = current_seq_len
+        context_start = max(0, context_end - max_context)
+        current_stamp = full_stamp[:, context_start:context_end, :].contiguous()
+
+        s1_logits, context = model.decode_s1(input_tokens[0], input_tokens[1], current_stamp)
+        s1_logits = s1_logits[:, -1, :]
+        sample_pre = sample_from_logits(s1_logits, temperature=T, top_k=top_k, top_p=top_p, sample_logits=True)
+
+        s2_logits = model.decode_s2(context, sample_pre)
+        s2_logits = s2_logits[:, -1, :]
+        sample_post = sample_from_logits(s2_logits, temperature=T, top_k=top_k, top_p=top_p, sample_logits=True)
+
+        generated_pre[:, i] = sample_pre.squeeze(-1)
+        generated_post[:, i] = sample_post.squeeze(-1)
+
+        if current_seq_len < max_context:
+            pre_buffer[:, current_seq_len] = sample_pre.squeeze(-1)
+            post_buffer[:, current_seq_len] = sample_post.squeeze(-1)
+        else:
+            pre_buffer.copy_(torch.roll(pre_buffer, shifts=-1, dims=1))
+            post_buffer.copy_(torch.roll(post_buffer, shifts=-1, dims=1))
+            pre_buffer[:, -1] = sample_pre.squeeze(-1)
+            post_buffer[:, -1] = sample_post.squeeze(-1)
+
+    return generated_pre, generated_post
+
+
+def auto_regressive_inference(tokenizer, model, x, x_stamp, y_stamp, max_context, pred_len, clip=5, T=1.0, top_k=0, top_p=0.99, sample_count=5, verbose=False, use_kv_cache=True):
     with torch.no_grad():
         x = torch.clip(x, -clip, clip)
 
@@ -397,60 +542,15 @@ def auto_regressive_inference(tokenizer, model, x, x_stamp, y_stamp, max_context
         x_token = tokenizer.encode(x, half=True)
         
         initial_seq_len = x.size(1)
-        batch_size = x_token[0].size(0)
         total_seq_len = initial_seq_len + pred_len
         full_stamp = torch.cat([x_stamp, y_stamp], dim=1)
 
-        generated_pre = x_token[0].new_empty(batch_size, pred_len)
-        generated_post = x_token[1].new_empty(batch_size, pred_len)
-
-        pre_buffer = x_token[0].new_zeros(batch_size, max_context)
-        post_buffer = x_token[1].new_zeros(batch_size, max_context)
-        buffer_len = min(initial_seq_len, max_context)
-        if buffer_len > 0:
-            start_idx = max(0, initial_seq_len - max_context)
-            pre_buffer[:, :buffer_len] = x_token[0][:, start_idx:start_idx + buffer_len]
-            post_buffer[:, :buffer_len] = x_token[1][:, start_idx:start_idx + buffer_len]
-
-        if verbose:
-            ran = trange
+        if use_kv_cache:
+            generated_pre, generated_post = _kv_cached_generate(model, x_token, full_stamp, max_context, pred_len,
+                                                                T, top_k, top_p, verbose)
         else:
-            ran = range
-        for i in ran(pred_len):
-            current_seq_len = initial_seq_len + i
-            window_len = min(current_seq_len, max_context)
-
-            if current_seq_len <= max_context:
-                input_tokens = [
-                    pre_buffer[:, :window_len],
-                    post_buffer[:, :window_len]
-                ]
-            else:
-                input_tokens = [pre_buffer, post_buffer]
-
-            context_end = current_seq_len
-            context_start = max(0, context_end - max_context)
-            current_stamp = full_stamp[:, context_start:context_end, :].contiguous()
-
-            s1_logits, context = model.decode_s1(input_tokens[0], input_tokens[1], current_stamp)
-            s1_logits = s1_logits[:, -1, :]
-            sample_pre = sample_from_logits(s1_logits, temperature=T, top_k=top_k, top_p=top_p, sample_logits=True)
-
-            s2_logits = model.decode_s2(context, sample_pre)
-            s2_logits = s2_logits[:, -1, :]
-            sample_post = sample_from_logits(s2_logits, temperature=T, top_k=top_k, top_p=top_p, sample_logits=True)
-
-            generated_pre[:, i] = sample_pre.squeeze(-1)
-            generated_post[:, i] = sample_post.squeeze(-1)
-
-            if current_seq_len < max_context:
-                pre_buffer[:, current_seq_len] = sample_pre.squeeze(-1)
-                post_buffer[:, current_seq_len] = sample_post.squeeze(-1)
-            else:
-                pre_buffer.copy_(torch.roll(pre_buffer, shifts=-1, dims=1))
-                post_buffer.copy_(torch.roll(post_buffer, shifts=-1, dims=1))
-                pre_buffer[:, -1] = sample_pre.squeeze(-1)
-                post_buffer[:, -1] = sample_post.squeeze(-1)
+            generated_pre, generated_post = _window_recompute_generate(model, x_token, full_stamp, max_context,
+                                                                       pred_len, T, top_k, top_p, verbose)
 
         full_pre = torch.cat([x_token[0], generated_pre], dim=1)
         full_post = torch.cat([x_token[1], generated_post], dim=1)
@@ -480,11 +580,13 @@ def calc_time_stamps(x_timestamp):
 
 class KronosPredictor:
 
-    def __init__(self, model, tokenizer, device="cuda:0", max_context=512, clip=5):
+    def __init__(self, model, tokenizer, device="cuda:0", max_context=512, clip=5, use_kv_cache=True):
         self.tokenizer = tokenizer
         self.model = model
         self.max_context = max_context
         self.clip = clip
+        # Incremental decoding with a sliding-window KV cache; False re-encodes the window every step.
+        self.use_kv_cache = use_kv_cache
         self.price_cols = ['open', 'high', 'low', 'close']
         self.vol_col = 'volume'
         self.amt_vol = 'amount'
@@ -501,7 +603,7 @@ class KronosPredictor:
         y_stamp_tensor = torch.from_numpy(np.array(y_stamp).astype(np.float32)).to(self.device)
 
         preds = auto_regressive_inference(self.tokenizer, self.model, x_tensor, x_stamp_tensor, y_stamp_tensor, self.max_context, pred_len,
-                                          self.clip, T, top_k, top_p, sample_count, verbose)
+                                          self.clip, T, top_k, top_p, sample_count, verbose, self.use_kv_cache)
         preds = preds[:, -pred_len:, :]
         return preds
 
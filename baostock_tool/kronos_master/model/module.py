@@ -291,17 +291,25 @@ class RotaryPositionalEmbedding(nn.Module):
         self.sin_cached = None
 
     def _update_cos_sin_cache(self, x, seq_len):
-        if seq_len != self.seq_len_cached:
+        # Only grow the table: incremental decoding asks for one more position per step.
+        if self.seq_len_cached is None or seq_len > self.seq_len_cached:
             self.seq_len_cached = seq_len
             t = torch.arange(seq_len, device=x.device).type_as(self.inv_freq)
             freqs = torch.einsum('i,j->ij', t, self.inv_freq)
             emb = torch.cat((freqs, freqs), dim=-1).to(x.device)
             self.cos_cached = emb.cos()[None, None, :, :]
             self.sin_cached = emb.sin()[None, None, :, :]
-        return self.cos_cached, self.sin_cached
+        return self.cos_cached[:, :, :seq_len], self.sin_cached[:, :, :seq_len]
 
-    def forward(self, q, k):
-        cos, sin = self._update_cos_sin_cache(q, q.shape[-2])
+    def forward(self, q, k, offset=0):
+        """
+        Args:
+            q, k: [batch, n_heads, seq_len, head_dim]
+            offset (int): absolute position of the first token (used with a KV cache).
+        """
+        q_len = q.shape[-2]
+        cos, sin = self._update_cos_sin_cache(q, offset + q_len)
+        cos, sin = cos[:, :, offset:], sin[:, :, offset:]
         return (
             (q * cos) + (self._rotate_half(q) * sin),
             (k * cos) + (self._rotate_half(k) * sin),
@@ -312,6 +320,58 @@ class RotaryPositionalEmbedding(nn.Module):
         return torch.cat((-x2, x1), dim=-1)
 
 
+class KVCache:
+    """
+    Ring-buffer key/value cache for incremental (one token per step) decoding.
+
+    Keys are stored already rotated at their absolute position. RoPE attention scores only depend on
+    relative positions and a single-token query attends to every cached key without a causal mask,
+    so once `capacity` entries are stored the oldest slot is simply overwritten: a sliding window that
+    needs neither re-rotation nor re-ordering of the remaining keys.
+
+    Args:
+        capacity (int): maximum number of cached positions (the model's max_context).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.position = 0  # absolute position of the next token
+        self.k = None
+        self.v = None
+
+    @property
+    def length(self):
+        return min(self.position, self.capacity)
+
+    def append(self, k, v):
+        """
+        Store new keys/values and return the cached window.
+
+        Args:
+            k, v: [batch, n_heads, n_new, head_dim]. A multi-token chunk is only accepted as the
+                  first call (prefill) and must fit in the cache.
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: cached keys and values, [batch, n_heads, length, head_dim]
+                (slot order, not time order, once the window has wrapped).
+        """
+        n_new = k.size(-2)
+        if self.k is None:
+            self.k = k.new_empty(k.shape[:-2] + (self.capacity, k.size(-1)))
+            self.v = v.new_empty(v.shape[:-2] + (self.capacity, v.size(-1)))
+        if n_new == 1:
+            slot = self.position % self.capacity
+            self.k[:, :, slot] = k[:, :, 0]
+            self.v[:, :, slot] = v[:, :, 0]
+        else:
+            if self.position != 0 or n_new > self.capacity:
+                raise ValueError(f"KVCache prefill of {n_new} tokens needs an empty cache of capacity >= {n_new}")
+            self.k[:, :, :n_new] = k
+            self.v[:, :, :n_new] = v
+        self.position += n_new
+        return self.k[:, :, :self.length], self.v[:, :, :self.length]
+
+
 class MultiHeadAttentionWithRoPE(nn.Module):
     def __init__(self, d_model, n_heads, attn_dropout_p=0.0, resid_dropout_p=0.0):
         super().__init__()
@@ -327,13 +387,22 @@ class MultiHeadAttentionWithRoPE(nn.Module):
         self.attn_dropout_p = attn_dropout_p
         self.resid_dropout = nn.Dropout(resid_dropout_p)
 
-    def forward(self, x, key_padding_mask=None):
+    def forward(self, x, key_padding_mask=None, kv_cache=None):
         batch_size, seq_len, _ = x.shape
 
         q = self.q_proj(x).view(batch_size, seq_len, self.n_heads, self.head_dim).transpose(1, 2)
         k = self.k_proj(x).view(batch_size, seq_len, self.n_heads, self.head_dim).transpose(1, 2)
         v = self.v_proj(x).view(batch_size, seq_len, self.n_heads, self.head_dim).transpose(1, 2)
 
+        if kv_cache is not None:
+            # Incremental decoding: rotate at absolute positions, attend over the cached window.
+            # The prefill chunk is causal over itself; a single new token sees every cached key.
+            q, k = self.rotary(q, k, offset=kv_cache.position)
+            k, v = kv_cache.append(k, v)
+            attn_output = F.scaled_dot_product_attention(q, k, v, is_causal=seq_len > 1)
+            attn_output = attn_output.transpose(1, 2).contiguous().view(batch_size, seq_len, self.d_model)
+            return self.resid_dropout(self.out_proj(attn_output))
+
         q, k = self.rotary(q, k)
 
         if key_padding_mask is not None:
@@ -368,7 +437,7 @@ class MultiHeadCrossAttentionWithRoPE(nn.Module):
         self.attn_dropout_p = attn_dropout_p
         self.resid_dropout = nn.Dropout(resid_dropout)
 
-    def forward(self, query, key, value, key_padding_mask=None):
+    def forward(self, query, key, value, key_padding_mask=None, kv_cache=None):
         batch_size, q_len, _ = query.shape
         _, seq_len, _ = key.shape
 
@@ -376,6 +445,15 @@ class MultiHeadCrossAttentionWithRoPE(nn.Module):
         k = self.k_proj(key).view(batch_size, seq_len, self.n_heads, self.head_dim).transpose(1, 2)
         v = self.v_proj(value).view(batch_size, seq_len, self.n_heads, self.head_dim).transpose(1, 2)
 
+        if kv_cache is not None:
+            # Incremental decoding with a single-token query: key/value hold only the new context
+            # tokens. The uncached path rotates q and every k at position 0 in this case (identity),
+            # so cached keys are stored unrotated.
+            k, v = kv_cache.append(k, v)
+            attn_output = F.scaled_dot_product_attention(q, k, v)
+            attn_output = attn_output.transpose(1, 2).contiguous().view(batch_size, q_len, self.d_model)
+            return self.resid_dropout(self.out_proj(attn_output))
+
         q, k = self.rotary(q, k)
 
         if key_padding_mask is not None:
@@ -449,16 +527,21 @@ class DependencyAwareLayer(nn.Module):
         self.cross_attn = MultiHeadCrossAttentionWithRoPE(d_model, n_heads, attn_dropout_p, resid_dropout)
         self.norm = RMSNorm(d_model)
 
-    def forward(self, hidden_states, sibling_embed, key_padding_mask=None):
+    def forward(self, hidden_states, sibling_embed, key_padding_mask=None, kv_cache=None):
         """hidden_states: [batch, seq_len, d_model]
         sibling_embed: Embedding from another subtoken
+        kv_cache: KVCache for incremental decoding. hidden_states then holds only the new context
+            tokens, sibling_embed a single token, and the output is [batch, 1, d_model] for the newest position.
         """
         attn_out = self.cross_attn(
             query=sibling_embed,
             key=hidden_states,
             value=hidden_states,
-            key_padding_mask=key_padding_mask
+            key_padding_mask=key_padding_mask,
+            kv_cache=kv_cache
         )
+        if kv_cache is not None:
+            hidden_states = hidden_states[:, -1:]
         return self.norm(hidden_states + attn_out)
 
 
@@ -470,10 +553,10 @@ class TransformerBlock(nn.Module):
         self.norm2 = RMSNorm(d_model)
         self.ffn = FeedForward(d_model, ff_dim, ffn_dropout_p)
 
-    def forward(self, x, key_padding_mask=None):
+    def forward(self, x, key_padding_mask=None, kv_cache=None):
         residual = x
         x = self.norm1(x)
-        attn_out = self.self_attn(x, key_padding_mask=key_padding_mask)
+        attn_out = self.self_attn(x, key_padding_mask=key_padding_mask, kv_cache=kv_cache)
         x = residual + attn_out
 
         residual = x
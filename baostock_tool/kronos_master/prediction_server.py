@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+KronosPredictionServer - Web 端常驻的 Kronos 预测服务
+
+/api/kronos_predict（webui/app.py 与 webui/backtest_viewer.py）共用一个进程内实例：
+1. 分词器和模型只在第一次预测时加载，之后常驻内存
+2. 预测结果按 (股票, 最新数据日期, 历史天数, 预测天数, 温度, top_p, 采样次数) 做 LRU 缓存，
+   同一只股票当天重复请求直接返回缓存结果
+3. 股票的最新数据日期缓存 latest_date_ttl 秒；过期后重新查询，发现新 K 线时清除该股票的旧预测
+
+配置见 config.ini [kronos]。
+
+使用方式：
+    server = get_prediction_server()
+    payload = server.predict('sh', '600000', lookback_days=60, pred_len=5,
+                             temperature=0.5, top_p=0.5, sample_count=5)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from datetime import timedelta
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL
+
+from baostock_tool import config
+from baostock_tool.utils.logger_utils.logger_tool import get_logger
+
+
+logger = get_logger(__name__)
+
+HISTORY_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume', 'amount', 'pctChg']
+
+_LATEST_DATE_SQL = text("""
+    SELECT MAX(date) FROM stock_daily_data
+    WHERE market = :market AND code_int = :code_int AND frequency = 'd'
+""")
+
+_HISTORY_SQL = text(f"""
+    SELECT {', '.join(HISTORY_COLUMNS)}
+    FROM stock_daily_data
+    WHERE market = :market
+      AND code_int = :code_int
+      AND frequency = 'd'
+      AND date >= :start_date
+      AND date <= :end_date
+    ORDER BY date DESC
+    LIMIT :limit
+""")
+
+_NAME_SQL = text("""
+    SELECT name FROM stock_basic_info
+    WHERE market = :market AND code_int = :code_int
+    LIMIT 1
+""")
+
+
+def bars_to_records(df, is_prediction):
+    """
+    K 线 DataFrame 转为前端使用的字典列表（向量化，不逐行迭代）
+
+    Args:
+        df: 包含 date 和 OHLCV 列的 DataFrame，可不含 pctChg
+        is_prediction (bool): 是否为预测数据
+
+    Returns:
+        list: [{date, open, high, low, close, volume, amount, pctChg, isPrediction}, ...]
+    """
+    out = pd.DataFrame({'date': pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')})
+    for col in ('open', 'high', 'low', 'close', 'amount'):
+        out[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(float).to_numpy()
+    out['volume'] = pd.to_numeric(df['volume'], errors='coerce').fillna(0).astype('int64').to_numpy()
+    if 'pctChg' in df.columns and not is_prediction:
+        out['pctChg'] = pd.to_numeric(df['pctChg'], errors='coerce').fillna(0).astype(float).to_numpy()
+    else:
+        out['pctChg'] = 0
+    out['isPrediction'] = is_prediction
+    return out[HISTORY_COLUMNS + ['isPrediction']].to_dict('records')
+
+
+class KronosPredictionServer:
+    """
+    常驻模型 + 预测结果 LRU 缓存
+
+    线程安全：缓存读写和模型推理分别加锁，Flask 多线程下同一时刻只有一个请求在推理。
+    """
+
+    def __init__(self, engine=None, kronos_config=None):
+        """
+        Args:
+            engine: SQLAlchemy 引擎，为 None 时按 [database] 创建
+            kronos_config (dict, optional): 同 config.get_kronos_config()
+        """
+        self.kronos_config = kronos_config or config.get_kronos_config()
+        if engine is None:
+            db_config = config.get_db_config()
+            engine = create_engine(URL.create(
+                drivername="mysql+pymysql",
+                username=db_config["user"],
+                password=db_config["password"],
+                host=db_config["host"],
+                port=db_config["port"],
+                database=db_config["database"],
+                query={"charset": "utf8mb4"}
+            ), pool_pre_ping=True, pool_recycle=3600)
+        self.engine = engine
+
+        self._service = None
+        self._cache = OrderedDict()
+        self._latest = {}  # (market, code_int) -> (最新数据日期, 查询时间)
+        self._names = {}
+        self._cache_lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # 最新数据日期与缓存失效
+    # ------------------------------------------------------------------
+    def latest_date(self, market, code_int):
+        """股票最新日线日期（缓存 latest_date_ttl 秒），无数据时返回 None"""
+        key = (market, int(code_int))
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._latest.get(key)
+        if cached is not None and now - cached[1] < self.kronos_config['latest_date_ttl']:
+            return cached[0]
+
+        with self.engine.connect() as conn:
+            latest = conn.execute(_LATEST_DATE_SQL, {'market': market, 'code_int': int(code_int)}).scalar()
+        if latest is None:
+            return None
+        latest = pd.Timestamp(latest).date()
+
+        with self._cache_lock:
+            if cached is not None and cached[0] != latest:
+                # 有新 K 线：该股票基于旧数据的预测全部失效
+                self._drop(key)
+            self._latest[key] = (latest, now)
+        return latest
+
+    def _drop(self, stock_key):
+        """删除某只股票的全部缓存预测（调用方持有 _cache_lock）"""
+        for cache_key in [k for k in self._cache if k[:2] == stock_key]:
+            del self._cache[cache_key]
+
+    def invalidate(self, market=None, code_int=None):
+        """
+        手动清除缓存（如采集任务写入新 K 线后）
+
+        Args:
+            market, code_int: 指定股票；均为 None 时清空全部缓存
+        """
+        with self._cache_lock:
+            if market is None and code_int is None:
+                self._cache.clear()
+                self._latest.clear()
+            else:
+                key = (market, int(code_int))
+                self._drop(key)
+                self._latest.pop(key, None)
+
+    def stats(self):
+        """缓存命中统计"""
+        with self._cache_lock:
+            return {'size': len(self._cache), 'capacity': self.kronos_config['cache_size'],
+                    'hits': self.hits, 'misses': self.misses}
+
+    # ------------------------------------------------------------------
+    # 数据与模型
+    # ------------------------------------------------------------------
+    def _load_history(self, market, code_int, latest, lookback_days):
+        start_date = latest - timedelta(days=int(lookback_days * 1.5))
+        with self.engine.connect() as conn:
+            df = pd.read_sql(_HISTORY_SQL, conn, params={
+                'market': market,
+                'code_int': int(code_int),
+                'start_date': start_date,
+                'end_date': latest,
+                'limit': int(lookback_days),
+            })
+        return df.sort_values('date').reset_index(drop=True)
+
+    def _stock_name(self, market, code_int):
+        key = (market, int(code_int))
+        if key not in self._names:
+            with self.engine.connect() as conn:
+                name = conn.execute(_NAME_SQL, {'market': market, 'code_int': int(code_int)}).scalar()
+            self._names[key] = name or 'Unknown'
+        return self._names[key]
+
+    def _get_service(self):
+        """常驻的 KronosPredictorService（首次调用时创建，模型在首次预测时加载）"""
+        if self._service is None:
+            from baostock_tool.kronos_master.kronos_service import KronosConfig, KronosPredictorService
+            self._service = KronosPredictorService(KronosConfig(
+                device=self.kronos_config['device'],
+                quantize=self.kronos_config['quantize'],
+                num_threads=self.kronos_config['num_threads'],
+            ))
+        return self._service
+
+    # ------------------------------------------------------------------
+    # 预测
+    # ------------------------------------------------------------------
+    def predict(self, market, stock_code, lookback_days, pred_len, temperature, top_p, sample_count,
+                fallback=None):
+        """
+        预测单只股票，命中缓存时不查询历史数据也不推理
+
+        Args:
+            market (str): 市场代码
+            stock_code (str): 6 位证券代码
+            lookback_days (int): 历史 K 线根数
+            pred_len (int): 预测天数
+            temperature (float): 采样温度
+            top_p (float): 核采样概率（0-1）
+            sample_count (int): 采样次数
+            fallback (callable, optional): fallback(historical, pred_len) -> 预测 K 线列表，
+                模型不可用或推理出错时使用，结果不缓存
+
+        Returns:
+            dict: {stock_name, historical, prediction, last_close, pred_change_pct, cached}；
+                  无历史数据时返回 None
+        """
+        code_int = int(stock_code)
+        latest = self.latest_date(market, code_int)
+        if latest is None:
+            return None
+
+        cache_key = (market, code_int, latest, int(lookback_days), int(pred_len),
+                     float(temperature), float(top_p), int(sample_count))
+        with self._cache_lock:
+            payload = self._cache.get(cache_key)
+            if payload is not None:
+                self._cache.move_to_end(cache_key)
+                self.hits += 1
+                return {**payload, 'cached': True}
+            self.misses += 1
+
+        hist_df = self._load_history(market, code_int, latest, lookback_days)
+        if hist_df.empty:
+            return None
+        historical = bars_to_records(hist_df, is_prediction=False)
+        stock_name = self._stock_name(market, code_int)
+
+        try:
+            with self._model_lock:
+                service = self._get_service()
+                service.config = replace(
+                    service.config,
+                    lookback=int(lookback_days),
+                    pred_len=int(pred_len),
+                    temperature=float(temperature),
+                    top_p=float(top_p),
+                    sample_count=int(sample_count),
+                )
+                history = service._clean_data(hist_df.drop(columns=['pctChg']))
+                result = service.predict_history(f"{market}.{stock_code}", history, stock_name)
+        except Exception as e:
+            if fallback is None:
+                raise
+            logger.error(f"{market}.{stock_code} 预测出错，使用备用结果: {e}")
+            return {
+                'stock_name': stock_name,
+                'historical': historical,
+                'prediction': fallback(historical, pred_len),
+                'last_close': historical[-1]['close'],
+                'pred_change_pct': 0,
+                'cached': False,
+            }
+
+        payload = {
+            'stock_name': stock_name,
+            'historical': historical,
+            'prediction': bars_to_records(result.prediction_df, is_prediction=True),
+            'last_close': float(result.last_close),
+            'pred_change_pct': float(result.predicted_change_pct),
+        }
+        with self._cache_lock:
+            self._cache[cache_key] = payload
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.kronos_config['cache_size']:
+                self._cache.popitem(last=False)
+        return {**payload, 'cached': False}
+
+
+_default_server = None
+_default_server_lock = threading.Lock()
+
+
+def get_prediction_server():
+    """
+    获取进程内共享的预测服务
+
+    Returns:
+        KronosPredictionServer: 首次调用时按配置文件创建
+    """
+    global _default_server
+    with _default_server_lock:
+        if _default_server is None:
+            _default_server = KronosPredictionServer()
+    return _default_server
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+int8 动态量化 vs fp32：CPU 推理精度与耗时对比
+
+对同一批股票截掉最后 pred_len 个交易日作为真实值，分别用 fp32 和 int8 模型在不同
+sample_count 下预测，统计：
+    seconds_per_stock   每只股票的平均推理耗时（只计模型推理，不含取数）
+    close_mape          预测收盘价相对真实收盘价的平均绝对百分比误差
+    direction_hit       预测涨跌方向（最后一天收盘价相对基准收盘价）与真实方向一致的比例
+    vs_fp32_mape        与同 sample_count、同随机种子的 fp32 预测收盘价的平均偏差（int8 行）
+
+采样本身有随机性，fp32 还会用另一个随机种子再跑一次（fp32_reseed），其 vs_fp32_mape
+即采样噪声的量级：int8 的偏差明显小于它时，量化误差可以忽略。
+
+使用方式：
+    python -m baostock_tool.kronos_master.quantization_benchmark 000001 600000 300750 \
+        --sample-counts 5 10 20 --threads 8 --output quant_report.json
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+
+from baostock_tool.kronos_master.kronos_service import KronosConfig, KronosPredictorService
+
+
+def _holdout(service, data, pred_len):
+    """每只股票截掉最后 pred_len 根 bar，返回 [(symbol, 输入, x 时间, y 时间, 真实收盘价, 基准收盘价)]"""
+    cases = []
+    for symbol, df in data.items():
+        if len(df) <= pred_len + 1:
+            continue
+        history, future = df.iloc[:-pred_len].reset_index(drop=True), df.iloc[-pred_len:]
+        x_df, x_timestamp, _ = service._prepare_inputs(history)
+        y_timestamp = pd.Series(future['date'].values)
+        cases.append((symbol, x_df, x_timestamp, y_timestamp,
+                      future['close'].to_numpy(np.float64), float(history['close'].iloc[-1])))
+    return cases
+
+
+def run_mode(service, cases, sample_count, seed):
+    """
+    逐只股票预测并计时
+
+    Returns:
+        tuple: (每只股票平均秒数, {symbol: 预测收盘价数组})
+    """
+    config = service.config
+    predictions = {}
+    elapsed = 0.0
+    torch.manual_seed(seed)
+    for symbol, x_df, x_timestamp, y_timestamp, _, _ in cases:
+        began = time.perf_counter()
+        pred_df = service._predictor.predict(
+            df=x_df,
+            x_timestamp=x_timestamp,
+            y_timestamp=y_timestamp,
+            pred_len=config.pred_len,
+            T=config.temperature,
+            top_p=config.top_p,
+            sample_count=sample_count,
+            verbose=False,
+        )
+        elapsed += time.perf_counter() - began
+        predictions[symbol] = pred_df['close'].to_numpy(np.float64)
+    return elapsed / max(len(cases), 1), predictions
+
+
+def score(cases, predictions, reference=None):
+    """预测收盘价相对真实值（以及相对参考预测）的误差"""
+    mape, hits, deviation = [], [], []
+    for symbol, _, _, _, actual, base_close in cases:
+        pred = predictions[symbol]
+        mape.append(np.mean(np.abs(pred - actual) / actual) * 100)
+        hits.append(np.sign(pred[-1] - base_close) == np.sign(actual[-1] - base_close))
+        if reference is not None:
+            deviation.append(np.mean(np.abs(pred - reference[symbol]) / np.abs(reference[symbol])) * 100)
+    return {
+        'close_mape': round(float(np.mean(mape)), 4),
+        'direction_hit': round(float(np.mean(hits)), 4),
+        'vs_fp32_mape': round(float(np.mean(deviation)), 4) if deviation else None,
+    }
+
+
+def benchmark(symbols, sample_counts=(5, 10, 20), threads=0, seed=42, **config_kwargs):
+    """
+    对比 fp32 / int8 的精度与耗时
+
+    Returns:
+        dict: {'threads', 'stocks', 'rows': [{mode, sample_count, seconds_per_stock, close_mape, ...}]}
+    """
+    fp32 = KronosPredictorService(KronosConfig(quantize=False, num_threads=threads, **config_kwargs))
+    fp32._ensure_model_loaded()
+    pred_len = fp32.config.pred_len
+    # 多取 pred_len 个交易日作为真实值
+    fp32.config.lookback += pred_len * 2
+    cases = _holdout(fp32, fp32.load_data_batch(symbols), pred_len)
+    fp32.config.lookback -= pred_len * 2
+
+    int8 = KronosPredictorService(KronosConfig(quantize=True, num_threads=threads, **config_kwargs))
+    int8._ensure_model_loaded()
+
+    rows = []
+    for sample_count in sample_counts:
+        seconds, reference = run_mode(fp32, cases, sample_count, seed)
+        rows.append({'mode': 'fp32', 'sample_count': sample_count,
+                     'seconds_per_stock': round(seconds, 4), **score(cases, reference)})
+
+        seconds, predictions = run_mode(fp32, cases, sample_count, seed + 1)
+        rows.append({'mode': 'fp32_reseed', 'sample_count': sample_count,
+                     'seconds_per_stock': round(seconds, 4), **score(cases, predictions, reference)})
+
+        seconds, predictions = run_mode(int8, cases, sample_count, seed)
+        rows.append({'mode': 'int8', 'sample_count': sample_count,
+                     'seconds_per_stock': round(seconds, 4), **score(cases, predictions, reference)})
+
+    return {'threads': torch.get_num_threads(), 'stocks': len(cases), 'rows': rows}
+
+
+def print_report(report):
+    print(f"股票数: {report['stocks']}，线程数: {report['threads']}")
+    print(f"{'mode':<14}{'samples':>8}{'s/stock':>10}{'MAPE%':>9}{'hit':>8}{'vs fp32%':>10}")
+    for row in report['rows']:
+        deviation = '-' if row['vs_fp32_mape'] is None else f"{row['vs_fp32_mape']:.4f}"
+        print(f"{row['mode']:<14}{row['sample_count']:>8}{row['seconds_per_stock']:>10.3f}"
+              f"{row['close_mape']:>9.3f}{row['direction_hit']:>8.2%}{deviation:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kronos int8 动态量化精度与耗时对比')
+    parser.add_argument('symbols', nargs='+', help='股票代码')
+    parser.add_argument('--sample-counts', type=int, nargs='+', default=[5, 10, 20], help='对比的采样次数')
+    parser.add_argument('--threads', type=int, default=0, help='torch 线程数（0 为默认）')
+    parser.add_argument('--pred-days', type=int, default=5, help='预测天数')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--output', default=None, help='结果 JSON 文件路径')
+    args = parser.parse_args()
+
+    report = benchmark(args.symbols, args.sample_counts, args.threads, args.seed, pred_len=args.pred_days)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
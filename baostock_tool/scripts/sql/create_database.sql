@@ -181,6 +181,161 @@ CREATE TABLE `stock_minute_data` (
  PARTITION `p202511` VALUES LESS THAN (202512) ENGINE = InnoDB,
  PARTITION `p_future` VALUES LESS THAN MAXVALUE ENGINE = InnoDB);
 
+-- 分钟线紧凑存储（替代 stock_minute_data，迁移见 database_schema/minute_time_migration.py）
+-- bar 时间存为当日分钟数 SMALLINT（原 varchar(17) 在主键中，每个二级索引都要重复存储），
+-- 价格 DECIMAL(9,3)，不保留 created_at / updated_at，去掉与主键前缀重复的索引
+CREATE TABLE IF NOT EXISTS `stock_minute_bar` (
+  `date` date NOT NULL COMMENT '交易所行情日期',
+  `market` varchar(2) NOT NULL COMMENT '市场代码：sh=上海, sz=深圳',
+  `code_int` int(10) unsigned NOT NULL COMMENT '6位数字股票代码',
+  `frequency` tinyint(4) NOT NULL COMMENT '频率：5=5分钟, 15=15分钟, 30=30分钟, 60=60分钟',
+  `bar_minute` smallint(5) unsigned NOT NULL COMMENT 'bar 结束时间（当日分钟数，如 10:30=630）',
+  `open` decimal(9,3) NOT NULL COMMENT '开盘价',
+  `high` decimal(9,3) NOT NULL COMMENT '最高价',
+  `low` decimal(9,3) NOT NULL COMMENT '最低价',
+  `close` decimal(9,3) NOT NULL COMMENT '收盘价',
+  `volume` bigint(20) NOT NULL COMMENT '成交量(股)',
+  `amount` decimal(16,2) NOT NULL COMMENT '成交额(元)',
+  `adjustflag` tinyint(4) NOT NULL DEFAULT 3 COMMENT '复权状态：1=后复权, 2=前复权, 3=不复权',
+  PRIMARY KEY (`market`,`code_int`,`frequency`,`date`,`bar_minute`),
+  KEY `idx_date_market` (`date`,`market`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='A股分钟线数据（紧凑时间编码）'
+ PARTITION BY RANGE (year(`date`) * 100 + month(`date`))
+(PARTITION `p202001` VALUES LESS THAN (202002) ENGINE = InnoDB,
+ PARTITION `p202002` VALUES LESS THAN (202003) ENGINE = InnoDB,
+ PARTITION `p202003` VALUES LESS THAN (202004) ENGINE = InnoDB,
+ PARTITION `p202004` VALUES LESS THAN (202005) ENGINE = InnoDB,
+ PARTITION `p202005` VALUES LESS THAN (202006) ENGINE = InnoDB,
+ PARTITION `p202006` VALUES LESS THAN (202007) ENGINE = InnoDB,
+ PARTITION `p202007` VALUES LESS THAN (202008) ENGINE = InnoDB,
+ PARTITION `p202008` VALUES LESS THAN (202009) ENGINE = InnoDB,
+ PARTITION `p202009` VALUES LESS THAN (202010) ENGINE = InnoDB,
+ PARTITION `p202010` VALUES LESS THAN (202011) ENGINE = InnoDB,
+ PARTITION `p202011` VALUES LESS THAN (202012) ENGINE = InnoDB,
+ PARTITION `p202012` VALUES LESS THAN (202101) ENGINE = InnoDB,
+ PARTITION `p202101` VALUES LESS THAN (202102) ENGINE = InnoDB,
+ PARTITION `p202102` VALUES LESS THAN (202103) ENGINE = InnoDB,
+ PARTITION `p202103` VALUES LESS THAN (202104) ENGINE = InnoDB,
+ PARTITION `p202104` VALUES LESS THAN (202105) ENGINE = InnoDB,
+ PARTITION `p202105` VALUES LESS THAN (202106) ENGINE = InnoDB,
+ PARTITION `p202106` VALUES LESS THAN (202107) ENGINE = InnoDB,
+ PARTITION `p202107` VALUES LESS THAN (202108) ENGINE = InnoDB,
+ PARTITION `p202108` VALUES LESS THAN (202109) ENGINE = InnoDB,
+ PARTITION `p202109` VALUES LESS THAN (202110) ENGINE = InnoDB,
+ PARTITION `p202110` VALUES LESS THAN (202111) ENGINE = InnoDB,
+ PARTITION `p202111` VALUES LESS THAN (202112) ENGINE = InnoDB,
+ PARTITION `p202112` VALUES LESS THAN (202201) ENGINE = InnoDB,
+ PARTITION `p202201` VALUES LESS THAN (202202) ENGINE = InnoDB,
+ PARTITION `p202202` VALUES LESS THAN (202203) ENGINE = InnoDB,
+ PARTITION `p202203` VALUES LESS THAN (202204) ENGINE = InnoDB,
+ PARTITION `p202204` VALUES LESS THAN (202205) ENGINE = InnoDB,
+ PARTITION `p202205` VALUES LESS THAN (202206) ENGINE = InnoDB,
+ PARTITION `p202206` VALUES LESS THAN (202207) ENGINE = InnoDB,
+ PARTITION `p202207` VALUES LESS THAN (202208) ENGINE = InnoDB,
+ PARTITION `p202208` VALUES LESS THAN (202209) ENGINE = InnoDB,
+ PARTITION `p202209` VALUES LESS THAN (202210) ENGINE = InnoDB,
+ PARTITION `p202210` VALUES LESS THAN (202211) ENGINE = InnoDB,
+ PARTITION `p202211` VALUES LESS THAN (202212) ENGINE = InnoDB,
+ PARTITION `p202212` VALUES LESS THAN (202301) ENGINE = InnoDB,
+ PARTITION `p202301` VALUES LESS THAN (202302) ENGINE = InnoDB,
+ PARTITION `p202302` VALUES LESS THAN (202303) ENGINE = InnoDB,
+ PARTITION `p202303` VALUES LESS THAN (202304) ENGINE = InnoDB,
+ PARTITION `p202304` VALUES LESS THAN (202305) ENGINE = InnoDB,
+ PARTITION `p202305` VALUES LESS THAN (202306) ENGINE = InnoDB,
+ PARTITION `p202306` VALUES LESS THAN (202307) ENGINE = InnoDB,
+ PARTITION `p202307` VALUES LESS THAN (202308) ENGINE = InnoDB,
+ PARTITION `p202308` VALUES LESS THAN (202309) ENGINE = InnoDB,
+ PARTITION `p202309` VALUES LESS THAN (202310) ENGINE = InnoDB,
+ PARTITION `p202310` VALUES LESS THAN (202311) ENGINE = InnoDB,
+ PARTITION `p202311` VALUES LESS THAN (202312) ENGINE = InnoDB,
+ PARTITION `p202312` VALUES LESS THAN (202401) ENGINE = InnoDB,
+ PARTITION `p202401` VALUES LESS THAN (202402) ENGINE = InnoDB,
+ PARTITION `p202402` VALUES LESS THAN (202403) ENGINE = InnoDB,
+ PARTITION `p202403` VALUES LESS THAN (202404) ENGINE = InnoDB,
+ PARTITION `p202404` VALUES LESS THAN (202405) ENGINE = InnoDB,
+ PARTITION `p202405` VALUES LESS THAN (202406) ENGINE = InnoDB,
+ PARTITION `p202406` VALUES LESS THAN (202407) ENGINE = InnoDB,
+ PARTITION `p202407` VALUES LESS THAN (202408) ENGINE = InnoDB,
+ PARTITION `p202408` VALUES LESS THAN (202409) ENGINE = InnoDB,
+ PARTITION `p202409` VALUES LESS THAN (202410) ENGINE = InnoDB,
+ PARTITION `p202410` VALUES LESS THAN (202411) ENGINE = InnoDB,
+ PARTITION `p202411` VALUES LESS THAN (202412) ENGINE = InnoDB,
+ PARTITION `p202412` VALUES LESS THAN (202501) ENGINE = InnoDB,
+ PARTITION `p202501` VALUES LESS THAN (202502) ENGINE = InnoDB,
+ PARTITION `p202502` VALUES LESS THAN (202503) ENGINE = InnoDB,
+ PARTITION `p202503` VALUES LESS THAN (202504) ENGINE = InnoDB,
+ PARTITION `p202504` VALUES LESS THAN (202505) ENGINE = InnoDB,
+ PARTITION `p202505` VALUES LESS THAN (202506) ENGINE = InnoDB,
+ PARTITION `p202506` VALUES LESS THAN (202507) ENGINE = InnoDB,
+ PARTITION `p202507` VALUES LESS THAN (202508) ENGINE = InnoDB,
+ PARTITION `p202508` VALUES LESS THAN (202509) ENGINE = InnoDB,
+ PARTITION `p202509` VALUES LESS THAN (202510) ENGINE = InnoDB,
+ PARTITION `p202510` VALUES LESS THAN (202511) ENGINE = InnoDB,
+ PARTITION `p202511` VALUES LESS THAN (202512) ENGINE = InnoDB,
+ PARTITION `p_future` VALUES LESS THAN MAXVALUE ENGINE = InnoDB);
+
+-- 日线技术指标表（update_stock_indicators.py 增量计算，策略直接读取）
+CREATE TABLE IF NOT EXISTS `stock_daily_indicator` (
+  `date` DATE NOT NULL COMMENT '交易日期',
+  `market` VARCHAR(2) NOT NULL COMMENT '市场代码：sh=上海, sz=深圳',
+  `code_int` INT(10) UNSIGNED NOT NULL COMMENT '6位数字股票代码',
+  `base_close` DECIMAL(12,2) NOT NULL COMMENT '计算时使用的收盘价（与日线不一致说明已重新复权，需要重算）',
+  `close_fcap` DECIMAL(20,2) DEFAULT NULL COMMENT '流通市值（成交额/换手率/100）',
+  `is_raising_limit` TINYINT(4) NOT NULL DEFAULT 0 COMMENT '涨跌停：1=涨停, -1=跌停, 0=否',
+  `macd_dif` DECIMAL(12,4) DEFAULT NULL COMMENT 'MACD DIF(12,26)',
+  `macd_dea` DECIMAL(12,4) DEFAULT NULL COMMENT 'MACD DEA(9)',
+  `macd_histogram` DECIMAL(12,4) DEFAULT NULL COMMENT 'MACD 柱',
+  `ma_5` DECIMAL(12,4) DEFAULT NULL COMMENT '5日均线',
+  `ma_8` DECIMAL(12,4) DEFAULT NULL COMMENT '8日均线',
+  `ma_13` DECIMAL(12,4) DEFAULT NULL COMMENT '13日均线',
+  `ma_21` DECIMAL(12,4) DEFAULT NULL COMMENT '21日均线',
+  `ma_34` DECIMAL(12,4) DEFAULT NULL COMMENT '34日均线',
+  `kdj_k` DECIMAL(10,4) DEFAULT NULL COMMENT 'KDJ K(9,3,3)',
+  `kdj_d` DECIMAL(10,4) DEFAULT NULL COMMENT 'KDJ D',
+  `kdj_j` DECIMAL(10,4) DEFAULT NULL COMMENT 'KDJ J',
+  `rsi_6` DECIMAL(8,4) DEFAULT NULL COMMENT 'RSI(6)',
+  `rsi_12` DECIMAL(8,4) DEFAULT NULL COMMENT 'RSI(12)',
+  `rsi_24` DECIMAL(8,4) DEFAULT NULL COMMENT 'RSI(24)',
+  `cci_10` DECIMAL(12,4) DEFAULT NULL COMMENT 'CCI(10)',
+  `cci_20` DECIMAL(12,4) DEFAULT NULL COMMENT 'CCI(20)',
+  `created_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP(),
+  `updated_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP() ON UPDATE CURRENT_TIMESTAMP(),
+  PRIMARY KEY (`date`,`market`,`code_int`),
+  KEY `idx_market_code_date` (`market`,`code_int`,`date`)
+) ENGINE=INNODB DEFAULT CHARSET=utf8mb4
+COMMENT='A股日线技术指标（按年分区）'
+PARTITION BY RANGE (TO_DAYS(`date`)) (
+  PARTITION p1999 VALUES LESS THAN (TO_DAYS('2000-01-01')),
+  PARTITION p2000 VALUES LESS THAN (TO_DAYS('2001-01-01')),
+  PARTITION p2001 VALUES LESS THAN (TO_DAYS('2002-01-01')),
+  PARTITION p2002 VALUES LESS THAN (TO_DAYS('2003-01-01')),
+  PARTITION p2003 VALUES LESS THAN (TO_DAYS('2004-01-01')),
+  PARTITION p2004 VALUES LESS THAN (TO_DAYS('2005-01-01')),
+  PARTITION p2005 VALUES LESS THAN (TO_DAYS('2006-01-01')),
+  PARTITION p2006 VALUES LESS THAN (TO_DAYS('2007-01-01')),
+  PARTITION p2007 VALUES LESS THAN (TO_DAYS('2008-01-01')),
+  PARTITION p2008 VALUES LESS THAN (TO_DAYS('2009-01-01')),
+  PARTITION p2009 VALUES LESS THAN (TO_DAYS('2010-01-01')),
+  PARTITION p2010 VALUES LESS THAN (TO_DAYS('2011-01-01')),
+  PARTITION p2011 VALUES LESS THAN (TO_DAYS('2012-01-01')),
+  PARTITION p2012 VALUES LESS THAN (TO_DAYS('2013-01-01')),
+  PARTITION p2013 VALUES LESS THAN (TO_DAYS('2014-01-01')),
+  PARTITION p2014 VALUES LESS THAN (TO_DAYS('2015-01-01')),
+  PARTITION p2015 VALUES LESS THAN (TO_DAYS('2016-01-01')),
+  PARTITION p2016 VALUES LESS THAN (TO_DAYS('2017-01-01')),
+  PARTITION p2017 VALUES LESS THAN (TO_DAYS('2018-01-01')),
+  PARTITION p2018 VALUES LESS THAN (TO_DAYS('2019-01-01')),
+  PARTITION p2019 VALUES LESS THAN (TO_DAYS('2020-01-01')),
+  PARTITION p2020 VALUES LESS THAN (TO_DAYS('2021-01-01')),
+  PARTITION p2021 VALUES LESS THAN (TO_DAYS('2022-01-01')),
+  PARTITION p2022 VALUES LESS THAN (TO_DAYS('2023-01-01')),
+  PARTITION p2023 VALUES LESS THAN (TO_DAYS('2024-01-01')),
+  PARTITION p2024 VALUES LESS THAN (TO_DAYS('2025-01-01')),
+  PARTITION p2025 VALUES LESS THAN (TO_DAYS('2026-01-01')),
+  PARTITION p2026 VALUES LESS THAN (TO_DAYS('2027-01-01')),
+  PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
 -- 创建交易日数据表
 CREATE TABLE IF NOT EXISTS trade_calendar (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -208,6 +363,19 @@ CREATE TABLE IF NOT EXISTS stock_adjust_factor (
     KEY idx_date (date)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='股票复权因子表';
 
+-- 创建日线原始价格表（新除权事件时前复权价按 原始价格 × 新因子 重算，误差不随除权次数累积）
+CREATE TABLE IF NOT EXISTS stock_daily_raw_price (
+    date DATE NOT NULL COMMENT '交易所行情日期',
+    market VARCHAR(2) NOT NULL COMMENT '市场代码：sh=上海, sz=深圳',
+    code_int INT(10) UNSIGNED NOT NULL COMMENT '6位数字股票代码',
+    open DECIMAL(12,4) NOT NULL COMMENT '开盘价（不复权）',
+    high DECIMAL(12,4) NOT NULL COMMENT '最高价（不复权）',
+    low DECIMAL(12,4) NOT NULL COMMENT '最低价（不复权）',
+    close DECIMAL(12,4) NOT NULL COMMENT '收盘价（不复权）',
+    preclose DECIMAL(12,4) DEFAULT NULL COMMENT '前收盘价（不复权）',
+    PRIMARY KEY (market, code_int, date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='日线原始价格（前复权重算的基准）';
+
 
 -- 创建回测配置表
 CREATE TABLE backtest_config (
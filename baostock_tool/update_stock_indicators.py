@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+日线技术指标增量计算（替代 _tmp/stock_indicator_calculator.py）
+
+计算 MACD(12,26,9)、MA 5/8/13/21/34、KDJ(9,3,3)、RSI 6/12/24、CCI 10/20、涨跌停标记和流通市值，
+写入 stock_daily_indicator，可用 utils/data_loader/indicator_loader.py 按股票批量读取
+（现有策略仍在回测中自行计算指标，尚未改为读取本表）。
+
+与原脚本的区别：
+1. 增量计算：每个市场一条分组查询取出日线和指标表各自的最新日期，已是最新的股票不再查询；
+   需要计算的股票只加载最新指标日期之前 seed_bars 根 K 线作为 EMA/RSI 的预热窗口，只写入新日期
+2. 涨跌停标记用 np.select 向量化，不再逐行 .iloc / df.loc
+3. 写库走 BulkLoader（多行 INSERT ... ON DUPLICATE KEY UPDATE 或 LOAD DATA），不再 iterrows 逐行拼字典
+4. 按 市场 × code_int 取模 分片，用进程池并行（talib 计算受 GIL 限制，线程池无法并行）
+5. 指标表记录计算时的收盘价 base_close，与日线不一致（除权后前复权价被重新缩放）时整只股票全量重算
+
+使用方式：
+    python -m baostock_tool.update_stock_indicators            # 增量
+    python -m baostock_tool.update_stock_indicators --full     # 全量重算
+    python -m baostock_tool.update_stock_indicators --codes sh.600000 sz.000001
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pymysql
+import talib
+
+from baostock_tool.config import get_db_config, get_log_config, get_indicator_config
+from baostock_tool.database_schema.bulk_loader import BulkLoader, INDICATOR_FIELDS
+from baostock_tool.utils.logger_utils import setup_logger
+
+log_config = get_log_config()
+logger = setup_logger(logger_name=__name__,
+                      log_level=log_config["log_level"],
+                      log_dir=log_config["log_dir"])
+
+# 计算全部指标所需的最少 K 线数（MA34）
+MIN_BARS = 34
+# 每累计多少行写一次库并提交
+FLUSH_ROWS = 20000
+
+DAILY_FIELDS = ('date', 'open', 'high', 'low', 'close', 'preclose', 'amount', 'turn', 'isST')
+
+# 每只股票日线与指标表的最新日期（一个市场一条语句）
+LATEST_DATES_SQL = """
+    SELECT d.code_int, d.latest_date, i.latest_date
+    FROM (SELECT code_int, MAX(date) AS latest_date FROM stock_daily_data
+          WHERE market = %s AND frequency = 'd' GROUP BY code_int) d
+    LEFT JOIN (SELECT code_int, MAX(date) AS latest_date FROM stock_daily_indicator
+               WHERE market = %s GROUP BY code_int) i ON i.code_int = d.code_int
+"""
+
+# 最新指标行计算时使用的收盘价
+BASE_CLOSE_SQL = """
+    SELECT base_close FROM stock_daily_indicator WHERE market = %s AND code_int = %s AND date = %s
+"""
+
+# 从最新指标日期往前第 seed_bars 根 K 线开始加载（不足时加载全部历史）
+SEEDED_DAILY_SQL = f"""
+    SELECT {', '.join(DAILY_FIELDS)} FROM stock_daily_data
+    WHERE market = %s AND code_int = %s AND frequency = 'd'
+      AND date >= COALESCE((SELECT date FROM stock_daily_data
+                            WHERE market = %s AND code_int = %s AND frequency = 'd' AND date <= %s
+                            ORDER BY date DESC LIMIT 1 OFFSET %s), '1900-01-01')
+    ORDER BY date
+"""
+
+FULL_DAILY_SQL = f"""
+    SELECT {', '.join(DAILY_FIELDS)} FROM stock_daily_data
+    WHERE market = %s AND code_int = %s AND frequency = 'd'
+    ORDER BY date
+"""
+
+
+def _float_column(rows, index):
+    """查询结果第 index 列转 float 数组（DECIMAL 转 float，NULL 转 NaN）"""
+    return np.array([row[index] for row in rows], dtype=np.float64)
+
+
+def limit_flags(close, preclose, is_st):
+    """
+    涨跌停标记（ST 股 ±5%，其他 ±10%）
+
+    第一行（无前一日）、preclose 缺失或不为正、涨跌幅非有限值时记为 0
+
+    Returns:
+        np.ndarray: 1=涨停, -1=跌停, 0=否
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_chg = (close - preclose) / preclose * 100
+    valid = (preclose > 0) & np.isfinite(pct_chg)
+    if len(valid):
+        valid[0] = False
+    limit = np.where(is_st == 1, 5.0, 10.0)
+    return np.select([valid & (pct_chg >= limit), valid & (pct_chg <= -limit)], [1, -1], 0).astype(np.int8)
+
+
+def compute_indicators(high, low, close, preclose, amount, turn, is_st):
+    """
+    计算全部技术指标（输入为按日期升序的 float 数组）
+
+    Returns:
+        dict: {指标名: 与输入等长的数组}，键同 INDICATOR_FIELDS
+    """
+    macd_dif, macd_dea, macd_histogram = talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
+    kdj_k, kdj_d = talib.STOCH(high, low, close, fastk_period=9, slowk_period=3, slowk_matype=0,
+                               slowd_period=3, slowd_matype=0)
+    # 换手率缺失或 <= 0 时流通市值无法计算，保持 NaN（写库为 NULL）
+    with np.errstate(invalid='ignore', divide='ignore'):
+        close_fcap = np.where(turn > 0, amount / turn / 100, np.nan)
+    return {
+        'close_fcap': close_fcap,
+        'is_raising_limit': limit_flags(close, preclose, is_st),
+        'macd_dif': macd_dif,
+        'macd_dea': macd_dea,
+        'macd_histogram': macd_histogram,
+        'ma_5': talib.SMA(close, timeperiod=5),
+        'ma_8': talib.SMA(close, timeperiod=8),
+        'ma_13': talib.SMA(close, timeperiod=13),
+        'ma_21': talib.SMA(close, timeperiod=21),
+        'ma_34': talib.SMA(close, timeperiod=34),
+        'kdj_k': kdj_k,
+        'kdj_d': kdj_d,
+        'kdj_j': 3 * kdj_k - 2 * kdj_d,
+        'rsi_6': talib.RSI(close, timeperiod=6),
+        'rsi_12': talib.RSI(close, timeperiod=12),
+        'rsi_24': talib.RSI(close, timeperiod=24),
+        'cci_10': talib.CCI(high, low, close, timeperiod=10),
+        'cci_20': talib.CCI(high, low, close, timeperiod=20),
+    }
+
+
+def indicator_rows(market, code_int, daily_rows, after_date=None):
+    """
+    计算一只股票的指标行
+
+    Args:
+        market (str): 市场代码
+        code_int (int): 股票代码
+        daily_rows (list): 日线查询结果，字段顺序同 DAILY_FIELDS，按日期升序
+        after_date: 只返回该日期之后的行（None 返回全部）
+
+    Returns:
+        list: 元组列表，字段顺序同 INDICATOR_COLUMNS（NaN 转为 None）
+    """
+    close = _float_column(daily_rows, 4)
+    indicators = compute_indicators(
+        high=_float_column(daily_rows, 2),
+        low=_float_column(daily_rows, 3),
+        close=close,
+        preclose=_float_column(daily_rows, 5),
+        amount=_float_column(daily_rows, 6),
+        turn=_float_column(daily_rows, 7),
+        is_st=_float_column(daily_rows, 8),
+    )
+
+    dates = [row[0] for row in daily_rows]
+    start = 0
+    if after_date is not None:
+        start = next((i for i, d in enumerate(dates) if d > after_date), len(dates))
+    if start >= len(dates):
+        return []
+
+    # 按列切片后一次性转 Python 对象，NaN 替换为 None
+    columns = [dates[start:], [market] * (len(dates) - start), [code_int] * (len(dates) - start),
+               close[start:].tolist()]
+    for field in INDICATOR_FIELDS:
+        values = indicators[field][start:]
+        if values.dtype.kind == 'f':
+            values = np.where(np.isnan(values), None, values.astype(object))
+        columns.append(values.tolist())
+    return list(zip(*columns))
+
+
+def _connect(db_config, write_method):
+    return pymysql.connect(
+        host=db_config['host'],
+        port=db_config['port'],
+        user=db_config['user'],
+        password=db_config['password'],
+        database=db_config['database'],
+        charset='utf8mb4',
+        local_infile=write_method == 'load_data'
+    )
+
+
+def _stock_rows(cursor, market, code_int, latest_indicator, seed_bars, full):
+    """
+    加载日线并计算一只股票需要写入的指标行
+
+    Returns:
+        tuple: (rows, rebuilt) rebuilt 表示因价格被重新复权而全量重算
+    """
+    if full or latest_indicator is None:
+        cursor.execute(FULL_DAILY_SQL, (market, code_int))
+        daily_rows = cursor.fetchall()
+        return (indicator_rows(market, code_int, daily_rows) if len(daily_rows) >= MIN_BARS else []), False
+
+    cursor.execute(SEEDED_DAILY_SQL, (market, code_int, market, code_int, latest_indicator, seed_bars))
+    daily_rows = cursor.fetchall()
+
+    # 预热窗口中最新指标日期的收盘价与计算时不一致：前复权价已被重新缩放，全量重算
+    cursor.execute(BASE_CLOSE_SQL, (market, code_int, latest_indicator))
+    base = cursor.fetchone()
+    current = next((row[4] for row in daily_rows if row[0] == latest_indicator), None)
+    if base is None or current is None or round(float(base[0]), 2) != round(float(current), 2):
+        rows, _ = _stock_rows(cursor, market, code_int, None, seed_bars, full=True)
+        return rows, True
+
+    if len(daily_rows) < MIN_BARS:
+        return [], False
+    return indicator_rows(market, code_int, daily_rows, after_date=latest_indicator), False
+
+
+def process_shard(db_config, market, shard, n_shards, seed_bars=250, full=False,
+                  write_method='upsert', code_ints=None):
+    """
+    计算一个分片（market 中 code_int % n_shards == shard 的股票），在独立进程中运行
+
+    Args:
+        db_config (dict): 数据库配置
+        market (str): 市场代码
+        shard (int): 分片序号
+        n_shards (int): 该市场的分片数
+        seed_bars (int): 增量计算的预热 K 线数量
+        full (bool): 是否全量重算
+        write_method (str): BulkLoader 写入方式
+        code_ints (set, optional): 只处理这些股票
+
+    Returns:
+        dict: {market, shard, codes, skipped, rebuilt, rows, failed, seconds}
+    """
+    start_time = time.time()
+    stats = {'market': market, 'shard': shard, 'codes': 0, 'skipped': 0, 'rebuilt': 0,
+             'rows': 0, 'failed': [], 'seconds': 0.0}
+    conn = _connect(db_config, write_method)
+    loader = BulkLoader(conn, write_method)
+    pending = []
+
+    def flush():
+        if pending:
+            loader.load('indicator', pending)
+            conn.commit()
+            stats['rows'] += len(pending)
+            pending.clear()
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(LATEST_DATES_SQL, (market, market))
+            latest = [row for row in cursor.fetchall() if row[0] % n_shards == shard]
+            for code_int, latest_daily, latest_indicator in sorted(latest):
+                if code_ints is not None and code_int not in code_ints:
+                    continue
+                if not full and latest_indicator is not None and latest_indicator >= latest_daily:
+                    stats['skipped'] += 1
+                    continue
+                try:
+                    rows, rebuilt = _stock_rows(cursor, market, code_int, latest_indicator, seed_bars, full)
+                except Exception as e:
+                    logger.error(f"{market}.{code_int:06d} 指标计算失败: {e}")
+                    stats['failed'].append(f"{market}.{code_int:06d}")
+                    continue
+                stats['codes'] += 1
+                stats['rebuilt'] += int(rebuilt)
+                pending.extend(rows)
+                if len(pending) >= FLUSH_ROWS:
+                    flush()
+            flush()
+    finally:
+        conn.close()
+
+    stats['seconds'] = time.time() - start_time
+    return stats
+
+
+def update_indicators(db_config, markets=('sh', 'sz'), full=False, codes=None, workers=None):
+    """
+    按 市场 × 分片 并行计算全部股票的技术指标
+
+    Args:
+        db_config (dict): 数据库配置
+        markets (tuple): 市场列表
+        full (bool): 是否全量重算
+        codes (list, optional): 只处理这些股票 ['sh.600000', ...]
+        workers (int, optional): 进程数，默认取 [indicator] workers
+
+    Returns:
+        bool: 全部分片成功返回 True
+    """
+    indicator_config = get_indicator_config()
+    workers = workers or indicator_config['workers']
+    n_shards = max(1, indicator_config['shards_per_market'])
+
+    code_filter = None
+    if codes:
+        code_filter = {}
+        for code in codes:
+            market, number = code.split('.')
+            code_filter.setdefault(market, set()).add(int(number))
+        markets = tuple(m for m in markets if m in code_filter)
+
+    tasks = [(market, shard) for market in markets for shard in range(n_shards)]
+    mode = '全量' if full else f"增量（预热 {indicator_config['seed_bars']} 根）"
+    logger.info(f"开始计算技术指标: {len(tasks)} 个分片, {workers} 个进程, {mode}")
+    start_time = time.time()
+    totals = {'codes': 0, 'skipped': 0, 'rebuilt': 0, 'rows': 0, 'failed': []}
+    success = True
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_shard, db_config, market, shard, n_shards,
+                            indicator_config['seed_bars'], full, indicator_config['write_method'],
+                            code_filter.get(market) if code_filter else None): (market, shard)
+            for market, shard in tasks
+        }
+        for future in as_completed(futures):
+            market, shard = futures[future]
+            try:
+                stats = future.result()
+            except Exception as e:
+                logger.error(f"分片 {market}#{shard} 失败: {e}")
+                success = False
+                continue
+            for key in ('codes', 'skipped', 'rebuilt', 'rows', 'failed'):
+                totals[key] += stats[key]
+            logger.info(f"分片 {market}#{shard} 完成: 计算 {stats['codes']} 只, 跳过 {stats['skipped']} 只, "
+                        f"写入 {stats['rows']} 行, 耗时 {stats['seconds']:.1f} 秒")
+
+    logger.info(f"技术指标计算完成: 计算 {totals['codes']} 只（其中重新复权全量重算 {totals['rebuilt']} 只）, "
+                f"已是最新 {totals['skipped']} 只, 失败 {len(totals['failed'])} 只, 写入 {totals['rows']} 行, "
+                f"耗时 {time.time() - start_time:.1f} 秒")
+    return success and not totals['failed']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日线技术指标增量计算')
+    parser.add_argument('--full', action='store_true', help='全量重算全部历史')
+    parser.add_argument('--codes', nargs='+', default=None, help='只处理指定股票，如 sh.600000')
+    parser.add_argument('--workers', type=int, default=None, help='进程数')
+    args = parser.parse_args()
+
+    db_config_ = get_db_config()
+    db_config = {
+        'host': db_config_["host"],
+        'port': db_config_["port"],
+        'user': db_config_["user"],
+        'password': db_config_["password"],
+        'database': db_config_["database"],
+    }
+    if not update_indicators(db_config, full=args.full, codes=args.codes, workers=args.workers):
+        logger.error("技术指标计算存在失败的股票或分片")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+# utils/backtest_engine/benchmark.py
+"""
+按时间遍历回测引擎的基准测试
+
+1. 生成合成 A 股市场（N 只股票 × D 个交易日的 OHLCV、PE、PB 等），写入本地 SQLite，
+   表结构与 MySQL 中的 stock_basic_info / trade_calendar / stock_daily_data 一致（只保留回测用到的列）
+2. 通过 db_engine 注入 SQLite 引擎运行 TimeBasedBacktester，不依赖 MySQL
+3. 对每个已注册策略输出：预加载耗时、股票·日/秒、各阶段耗时（指标预计算、卖出扫描、买入扫描、估值、持久化）、
+   截至该策略结束时的进程峰值内存（ru_maxrss 只增不减，是整个进程的累计峰值，不是单个策略的内存）
+4. 结果保存为 JSON（包含 git 提交号），可与其他提交的结果对比
+
+使用方式：
+    python -m baostock_tool.utils.backtest_engine.benchmark --stocks 500 --days 250
+    python -m baostock_tool.utils.backtest_engine.benchmark --compare benchmark_results/old.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from baostock_tool import backtest_time_based_standard as backtest_module
+from baostock_tool.backtest_time_based_standard import TimeBasedBacktester, BACKTEST_CONFIG
+from baostock_tool.utils.data_loader.indicator_cache import get_indicator_cache
+from baostock_tool.utils.logger_utils.logger_tool import get_logger
+from baostock_tool.utils.strategies import get_strategy, list_strategies
+
+
+logger = get_logger(__name__)
+
+# 回测开始前的历史交易日数（覆盖 lookback_days=365 的自然日回溯）
+HISTORY_DAYS = 260
+
+PHASES = ('preload', 'indicator_prepare', 'sell_scan', 'buy_scan', 'valuation', 'persistence')
+
+
+def generate_synthetic_market(db_path, n_stocks=500, n_days=250, seed=42, start='2019-01-02'):
+    """
+    生成合成市场数据并写入 SQLite
+
+    Args:
+        db_path: SQLite 文件路径
+        n_stocks: 股票数量（沪深各半）
+        n_days: 回测区间交易日数（另外生成 HISTORY_DAYS 个历史交易日）
+        seed: 随机种子
+        start: 第一个交易日
+
+    Returns:
+        tuple: (SQLAlchemy 引擎, 回测开始日期, 回测结束日期)
+    """
+    rng = np.random.default_rng(seed)
+    calendar = pd.bdate_range(start=start, periods=HISTORY_DAYS + n_days)
+    total_days = len(calendar)
+
+    # 股票列表：沪市 600001 起，深市 000001 起
+    n_sh = n_stocks // 2
+    markets = np.array(['sh'] * n_sh + ['sz'] * (n_stocks - n_sh), dtype=object)
+    code_ints = np.concatenate([600001 + np.arange(n_sh), 1 + np.arange(n_stocks - n_sh)])
+
+    # 价格：几何随机游走，各股票波动率不同
+    sigma = rng.uniform(0.015, 0.035, size=n_stocks)
+    log_returns = rng.normal(0.0002, 1.0, size=(total_days, n_stocks)) * sigma
+    close = rng.uniform(5, 80, size=n_stocks) * np.exp(np.cumsum(log_returns, axis=0))
+    preclose = np.vstack([close[:1] / np.exp(log_returns[:1]), close[:-1]])
+    open_ = preclose * np.exp(rng.normal(0, 0.005, size=close.shape))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, size=close.shape)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, size=close.shape)))
+    volume = np.round(rng.lognormal(13, 0.6, size=close.shape) / 100) * 100
+    amount = volume * (open_ + close) / 2
+
+    # 估值：每股收益/净资产缓慢变化，PE/PB 随价格波动
+    eps = rng.uniform(0.1, 3.0, size=n_stocks) * np.exp(np.cumsum(rng.normal(0, 0.002, size=close.shape), axis=0))
+    bps = rng.uniform(1.0, 15.0, size=n_stocks)
+    pe = close / eps
+    pb = close / bps
+
+    # 随机停牌（约 1% 的股票·日无数据）
+    traded = rng.random(close.shape) > 0.01
+
+    day_idx, stock_idx = np.nonzero(traded)
+    daily = pd.DataFrame({
+        'market': markets[stock_idx],
+        'code_int': code_ints[stock_idx],
+        'date': calendar[day_idx].strftime('%Y-%m-%d'),
+        'frequency': 'd',
+        'open': open_[day_idx, stock_idx].round(2),
+        'high': high[day_idx, stock_idx].round(2),
+        'low': low[day_idx, stock_idx].round(2),
+        'close': close[day_idx, stock_idx].round(2),
+        'preclose': preclose[day_idx, stock_idx].round(2),
+        'volume': volume[day_idx, stock_idx],
+        'amount': amount[day_idx, stock_idx].round(2),
+        'pctChg': ((close / preclose - 1) * 100)[day_idx, stock_idx].round(4),
+        'peTTM': pe[day_idx, stock_idx].round(4),
+        'psTTM': (pe * 0.3)[day_idx, stock_idx].round(4),
+        'pcfNcfTTM': (pe * 1.5)[day_idx, stock_idx].round(4),
+        'pbMRQ': pb[day_idx, stock_idx].round(4),
+    })
+
+    basic = pd.DataFrame({
+        'market': markets,
+        'code_int': code_ints,
+        'name': [f"合成{m}{c:06d}" for m, c in zip(markets, code_ints)],
+    })
+    trade_calendar = pd.DataFrame({
+        'calendar_date': calendar.strftime('%Y-%m-%d'),
+        'is_trading_day': 1,
+    })
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    engine = create_engine(f"sqlite:///{db_path}")
+    basic.to_sql('stock_basic_info', engine, index=False)
+    trade_calendar.to_sql('trade_calendar', engine, index=False)
+    daily.to_sql('stock_daily_data', engine, index=False, chunksize=50000)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX idx_market_code_date ON stock_daily_data (market, code_int, date)"))
+        conn.execute(text("CREATE INDEX idx_frequency_date ON stock_daily_data (frequency, date)"))
+
+    logger.info(f"合成市场已生成: {n_stocks} 只股票 × {total_days} 个交易日，共 {len(daily):,} 行 -> {db_path}")
+    return engine, calendar[HISTORY_DAYS].strftime('%Y-%m-%d'), calendar[-1].strftime('%Y-%m-%d')
+
+
+def _peak_rss_mb():
+    """进程启动以来的峰值常驻内存（MB），只增不减"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def _git_commit():
+    """当前 git 提交号，不在仓库中时返回 None"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(n_stocks=500, n_days=250, strategies=None, seed=42, work_dir=None):
+    """
+    执行基准测试
+
+    Args:
+        n_stocks: 合成股票数量
+        n_days: 回测交易日数
+        strategies: 策略名称列表，默认全部已注册策略
+        seed: 随机种子
+        work_dir: 存放 SQLite 文件的目录，默认临时目录
+
+    Returns:
+        dict: 基准测试结果
+    """
+    strategies = strategies or list(list_strategies().keys())
+    work_dir = work_dir or tempfile.mkdtemp(prefix='backtest_bench_')
+    os.makedirs(work_dir, exist_ok=True)
+
+    generate_start = time.time()
+    engine, start_date, end_date = generate_synthetic_market(
+        os.path.join(work_dir, 'synthetic_market.db'), n_stocks, n_days, seed
+    )
+    generate_time = time.time() - generate_start
+
+    config_dict = dict(BACKTEST_CONFIG, start_date=start_date, end_date=end_date,
+                       enable_blackout=False, indicator_cache_dir=None)
+
+    # 回测逐日日志会显著影响计时，基准测试期间只输出警告
+    backtest_module.logger.setLevel(logging.WARNING)
+
+    # 行情只加载一次，各策略复用
+    loader = TimeBasedBacktester(dict(config_dict), strategy=get_strategy(strategies[0]), db_engine=engine)
+    if not loader.load_market_data():
+        raise RuntimeError("合成行情加载失败")
+    preload_time = loader.phase_times['preload']
+    stock_days = loader.panel.total_rows
+    logger.info(f"预加载完成: {stock_days:,} 行，耗时 {preload_time:.2f} 秒，进程峰值内存 {_peak_rss_mb():.1f} MB")
+
+    results = []
+    for name in strategies:
+        get_indicator_cache().clear()
+        backtester = TimeBasedBacktester(dict(config_dict), strategy=get_strategy(name), db_engine=engine)
+        backtester.use_preloaded_data(loader.panel, loader.trading_dates, loader.stock_codes)
+
+        run_start = time.perf_counter()
+        result = backtester.run_backtest(strategy_name=f"benchmark_{name}", save_to_db=False, save_csv=False)
+        run_time = time.perf_counter() - run_start
+
+        # 回测区间内的股票·日数量（不含历史回溯部分）
+        start_pos = int(np.searchsorted(loader.panel.dates, np.datetime64(pd.Timestamp(start_date), 'ns')))
+        backtest_stock_days = int(loader.panel.present[start_pos:].sum())
+
+        phases = {phase: round(backtester.phase_times.get(phase, 0.0), 4) for phase in PHASES}
+        phases['preload'] = round(preload_time, 4)
+        item = {
+            'strategy': name,
+            'run_seconds': round(run_time, 4),
+            'stock_days': backtest_stock_days,
+            'stock_days_per_sec': round(backtest_stock_days / run_time, 1) if run_time > 0 else None,
+            'phases': phases,
+            'total_trades': result['total_trades'] if result else None,
+            'total_return': round(result['total_return'], 4) if result else None,
+            'process_peak_rss_mb': round(_peak_rss_mb(), 1),
+        }
+        results.append(item)
+        logger.info(f"[{name}] 耗时 {run_time:.2f} 秒 | {item['stock_days_per_sec']:,} 股票·日/秒 | "
+                    f"阶段 {phases} | 交易 {item['total_trades']} 次 | 进程峰值内存 {item['process_peak_rss_mb']} MB")
+
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {
+            'stocks': n_stocks,
+            'days': n_days,
+            'seed': seed,
+            'start_date': start_date,
+            'end_date': end_date,
+        },
+        'generate_seconds': round(generate_time, 4),
+        'preload_seconds': round(preload_time, 4),
+        'panel_rows': stock_days,
+        'results': results,
+    }
+
+
+def compare_results(current, baseline):
+    """
+    对比两次基准测试结果（按策略比较股票·日/秒和各阶段耗时）
+
+    Returns:
+        list: 对比行 [{strategy, metric, baseline, current, change_pct}, ...]
+    """
+    rows = []
+    baseline_by_name = {item['strategy']: item for item in baseline.get('results', [])}
+    for item in current['results']:
+        old = baseline_by_name.get(item['strategy'])
+        if old is None:
+            continue
+        metrics = [('stock_days_per_sec', item['stock_days_per_sec'], old.get('stock_days_per_sec'))]
+        metrics += [(f"phases.{p}", item['phases'].get(p), old.get('phases', {}).get(p)) for p in PHASES]
+        # 旧结果中该字段名为 peak_rss_mb（含义相同，均为进程累计峰值）
+        metrics.append(('process_peak_rss_mb', item['process_peak_rss_mb'],
+                        old.get('process_peak_rss_mb', old.get('peak_rss_mb'))))
+        for metric, new_value, old_value in metrics:
+            change = (new_value / old_value - 1) * 100 if old_value and new_value is not None else None
+            rows.append({
+                'strategy': item['strategy'],
+                'metric': metric,
+                'baseline': old_value,
+                'current': new_value,
+                'change_pct': round(change, 2) if change is not None else None,
+            })
+    return rows
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="TimeBasedBacktester 基准测试（合成市场 + SQLite）")
+    parser.add_argument('--stocks', type=int, default=500, help="合成股票数量")
+    parser.add_argument('--days', type=int, default=250, help="回测交易日数")
+    parser.add_argument('--strategies', nargs='*', default=None, help="策略名称，默认全部已注册策略")
+    parser.add_argument('--seed', type=int, default=42, help="随机种子")
+    parser.add_argument('--work-dir', default=None, help="SQLite 文件目录，默认临时目录")
+    parser.add_argument('--output', default=None, help="结果 JSON 路径，默认 benchmark_results/backtest_<提交号>_<时间>.json")
+    parser.add_argument('--compare', default=None, help="用于对比的历史结果 JSON")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.stocks, args.days, args.strategies, args.seed, args.work_dir)
+
+    output = args.output or os.path.join(
+        'benchmark_results',
+        f"backtest_{report['commit'] or 'nogit'}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logger.info(f"基准测试结果已保存至: {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        logger.info(f"对比基准: {args.compare} (提交 {baseline.get('commit')})")
+        for row in compare_results(report, baseline):
+            change = f"{row['change_pct']:+.2f}%" if row['change_pct'] is not None else "N/A"
+            logger.info(f"  {row['strategy']:<10} {row['metric']:<28} {row['baseline']} -> {row['current']} ({change})")
+
+
+if __name__ == "__main__":
+    main()
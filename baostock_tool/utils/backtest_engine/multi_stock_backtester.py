@@ -1,8 +1,10 @@
 # utils/backtest_engine/multi_stock_backtester.py
 import backtrader as bt
 import pandas as pd
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 import os
+import time
 from baostock_tool.utils.data_loader.market_loader import MarketDataLoader
 from baostock_tool.utils.data_loader.stock_loader import StockDataLoader
 from baostock_tool.utils.strategies.macd_strategy import MACDStrategy
@@ -11,113 +13,219 @@ from baostock_tool.utils.logger_utils.logger_tool import get_logger
 
 # 本代码仅用于回测研究，实盘使用风险自担
 
+# 单只股票的回测任务（只包含基本类型，可以直接 pickle 发送到工作进程）
+StockBacktestTask = namedtuple(
+    'StockBacktestTask',
+    ['market', 'code_int', 'name', 'start_date', 'end_date', 'initial_cash', 'commission']
+)
+
+# 工作进程内的状态（由 _init_worker 初始化，每个进程各自创建数据库引擎/镜像句柄）
+_worker_state = {}
+
+
+def _init_worker():
+    """工作进程初始化：创建进程独立的数据加载器"""
+    _worker_state['stock_loader'] = StockDataLoader()
+    _worker_state['logger'] = get_logger(__name__)
+
+
+def _run_task_chunk(tasks):
+    """在工作进程中依次回测一批股票，返回有效结果列表"""
+    results = []
+    for task in tasks:
+        result = run_stock_backtest(task, _worker_state['stock_loader'], _worker_state['logger'])
+        if result:
+            results.append(result)
+    return results
+
+
+def _safe_get_analysis(analyzer, key_path):
+    """安全获取分析结果"""
+    try:
+        result = analyzer.get_analysis()
+        keys = key_path.split('.')
+        for key in keys:
+            result = result.get(key, 0)
+        return result if result is not None else 0
+    except:
+        return 0
+
+
+def run_stock_backtest(task, stock_loader, logger):
+    """
+    单股票回测
+
+    Args:
+        task: StockBacktestTask
+        stock_loader: 数据加载器（StockDataLoader）
+        logger: 日志对象
+
+    Returns:
+        dict: 回测结果，无数据或失败时返回 None
+    """
+    market, code_int, name = task.market, task.code_int, task.name
+    logger.info(f"开始回测: {market}{code_int} {name}")
+
+    try:
+        # 创建回测引擎
+        cerebro = bt.Cerebro()
+        cerebro.addstrategy(MACDStrategy)
+
+        # 加载数据（提前2年用于指标初始化）
+        data = stock_loader.load_single_stock_data(
+            market, code_int, task.start_date, task.end_date
+        )
+        if data is None:
+            return None
+
+        cerebro.adddata(data)
+        cerebro.broker.setcash(task.initial_cash)
+        cerebro.broker.setcommission(commission=task.commission)
+
+        # 添加分析器
+        cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
+        cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
+        cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
+        cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
+
+        # 运行回测
+        results = cerebro.run()
+        strategy = results[0]
+
+        # 收集结果
+        final_value = cerebro.broker.getvalue()
+        result = {
+            'market': market,
+            'code_int': code_int,
+            'name': name,
+            'initial_cash': task.initial_cash,
+            'final_value': final_value,
+            'total_return': (final_value / task.initial_cash - 1) * 100,
+            'sharpe_ratio': _safe_get_analysis(strategy.analyzers.sharpe, 'sharperatio'),
+            'max_drawdown': _safe_get_analysis(strategy.analyzers.drawdown, 'max.drawdown'),
+            'total_trades': _safe_get_analysis(strategy.analyzers.trades, 'total.total')
+        }
+
+        logger.info(f"完成回测: {market}{code_int}, 收益率: {result['total_return']:.2f}%")
+        return result
+
+    except Exception as e:
+        logger.error(f"回测{market}{code_int}失败: {e}")
+        return None
+
+
 class MultiStockBacktester:
-    def __init__(self, initial_cash=100000.0, max_workers=None):
+    def __init__(self, initial_cash=100000.0, max_workers=None,
+                 start_date='2018-01-01', end_date='2025-12-31', commission=0.001):
         self.initial_cash = initial_cash
         self.max_workers = max_workers or os.cpu_count()
+        self.start_date = start_date
+        self.end_date = end_date
+        self.commission = commission
         self.market_loader = MarketDataLoader()
-        self.stock_loader = StockDataLoader()
         self.logger = get_logger(__name__)
         self.results = []
+        self._stock_loader = None
 
-    def backtest_single_stock(self, stock_info):
-        """单股票回测（用于并行处理）"""
+    @property
+    def stock_loader(self):
+        """串行回测使用的数据加载器（延迟创建，并行模式下主进程不持有数据库连接）"""
+        if self._stock_loader is None:
+            self._stock_loader = StockDataLoader()
+        return self._stock_loader
+
+    def _make_task(self, stock_info):
+        """构建单股票回测任务"""
         market, code_int, name = stock_info
-        self.logger.info(f"开始回测: {market}{code_int} {name}")
-
-        try:
-            # 创建回测引擎
-            cerebro = bt.Cerebro()
-            cerebro.addstrategy(MACDStrategy)
-
-            # 加载数据（提前2年用于指标初始化）
-            data = self.stock_loader.load_single_stock_data(
-                market, code_int, '2018-01-01', '2025-12-31'
-            )
-            if data is None:
-                return None
-
-            cerebro.adddata(data)
-            cerebro.broker.setcash(self.initial_cash)
-            cerebro.broker.setcommission(commission=0.001)
-
-            # 添加分析器
-            cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
-            cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-            cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
-            cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
-
-            # 运行回测
-            results = cerebro.run()
-            strategy = results[0]
-
-            # 收集结果
-            final_value = cerebro.broker.getvalue()
-            result = {
-                'market': market,
-                'code_int': code_int,
-                'name': name,
-                'initial_cash': self.initial_cash,
-                'final_value': final_value,
-                'total_return': (final_value / self.initial_cash - 1) * 100,
-                'sharpe_ratio': self._safe_get_analysis(strategy.analyzers.sharpe, 'sharperatio'),
-                'max_drawdown': self._safe_get_analysis(strategy.analyzers.drawdown, 'max.drawdown'),
-                'total_trades': self._safe_get_analysis(strategy.analyzers.trades, 'total.total')
-            }
-
-            self.logger.info(f"完成回测: {market}{code_int}, 收益率: {result['total_return']:.2f}%")
-            return result
-
-        except Exception as e:
-            self.logger.error(f"回测{market}{code_int}失败: {e}")
-            return None
+        return StockBacktestTask(
+            market=str(market),
+            code_int=int(code_int),
+            name=str(name),
+            start_date=self.start_date,
+            end_date=self.end_date,
+            initial_cash=float(self.initial_cash),
+            commission=float(self.commission),
+        )
+
+    def backtest_single_stock(self, stock_info):
+        """单股票回测（串行模式）"""
+        return run_stock_backtest(self._make_task(stock_info), self.stock_loader, self.logger)
+
+    def run_batch_backtest(self, sample_size=50, parallel=True, chunk_size=None):
+        """
+        批量回测
 
-    def run_batch_backtest(self, sample_size=50):
-        """批量回测（支持并行）"""
+        Args:
+            sample_size: 抽样股票数量，None 或 0 表示全市场
+            parallel: 是否多进程并行
+            chunk_size: 每个进程任务包含的股票数量，默认按进程数自动计算
+
+        Returns:
+            dict: 批量回测汇总
+        """
         # 获取股票列表
-        trading_dates = self.market_loader.get_trading_dates('2020-01-01', '2024-12-31')
-        print(trading_dates)
         stock_list = self.market_loader.get_all_stock_codes()
         if sample_size and len(stock_list) > sample_size:
             stock_list = stock_list.sample(sample_size)  # 抽样测试
 
-        self.logger.info(f"开始批量回测，股票数量: {len(stock_list)}")
-
-        # 串行回测（稳定版）
-        results = []
-        for _, stock in stock_list.iterrows():
-            result = self.backtest_single_stock(
-                (stock['market'], stock['code_int'], stock['name'])
-            )
-            if result:
-                results.append(result)
-
-        # 并行回测版本（高级功能，需要时启用）
-        # with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-        #     futures = [
-        #         executor.submit(self.backtest_single_stock,
-        #                        (row['market'], row['code_int'], row['name']))
-        #         for _, row in stock_list.iterrows()
-        #     ]
-        #
-        #     for future in as_completed(futures):
-        #         result = future.result()
-        #         if result:
-        #             results.append(result)
-
-        self.results = results
+        tasks = [
+            self._make_task((market, code_int, name))
+            for market, code_int, name in zip(stock_list['market'], stock_list['code_int'], stock_list['name'])
+        ]
+        self.logger.info(f"开始批量回测，股票数量: {len(tasks)}，"
+                         f"模式: {'并行 ' + str(self.max_workers) + ' 进程' if parallel else '串行'}")
+
+        start_time = time.time()
+        self.results = []
+        if parallel and self.max_workers > 1 and len(tasks) > 1:
+            self._run_parallel(tasks, chunk_size)
+        else:
+            for task in tasks:
+                result = run_stock_backtest(task, self.stock_loader, self.logger)
+                if result:
+                    self.results.append(result)
+
+        elapsed = time.time() - start_time
+        self.logger.info(f"批量回测完成: 有效结果 {len(self.results)}/{len(tasks)}，"
+                         f"耗时 {elapsed:.2f} 秒，{len(tasks) / elapsed if elapsed > 0 else 0:.2f} 只/秒")
         return self._analyze_results()
 
+    def _run_parallel(self, tasks, chunk_size=None):
+        """
+        多进程并行回测
+
+        任务按批提交，同时在途的批次数限制为进程数的 2 倍，避免一次性提交全市场任务占用内存；
+        每批完成后结果立即并入 self.results。
+        """
+        if chunk_size is None:
+            # 每个进程约分到 8 批，兼顾负载均衡与进程间通信开销
+            chunk_size = max(1, min(20, len(tasks) // (self.max_workers * 8) or 1))
+        chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+        max_in_flight = self.max_workers * 2
+
+        done_tasks = 0
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker) as executor:
+            pending = {}
+            next_chunk = 0
+            while next_chunk < len(chunks) or pending:
+                while next_chunk < len(chunks) and len(pending) < max_in_flight:
+                    chunk = chunks[next_chunk]
+                    pending[executor.submit(_run_task_chunk, chunk)] = chunk
+                    next_chunk += 1
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = pending.pop(future)
+                    done_tasks += len(chunk)
+                    try:
+                        self.results.extend(future.result())
+                    except Exception as e:
+                        self.logger.error(f"批次回测失败（{chunk[0].market}{chunk[0].code_int} 等 {len(chunk)} 只）: {e}")
+                self.logger.info(f"回测进度: {done_tasks}/{len(tasks)}，有效结果 {len(self.results)}")
+
     def _safe_get_analysis(self, analyzer, key_path):
         """安全获取分析结果"""
-        try:
-            result = analyzer.get_analysis()
-            keys = key_path.split('.')
-            for key in keys:
-                result = result.get(key, 0)
-            return result if result is not None else 0
-        except:
-            return 0
+        return _safe_get_analysis(analyzer, key_path)
 
     def _analyze_results(self):
         """分析批量回测结果"""
@@ -137,4 +245,4 @@ class MultiStockBacktester:
             'avg_max_drawdown': df['max_drawdown'].mean()
         }
 
-        return summary
\ No newline at end of file
+        return summary
@@ -0,0 +1,299 @@
+# utils/backtest_engine/param_sweep.py
+"""
+按时间遍历回测的参数扫描（网格搜索）
+
+特点：
+1. 行情只从数据库预加载一次，面板数组保存为 .npy 后由各工作进程以只读内存映射方式共享，
+   不通过 pickle 在进程间传递大数组
+2. 各参数组合在进程池中并行回测，同一进程内的组合共享指标缓存，
+   指标缓存同时持久化到临时目录，不同进程之间也可以复用已计算的均线等指标
+3. 结果批量写入 backtest_batch_summary，每个组合以 "策略名#参数摘要" 作为策略名称
+
+使用方式：
+    runner = ParameterSweepRunner(
+        strategy_name='value',
+        param_grid={'ma_period': [120, 210], 'buy_threshold': [-0.10, -0.15]},
+    )
+    results = runner.run(save_to_db=True)
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from baostock_tool import backtest_time_based_standard as backtest_module
+from baostock_tool.backtest_time_based_standard import TimeBasedBacktester, BACKTEST_CONFIG
+from baostock_tool.database_schema.strategy_trigger_db import StrategyTriggerDB
+from baostock_tool.utils.data_loader.indicator_cache import configure_indicator_cache, panel_fingerprint
+from baostock_tool.utils.data_loader.market_panel import MarketPanel
+from baostock_tool.utils.logger_utils.logger_tool import get_logger
+from baostock_tool.utils.strategies import get_strategy
+
+
+logger = get_logger(__name__)
+
+# 工作进程内的共享状态（由 _init_worker 初始化）
+_worker_state = {}
+
+
+def expand_param_grid(param_grid):
+    """
+    展开参数网格
+
+    Args:
+        param_grid: {参数名: [候选值, ...]}
+
+    Returns:
+        list: 参数组合列表 [{参数名: 值}, ...]
+    """
+    if not param_grid:
+        return [{}]
+    keys = list(param_grid.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*(param_grid[k] for k in keys))]
+
+
+def combination_name(base_name, params):
+    """
+    生成参数组合的策略名称（backtest_batch_summary 以策略名称区分不同组合）
+
+    Args:
+        base_name: 策略名称
+        params: 参数组合
+
+    Returns:
+        str: 形如 "ValueStrategy#1a2b3c4d" 的名称
+    """
+    digest = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:8]
+    return f"{base_name}#{digest}"
+
+
+def _shared_tmp_dir():
+    """优先使用 /dev/shm（内存文件系统），不可用时使用系统临时目录"""
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+
+def _init_worker(panel_dir, fingerprint, trading_dates, stock_codes, config_dict,
+                 strategy_name, cache_dir, log_level):
+    """工作进程初始化：内存映射加载面板，配置指标缓存和日志级别"""
+    panel = MarketPanel.load(panel_dir, mmap_mode='r')
+    panel._fingerprint = fingerprint
+    configure_indicator_cache(cache_dir=cache_dir)
+    backtest_module.logger.setLevel(log_level)
+
+    _worker_state.update({
+        'panel': panel,
+        'trading_dates': trading_dates,
+        'stock_codes': stock_codes,
+        'config': config_dict,
+        'strategy_name': strategy_name,
+    })
+
+
+def _run_combination(task):
+    """
+    在工作进程中回测一个参数组合
+
+    Args:
+        task: (组合序号, 参数字典)
+
+    Returns:
+        dict: 回测汇总（不含逐笔交易记录）
+    """
+    index, params = task
+    start_time = time.time()
+    try:
+        strategy = get_strategy(_worker_state['strategy_name'], params)
+        run_name = combination_name(strategy.STRATEGY_NAME, params)
+
+        backtester = TimeBasedBacktester(dict(_worker_state['config']), strategy=strategy)
+        backtester.use_preloaded_data(
+            _worker_state['panel'],
+            _worker_state['trading_dates'],
+            _worker_state['stock_codes']
+        )
+        result = backtester.run_backtest(strategy_name=run_name, save_to_db=False, save_csv=False)
+        if result is None:
+            return {'index': index, 'params': params, 'error': '回测未返回结果'}
+
+        summary_json = dict(result['summary_json'])
+        summary_json['sweep_params'] = params
+
+        return {
+            'index': index,
+            'params': params,
+            'strategy_name': run_name,
+            'strategy_params': strategy.get_all_params(),
+            'summary_json': summary_json,
+            'stock_count': len({tp['stock_code'] for tp in backtester.trigger_points}),
+            'total_return': result['total_return'],
+            'max_drawdown': result['max_drawdown'],
+            'sharpe_ratio': result['sharpe_ratio'],
+            'total_trades': result['total_trades'],
+            'execution_time': time.time() - start_time,
+        }
+    except Exception as e:
+        return {'index': index, 'params': params, 'error': str(e)}
+
+
+class ParameterSweepRunner:
+    """
+    参数扫描执行器
+
+    对已注册策略（get_strategy）的参数网格做全组合回测，行情只加载一次。
+    """
+
+    def __init__(self, strategy_name, param_grid, config_dict=None, max_workers=None,
+                 worker_log_level=logging.WARNING):
+        """
+        初始化参数扫描
+
+        Args:
+            strategy_name: 已注册的策略名称（如 'value' / 'ma' / 'codebuddy'）
+            param_grid: 参数网格 {参数名: [候选值, ...]}
+            config_dict: 回测配置，默认使用 BACKTEST_CONFIG
+            max_workers: 进程数，默认 CPU 核数
+            worker_log_level: 工作进程中回测日志的级别（默认只输出警告，避免逐笔交易日志刷屏）
+        """
+        self.strategy_name = strategy_name
+        self.param_grid = param_grid
+        self.config = dict(config_dict or BACKTEST_CONFIG)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.worker_log_level = worker_log_level
+
+    def _valid_combinations(self):
+        """展开参数网格并过滤掉策略参数校验不通过的组合"""
+        combinations = []
+        for params in expand_param_grid(self.param_grid):
+            try:
+                get_strategy(self.strategy_name, params)
+                combinations.append(params)
+            except (AssertionError, ValueError) as e:
+                logger.warning(f"跳过无效参数组合 {params}: {e}")
+        return combinations
+
+    def run(self, save_to_db=True):
+        """
+        执行参数扫描
+
+        Args:
+            save_to_db: 是否将各组合的汇总结果批量写入 backtest_batch_summary
+
+        Returns:
+            list: 各组合的回测汇总，按总收益率降序排列
+        """
+        combinations = self._valid_combinations()
+        if not combinations:
+            logger.error("没有有效的参数组合")
+            return []
+
+        logger.info(f"{'='*60}")
+        logger.info(f"参数扫描: 策略 {self.strategy_name} | 组合数 {len(combinations)} | 进程数 {self.max_workers}")
+        logger.info(f"回测期间: {self.config['start_date']} 至 {self.config['end_date']}")
+
+        # 行情只加载一次
+        loader = TimeBasedBacktester(dict(self.config), strategy=get_strategy(self.strategy_name))
+        if not loader.load_market_data():
+            logger.error("行情加载失败，参数扫描终止")
+            return []
+
+        work_dir = tempfile.mkdtemp(prefix='param_sweep_', dir=_shared_tmp_dir())
+        results = []
+        failed = 0
+        sweep_start = time.time()
+        try:
+            panel_dir = os.path.join(work_dir, 'panel')
+            loader.panel.save(panel_dir)
+            cache_dir = self.config.get('indicator_cache_dir') or os.path.join(work_dir, 'indicators')
+
+            initargs = (
+                panel_dir,
+                panel_fingerprint(loader.panel),
+                loader.trading_dates,
+                loader.stock_codes,
+                self.config,
+                self.strategy_name,
+                cache_dir,
+                self.worker_log_level,
+            )
+            del loader
+
+            with ProcessPoolExecutor(max_workers=self.max_workers,
+                                     initializer=_init_worker,
+                                     initargs=initargs) as executor:
+                futures = [executor.submit(_run_combination, (i, params))
+                           for i, params in enumerate(combinations)]
+
+                for done_count, future in enumerate(as_completed(futures), 1):
+                    item = future.result()
+                    if 'error' in item:
+                        failed += 1
+                        logger.error(f"参数组合 {item['params']} 回测失败: {item['error']}")
+                    else:
+                        results.append(item)
+
+                    elapsed = time.time() - sweep_start
+                    logger.info(f"扫描进度: {done_count}/{len(combinations)} | "
+                                f"{done_count / elapsed:.2f} 组合/秒 | "
+                                f"{item['params']} -> "
+                                + (f"收益率 {item['total_return']:.2f}%" if 'error' not in item else "失败"))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        total_time = time.time() - sweep_start
+        results.sort(key=lambda x: x['total_return'], reverse=True)
+
+        if save_to_db and results:
+            self._save_summaries(results)
+
+        logger.info(f"{'='*60}")
+        logger.info(f"参数扫描完成: 成功 {len(results)} | 失败 {failed} | 耗时 {total_time:.2f} 秒 | "
+                    f"{len(combinations) / total_time:.2f} 组合/秒")
+        for rank, item in enumerate(results[:5], 1):
+            logger.info(f"  Top{rank}: {item['params']} | 收益率 {item['total_return']:.2f}% | "
+                        f"最大回撤 {item['max_drawdown']:.2f}% | 夏普 {item['sharpe_ratio']:.2f} | "
+                        f"交易 {item['total_trades']} 次")
+        logger.info(f"{'='*60}")
+
+        return results
+
+    def _save_summaries(self, results):
+        """批量写入回测汇总"""
+        summaries = [{
+            'strategy_name': item['strategy_name'],
+            'backtest_start_date': self.config['start_date'],
+            'backtest_end_date': self.config['end_date'],
+            'backtest_framework': 'time_based',
+            'summary_json': item['summary_json'],
+            'strategy_params_json': item['strategy_params'],
+            'stock_count': item['stock_count'],
+            'execution_time': round(item['execution_time'], 4),
+        } for item in results]
+
+        written = StrategyTriggerDB().bulk_upsert_summaries(summaries)
+        logger.info(f"回测汇总已批量写入数据库: {written}/{len(summaries)} 条")
+
+
+def main():
+    """主函数"""
+    runner = ParameterSweepRunner(
+        strategy_name='value',
+        param_grid={
+            'ma_period': [120, 210, 250],
+            'buy_threshold': [-0.10, -0.15, -0.20],
+            'max_pe_ttm': [20.0, 30.0],
+        },
+        config_dict=BACKTEST_CONFIG,
+    )
+    return runner.run(save_to_db=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# utils/backtest_engine/position_book.py
+"""
+数组化的持仓簿
+
+持仓仍以 {stock_code: Position} 的字典接口对外提供（策略、日志、交易记录照常使用 Position 对象），
+同时为每个持仓分配一个槽位，在定长数组中维护：
+    stock_idx   持仓股票在面板中的下标（不在面板中为 -1）
+    volume      持仓数量
+    buy_price   买入价（不在面板中的股票按买入价估值）
+    cost        盈亏计算使用的成本（补仓后为平均成本）
+
+每个交易日调用一次 set_date(date_pos)，按面板行指针得到各槽位当天的数据行号，
+之后当日市值为一次向量点积，各持仓盈亏比例为一次向量运算，不再逐只做 pandas 索引。
+
+持仓数量或成本变化（补仓）后需要调用 refresh(stock_code) 同步数组。
+"""
+
+import numpy as np
+
+
+class PositionBook:
+    """
+    持仓簿（字典接口 + 槽位数组）
+
+    估值语义与逐只计算一致：
+    1. 股票在面板中且当天有行情：按当日收盘价估值
+    2. 股票在面板中但当天无行情（停牌）：不计入市值
+    3. 股票不在面板中：按买入价估值
+    """
+
+    def __init__(self, panel=None, capacity=128):
+        """
+        初始化持仓簿
+
+        Args:
+            panel: 全市场日线面板（MarketPanel），可稍后通过 bind_panel 设置
+            capacity: 初始槽位数量（不足时自动倍增）
+        """
+        self.panel = panel
+        self._positions = {}
+        self._slots = {}
+        self._free_slots = []
+
+        self.stock_idx = np.full(capacity, -1, dtype=np.int64)
+        self.volume = np.zeros(capacity, dtype=np.float64)
+        self.buy_price = np.zeros(capacity, dtype=np.float64)
+        self.cost = np.zeros(capacity, dtype=np.float64)
+        self.active = np.zeros(capacity, dtype=bool)
+
+        # 当日行指针（set_date 计算）：各槽位当天的面板行号，无行情为 -1
+        self.date_pos = -1
+        self._day_rows = np.full(capacity, -1, dtype=np.int64)
+
+    def bind_panel(self, panel):
+        """绑定面板并重新计算已有持仓的股票下标"""
+        self.panel = panel
+        for stock_code, slot in self._slots.items():
+            self.stock_idx[slot] = self._panel_index(stock_code)
+        self.set_date(-1)
+
+    # ==================== 字典接口 ====================
+
+    def __contains__(self, stock_code):
+        return stock_code in self._positions
+
+    def __getitem__(self, stock_code):
+        return self._positions[stock_code]
+
+    def __setitem__(self, stock_code, position):
+        if stock_code in self._positions:
+            self._positions[stock_code] = position
+            self.refresh(stock_code)
+            return
+        slot = self._free_slots.pop() if self._free_slots else self._grow()
+        self._positions[stock_code] = position
+        self._slots[stock_code] = slot
+        self.stock_idx[slot] = self._panel_index(stock_code)
+        self.active[slot] = True
+        self._write_slot(slot, position)
+        self._day_rows[slot] = self._row_of(slot)
+
+    def __delitem__(self, stock_code):
+        del self._positions[stock_code]
+        slot = self._slots.pop(stock_code)
+        self.active[slot] = False
+        self.stock_idx[slot] = -1
+        self.volume[slot] = 0.0
+        self.buy_price[slot] = 0.0
+        self.cost[slot] = 0.0
+        self._day_rows[slot] = -1
+        self._free_slots.append(slot)
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __bool__(self):
+        return bool(self._positions)
+
+    def get(self, stock_code, default=None):
+        return self._positions.get(stock_code, default)
+
+    def keys(self):
+        return self._positions.keys()
+
+    def values(self):
+        return self._positions.values()
+
+    def items(self):
+        return self._positions.items()
+
+    # ==================== 槽位数组维护 ====================
+
+    def _panel_index(self, stock_code):
+        if self.panel is None:
+            return -1
+        return self.panel.code_index.get(stock_code, -1)
+
+    def _grow(self):
+        """槽位倍增，返回新增的第一个空闲槽位"""
+        old_capacity = len(self.active)
+        new_capacity = old_capacity * 2
+        for name, fill in (('stock_idx', -1), ('volume', 0.0), ('buy_price', 0.0),
+                           ('cost', 0.0), ('active', False), ('_day_rows', -1)):
+            old = getattr(self, name)
+            new = np.full(new_capacity, fill, dtype=old.dtype)
+            new[:old_capacity] = old
+            setattr(self, name, new)
+        self._free_slots.extend(range(new_capacity - 1, old_capacity, -1))
+        return old_capacity
+
+    def _write_slot(self, slot, position):
+        self.volume[slot] = position.volume
+        self.buy_price[slot] = position.buy_price
+        self.cost[slot] = position.avg_cost if position.added_position else position.buy_price
+
+    def _row_of(self, slot):
+        """单个槽位在当前日期的面板行号"""
+        s = self.stock_idx[slot]
+        if self.panel is None or self.date_pos < 0 or s < 0 or not self.panel.present[self.date_pos, s]:
+            return -1
+        return int(self.panel.offsets[s] + self.panel.row_ptr[self.date_pos, s] - 1)
+
+    def refresh(self, stock_code):
+        """持仓数量或成本变化后同步数组"""
+        slot = self._slots[stock_code]
+        self._write_slot(slot, self._positions[stock_code])
+
+    def slot_of(self, stock_code):
+        """持仓的槽位号"""
+        return self._slots[stock_code]
+
+    # ==================== 按日估值 ====================
+
+    def set_date(self, date_pos):
+        """
+        设置当前交易日并计算各槽位当天的面板行号
+
+        Args:
+            date_pos: 当天在面板中的日期下标（当天无任何行情时为 -1）
+        """
+        self.date_pos = date_pos
+        self._day_rows.fill(-1)
+        if self.panel is None or date_pos < 0:
+            return
+        slots = np.nonzero(self.active & (self.stock_idx >= 0))[0]
+        if len(slots) == 0:
+            return
+        s = self.stock_idx[slots]
+        present = self.panel.present[date_pos, s]
+        rows = self.panel.offsets[s] + self.panel.row_ptr[date_pos, s].astype(np.int64) - 1
+        self._day_rows[slots] = np.where(present, rows, -1)
+
+    def prices(self, field='close'):
+        """
+        各槽位当天的价格
+
+        Returns:
+            ndarray: 长度为槽位数，当天无行情（或不在面板中）的槽位为 NaN
+        """
+        prices = np.full(len(self.active), np.nan)
+        has_row = self._day_rows >= 0
+        if self.panel is not None and has_row.any():
+            prices[has_row] = self.panel.values[self._day_rows[has_row], self.panel.field_index[field]]
+        return prices
+
+    def price_of(self, stock_code, field='close'):
+        """单只持仓当天的价格，当天无行情时返回 None"""
+        row = self._day_rows[self._slots[stock_code]]
+        if row < 0:
+            return None
+        return float(self.panel.values[row, self.panel.field_index[field]])
+
+    def market_value(self):
+        """
+        持仓当日市值（收盘价估值，语义见类说明）
+
+        Returns:
+            float: 持仓市值（不含现金）
+        """
+        in_panel = self.active & (self.stock_idx >= 0)
+        close = np.where(self._day_rows >= 0, self.prices('close'), 0.0)
+        value = np.dot(self.volume[in_panel], close[in_panel])
+        not_in_panel = self.active & (self.stock_idx < 0)
+        if not_in_panel.any():
+            value += np.dot(self.volume[not_in_panel], self.buy_price[not_in_panel])
+        return float(value)
+
+    def book_value(self):
+        """持仓按买入价计算的市值（交易日志中的总资产估算）"""
+        return float(np.dot(self.volume[self.active], self.buy_price[self.active]))
+
+    def profit_rates(self):
+        """
+        各持仓当日收盘价相对成本的盈亏比例（当天无行情或成本为 0 时为 0）
+
+        Returns:
+            dict: {stock_code: 盈亏比例}，按持仓顺序
+        """
+        close = self.prices('close')
+        valid = self.active & (self._day_rows >= 0) & (self.cost > 0)
+        rates = np.zeros(len(self.active))
+        rates[valid] = (close[valid] - self.cost[valid]) / self.cost[valid]
+        return {stock_code: float(rates[self._slots[stock_code]]) for stock_code in self._positions}
@@ -0,0 +1,260 @@
+# utils/data_loader/indicator_cache.py
+"""
+基于全市场面板的指标缓存
+
+1. 指标以面板行数组的形式计算（与 MarketPanel.values 的行一一对应），
+   每个 (指标, 参数, 面板) 组合只计算一次，股票与日期范围由面板指纹确定
+2. 同一进程内的多次回测（如参数扫描）共享同一个缓存实例，
+   修改 buy_threshold 等不影响指标的参数时直接复用已计算的均线
+3. 按内存预算做 LRU 淘汰，可选持久化到磁盘（.npy，读取时内存映射）
+
+使用方式：
+    cache = get_indicator_cache()
+    ma = cache.get(panel, 'rolling_mean', field='close', window=210)
+    prev_min = cache.get(panel, 'rolling_min', field='volume', window=30, lag=1)
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from baostock_tool.utils.logger_utils.logger_tool import get_logger
+
+
+logger = get_logger(__name__)
+
+# 默认内存预算：512MB
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def _rolling_mean(panel, field, window, skipna=False):
+    return panel.rolling_mean(field, window, skipna=skipna)
+
+
+def _rolling_min(panel, field, window):
+    return panel.rolling_min(field, window)
+
+
+def _field(panel, field):
+    return np.ascontiguousarray(panel.column(field))
+
+
+# 指标注册表：{指标名: 计算函数(panel, **params) -> 行数组}
+INDICATOR_REGISTRY = {
+    'field': _field,
+    'rolling_mean': _rolling_mean,
+    'rolling_min': _rolling_min,
+}
+
+
+def register_indicator(name, func):
+    """
+    注册自定义指标
+
+    Args:
+        name: 指标名称
+        func: 计算函数，签名为 func(panel, **params)，返回与面板行对齐的一维数组
+    """
+    INDICATOR_REGISTRY[name] = func
+
+
+def panel_fingerprint(panel):
+    """
+    计算面板指纹（股票集合 + 日期范围 + 数据内容），用作缓存键和磁盘文件名的一部分
+
+    结果缓存在面板对象上，同一面板只计算一次。
+    """
+    fingerprint = getattr(panel, '_fingerprint', None)
+    if fingerprint is None:
+        h = hashlib.blake2b(digest_size=12)
+        h.update(','.join(panel.codes).encode())
+        h.update(np.ascontiguousarray(panel.offsets).tobytes())
+        h.update(np.ascontiguousarray(panel.row_dates).view(np.int64).tobytes())
+        h.update(','.join(panel.fields).encode())
+        h.update(np.ascontiguousarray(panel.values).tobytes())
+        fingerprint = h.hexdigest()
+        panel._fingerprint = fingerprint
+    return fingerprint
+
+
+class IndicatorCache:
+    """
+    指标缓存（线程安全）
+
+    缓存键为 (指标名, 参数, 面板指纹)，值为与面板行对齐的只读数组。
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, cache_dir=None):
+        """
+        初始化指标缓存
+
+        Args:
+            max_bytes: 内存预算（字节），超出后按最近最少使用淘汰
+            cache_dir: 磁盘持久化目录，None 表示不持久化
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.RLock()
+
+        # 统计数据
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    @staticmethod
+    def make_key(indicator, params, fingerprint):
+        """生成缓存键"""
+        return indicator, tuple(sorted(params.items())), fingerprint
+
+    def _disk_path(self, key):
+        """缓存键对应的磁盘文件路径"""
+        indicator, params, fingerprint = key
+        params_digest = hashlib.md5(repr(params).encode()).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{indicator}_{params_digest}_{fingerprint}.npy")
+
+    def get(self, panel, indicator, lag=0, **params):
+        """
+        获取指标行数组（不存在时计算并缓存）
+
+        Args:
+            panel: 全市场日线面板（MarketPanel）
+            indicator: 指标名称（见 INDICATOR_REGISTRY）
+            lag: 按股票分段向后平移的行数（如 lag=1 表示取前一交易日的指标值）
+            **params: 指标参数
+
+        Returns:
+            ndarray: 与面板行对齐的只读数组
+        """
+        if indicator not in INDICATOR_REGISTRY:
+            raise ValueError(f"指标 '{indicator}' 不存在，可用指标: {list(INDICATOR_REGISTRY.keys())}")
+
+        key_params = dict(params, lag=lag) if lag else params
+        key = self.make_key(indicator, key_params, panel_fingerprint(panel))
+
+        with self._lock:
+            values = self._entries.get(key)
+            if values is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return values
+
+        values = self._load_from_disk(key)
+        if values is None:
+            self.misses += 1
+            if lag:
+                values = panel.shift(self.get(panel, indicator, **params), lag)
+            else:
+                values = np.asarray(INDICATOR_REGISTRY[indicator](panel, **params), dtype=np.float64)
+            values.setflags(write=False)
+            self._save_to_disk(key, values)
+
+        self._put(key, values)
+        return values
+
+    def get_stock_series(self, panel, stock_code, indicator, lag=0, **params):
+        """
+        获取单只股票的指标序列（面板数组的切片视图）
+
+        Returns:
+            ndarray: 该股票全部行对应的指标值，股票不在面板中时返回 None
+        """
+        stock_idx = panel.code_index.get(stock_code)
+        if stock_idx is None:
+            return None
+        values = self.get(panel, indicator, lag=lag, **params)
+        return values[panel.offsets[stock_idx]:panel.offsets[stock_idx + 1]]
+
+    def _put(self, key, values):
+        """写入内存缓存并按预算淘汰"""
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = values
+            self._nbytes += values.nbytes
+            while self._nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+    def _load_from_disk(self, key):
+        """从磁盘读取缓存（内存映射）"""
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            values = np.load(path, mmap_mode='r')
+            self.disk_hits += 1
+            return values
+        except Exception as e:
+            logger.error(f"读取指标缓存失败 {path}: {e}")
+            return None
+
+    def _save_to_disk(self, key, values):
+        """持久化到磁盘（先写临时文件再改名，避免并发读到半个文件）"""
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, values)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"保存指标缓存失败: {e}")
+
+    def clear(self):
+        """清空内存缓存（不删除磁盘文件）"""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    @property
+    def nbytes(self):
+        """当前内存缓存占用字节数"""
+        return self._nbytes
+
+    def stats(self):
+        """缓存统计信息"""
+        return {
+            'entries': len(self._entries),
+            'nbytes': self._nbytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_indicator_cache():
+    """获取进程内共享的指标缓存实例"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = IndicatorCache()
+        return _default_cache
+
+
+def configure_indicator_cache(max_bytes=None, cache_dir=None):
+    """
+    配置进程内共享的指标缓存
+
+    Args:
+        max_bytes: 内存预算（字节），None 表示不修改
+        cache_dir: 磁盘持久化目录，None 表示不修改
+    """
+    cache = get_indicator_cache()
+    if max_bytes is not None:
+        cache.max_bytes = max_bytes
+    if cache_dir is not None:
+        cache.cache_dir = cache_dir
+    return cache
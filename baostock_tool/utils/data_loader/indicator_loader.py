@@ -0,0 +1,80 @@
+# utils/data_loader/indicator_loader.py
+"""
+读取预计算的日线技术指标（stock_daily_indicator，由 update_stock_indicators.py 增量写入）
+
+按股票批量读取预计算的 MACD/MA/KDJ/RSI/CCI 等指标；现有策略仍在回测中自行计算指标，尚未接入本模块。
+
+使用方式：
+    df = load_daily_indicators(engine, [('sh', 600000)], '2024-01-01', '2024-12-31',
+                               fields=('macd_dif', 'macd_dea', 'ma_5'))
+"""
+
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from baostock_tool.database_schema.bulk_loader import INDICATOR_FIELDS
+from baostock_tool.utils.logger_utils.logger_tool import get_logger
+
+
+logger = get_logger(__name__)
+
+# 单条语句 IN 列表中的股票数量上限
+DEFAULT_CODES_PER_QUERY = 1000
+
+
+def load_daily_indicators(engine, stock_codes, start_date, end_date, fields=INDICATOR_FIELDS,
+                          codes_per_query=DEFAULT_CODES_PER_QUERY):
+    """
+    加载技术指标
+
+    Args:
+        engine: SQLAlchemy 引擎
+        stock_codes: 股票列表 [(market, code_int, ...), ...]
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+        fields: 指标字段，取自 INDICATOR_FIELDS
+        codes_per_query: 单条语句中 IN 列表的股票数量上限
+
+    Returns:
+        pd.DataFrame: 列为 market, code_int, date 和 fields，按 market, code_int, date 排序；
+                      出错或无数据时返回空 DataFrame
+    """
+    unknown = [f for f in fields if f not in INDICATOR_FIELDS]
+    if unknown:
+        raise ValueError(f"未知的指标字段: {unknown}")
+
+    codes_by_market = {}
+    for item in stock_codes:
+        codes_by_market.setdefault(item[0], []).append(int(item[1]))
+
+    query = text(f"""
+        SELECT market, code_int, date, {', '.join(fields)}
+        FROM stock_daily_indicator
+        WHERE date >= :start_date
+          AND date <= :end_date
+          AND market = :market
+          AND code_int IN :code_ints
+    """).bindparams(bindparam('code_ints', expanding=True))
+
+    frames = []
+    try:
+        with engine.connect() as conn:
+            for market in sorted(codes_by_market):
+                code_ints = sorted(set(codes_by_market[market]))
+                for i in range(0, len(code_ints), codes_per_query):
+                    frames.append(pd.read_sql(query, conn, params={
+                        'start_date': start_date,
+                        'end_date': end_date,
+                        'market': market,
+                        'code_ints': code_ints[i:i + codes_per_query],
+                    }, parse_dates=['date']))
+    except Exception as e:
+        logger.error(f"加载技术指标失败: {e}")
+        return pd.DataFrame(columns=['market', 'code_int', 'date', *fields])
+
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=['market', 'code_int', 'date', *fields])
+    df = pd.concat(frames, ignore_index=True)
+    df[list(fields)] = df[list(fields)].astype(float)
+    return df.sort_values(['market', 'code_int', 'date'], ignore_index=True)
@@ -0,0 +1,193 @@
+# utils/data_loader/kline_cache.py
+"""
+按股票缓存的日线 K 线序列（回测查看器 /api/kline_data 使用）
+
+1. 每只股票第一次请求时读取全部日线（一次索引范围扫描），按列存为 numpy 数组常驻内存（每行约 100 字节）
+2. 任意日期窗口在按日期排序的数组上二分查找，只把切片范围内的行转换为字典列表返回，不再查询数据库
+3. 按股票数量做 LRU 淘汰，超过 ttl 秒的序列下次访问时重新加载（获取新 K 线）
+4. 每个序列有内容版本号，窗口的 ETag 由版本号和窗口边界计算，浏览器可用 If-None-Match 跳过未变化的数据
+
+使用方式：
+    cache = get_kline_cache(engine, max_stocks=256, ttl=300)
+    records, etag, last_modified = cache.get_window('sh', 600000, '2025-01-01', '2025-03-31')
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from baostock_tool.utils.logger_utils.logger_tool import get_logger
+
+
+logger = get_logger(__name__)
+
+KLINE_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume', 'amount', 'pctChg']
+
+DEFAULT_MAX_STOCKS = 256
+DEFAULT_TTL = 300
+
+_SERIES_SQL = text(f"""
+    SELECT {', '.join(KLINE_COLUMNS)}
+    FROM stock_daily_data USE INDEX (idx_market_code_date)
+    WHERE market = :market
+      AND code_int = :code_int
+      AND frequency = 'd'
+    ORDER BY date
+""")
+
+
+def normalize_kline(df):
+    """
+    K 线 DataFrame 转为前端使用的格式（按列向量化转换类型，不逐条处理）
+
+    Returns:
+        pd.DataFrame: 列为 KLINE_COLUMNS，date 为 YYYY-MM-DD 字符串，缺失值填 0
+    """
+    out = pd.DataFrame({'date': pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')})
+    for col in KLINE_COLUMNS[1:]:
+        values = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        out[col] = values.astype('int64' if col == 'volume' else float).to_numpy()
+    return out
+
+
+def series_version(df):
+    """序列内容的版本号（日期 + 全部字段），内容不变时重新加载得到相同的值"""
+    h = hashlib.blake2b(digest_size=12)
+    h.update('\n'.join(df['date']).encode())
+    h.update(np.ascontiguousarray(df[KLINE_COLUMNS[1:]].to_numpy(np.float64)).tobytes())
+    return h.hexdigest()
+
+
+class KlineSeriesCache:
+    """
+    单只股票完整日线序列的 LRU + TTL 缓存
+
+    线程安全：缓存结构的读写加锁，加载在锁外进行（同一只股票并发首次请求时可能重复加载一次）。
+    """
+
+    def __init__(self, engine, max_stocks=DEFAULT_MAX_STOCKS, ttl=DEFAULT_TTL):
+        """
+        Args:
+            engine: SQLAlchemy 引擎
+            max_stocks: 最多缓存的股票数
+            ttl: 序列有效期（秒），0 表示不过期
+        """
+        self.engine = engine
+        self.max_stocks = max_stocks
+        self.ttl = ttl
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, market, code_int, previous=None):
+        with self.engine.connect() as conn:
+            df = pd.read_sql(_SERIES_SQL, conn, params={'market': market, 'code_int': int(code_int)})
+        df = normalize_kline(df)
+        version = series_version(df)
+        # 内容未变化时沿用原来的修改时间，浏览器的 If-Modified-Since 仍然有效
+        if previous is not None and previous['version'] == version:
+            last_modified = previous['last_modified']
+        else:
+            last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        return {
+            'dates': df['date'].to_numpy(dtype='U10'),
+            'columns': {col: df[col].to_numpy() for col in KLINE_COLUMNS[1:]},
+            'version': version,
+            'last_modified': last_modified,
+            'loaded_at': time.monotonic(),
+        }
+
+    def get_series(self, market, code_int):
+        """
+        获取股票的完整序列（缓存未命中或已过期时加载）
+
+        Returns:
+            dict: {dates, columns, version, last_modified, loaded_at}，columns 为 {列名: numpy 数组}
+        """
+        key = (market, int(code_int))
+        with self._lock:
+            entry = self._series.get(key)
+            if entry is not None and (not self.ttl or time.monotonic() - entry['loaded_at'] < self.ttl):
+                self._series.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = self._load(market, code_int, previous=entry)
+        with self._lock:
+            self._series[key] = entry
+            self._series.move_to_end(key)
+            while len(self._series) > self.max_stocks:
+                self._series.popitem(last=False)
+        return entry
+
+    def get_window(self, market, code_int, start_date, end_date):
+        """
+        获取日期窗口内的 K 线
+
+        Args:
+            market (str): 市场代码
+            code_int (int): 股票代码
+            start_date (str): 开始日期 YYYY-MM-DD（含）
+            end_date (str): 结束日期 YYYY-MM-DD（含）
+
+        Returns:
+            tuple: (字典列表, ETag, Last-Modified)
+        """
+        entry = self.get_series(market, code_int)
+        dates = entry['dates']
+        lo = int(np.searchsorted(dates, start_date, side='left'))
+        hi = int(np.searchsorted(dates, end_date, side='right'))
+        etag = hashlib.blake2b(f"{entry['version']}:{lo}:{hi}".encode(), digest_size=12).hexdigest()
+        window = pd.DataFrame({'date': dates[lo:hi]})
+        for col, values in entry['columns'].items():
+            window[col] = values[lo:hi]
+        return window.to_dict('records'), etag, entry['last_modified']
+
+    def invalidate(self, market=None, code_int=None):
+        """清除指定股票的序列；均为 None 时清空缓存"""
+        with self._lock:
+            if market is None and code_int is None:
+                self._series.clear()
+            else:
+                self._series.pop((market, int(code_int)), None)
+
+    def stats(self):
+        """缓存统计"""
+        with self._lock:
+            return {
+                'stocks': len(self._series),
+                'max_stocks': self.max_stocks,
+                'rows': sum(len(entry['dates']) for entry in self._series.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_kline_cache(engine=None, max_stocks=DEFAULT_MAX_STOCKS, ttl=DEFAULT_TTL):
+    """
+    获取进程内共享的 K 线缓存（首次调用时创建，之后的参数被忽略）
+
+    Args:
+        engine: SQLAlchemy 引擎，首次调用时必须提供
+        max_stocks: 最多缓存的股票数
+        ttl: 序列有效期（秒）
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            if engine is None:
+                raise ValueError("首次创建 K 线缓存时需要提供 engine")
+            _default_cache = KlineSeriesCache(engine, max_stocks, ttl)
+    return _default_cache
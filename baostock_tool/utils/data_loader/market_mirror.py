@@ -0,0 +1,574 @@
+# utils/data_loader/market_mirror.py
+"""
+stock_daily_data 日线的本地 Parquet 镜像
+
+目录结构（按年分区，与 MySQL 表的年分区一致）：
+    <root>/stock_daily_data/year=2024/part-20240102-20240628-<时间戳>.parquet
+    <root>/stock_daily_data/_sync_state.json      # 每个分区已同步到的最大日期
+
+1. 增量同步：每个年分区只拉取比该分区最大日期更新的行，写成新的 part 文件，
+   part 文件过多时自动合并（compact）
+2. 读取：以内存映射方式打开 Parquet 文件，按日期 / 市场 / 代码做谓词下推，只读取需要的列
+3. 已同步日期内被改写的行（前复权重算、补采、重建等）：
+   - 每个分区记录上次同步开始时数据库的时间，下次同步时按 updated_at 找出之后改写过的股票，
+     重新拉取这些股票在该分区已同步日期内的全部行
+   - 采集程序前复权重算后调用 invalidate(market, code_int) 标记股票，下次同步时重拉其所有已同步分区
+     （不依赖 updated_at 的取值）
+   - 数据库中被删除且未重写的行不会从镜像中消失，需要 --full 重建
+   - 本机制启用前同步的分区首次只记录时间，如怀疑已有陈旧数据需要 --full 重建对应年份
+
+使用方式：
+    # 同步（命令行）
+    python -m baostock_tool.utils.data_loader.market_mirror            # 增量同步
+    python -m baostock_tool.utils.data_loader.market_mirror --full 2024  # 重建 2024 年分区
+
+    # 读取
+    mirror = get_market_mirror()
+    if mirror is not None and mirror.covers(start_date, end_date):
+        df = mirror.read_daily(start_date, end_date, codes=[('sh', 600000)], columns=['date', 'close'])
+
+需要安装 pyarrow：pip install pyarrow
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import bindparam, create_engine, text
+from sqlalchemy.engine import URL
+
+from baostock_tool import config
+from baostock_tool.utils.logger_utils.logger_tool import get_logger
+
+# pyarrow 可选导入
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow import fs as pafs
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+logger = get_logger(__name__)
+
+TABLE_NAME = 'stock_daily_data'
+
+# 镜像保存的列（frequency 固定为 'd'，不保存）
+MIRROR_COLUMNS = [
+    'market', 'code_int', 'date', 'open', 'high', 'low', 'close', 'preclose',
+    'volume', 'amount', 'adjustflag', 'turn', 'tradestatus',
+    'pctChg', 'peTTM', 'psTTM', 'pcfNcfTTM', 'pbMRQ', 'isST',
+]
+
+# 单个分区 part 文件数超过该值时自动合并
+COMPACT_THRESHOLD = 20
+# 重新同步改写的股票时，单条语句 IN 列表中的股票数量上限
+REFRESH_CODES_PER_QUERY = 500
+
+
+def _arrow_schema():
+    """镜像文件统一的 Arrow schema（DECIMAL 统一转为 float64，便于下游直接使用）"""
+    return pa.schema([
+        ('market', pa.string()),
+        ('code_int', pa.int32()),
+        ('date', pa.date32()),
+        ('open', pa.float64()),
+        ('high', pa.float64()),
+        ('low', pa.float64()),
+        ('close', pa.float64()),
+        ('preclose', pa.float64()),
+        ('volume', pa.float64()),
+        ('amount', pa.float64()),
+        ('adjustflag', pa.int8()),
+        ('turn', pa.float64()),
+        ('tradestatus', pa.int8()),
+        ('pctChg', pa.float64()),
+        ('peTTM', pa.float64()),
+        ('psTTM', pa.float64()),
+        ('pcfNcfTTM', pa.float64()),
+        ('pbMRQ', pa.float64()),
+        ('isST', pa.int8()),
+    ])
+
+
+class MarketDataMirror:
+    """
+    stock_daily_data 日线的本地 Parquet 镜像
+    """
+
+    def __init__(self, root, engine=None):
+        """
+        初始化镜像
+
+        Args:
+            root: 镜像根目录
+            engine: 同步使用的 SQLAlchemy 引擎，None 时按配置文件创建（只读取时不会连接数据库）
+        """
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow 未安装，无法使用本地行情镜像，安装方法: pip install pyarrow")
+
+        self.root = root
+        self.table_dir = os.path.join(root, TABLE_NAME)
+        self.state_path = os.path.join(self.table_dir, '_sync_state.json')
+        # {年份: 上次同步开始时数据库的 NOW()}，用于按 updated_at 发现改写的行
+        self.refresh_state_path = os.path.join(self.table_dir, '_refresh_state.json')
+        # invalidate() 追加写入的待重新同步股票（每行 market,code_int）
+        self.stale_path = os.path.join(self.table_dir, '_stale_codes.txt')
+        self._engine = engine
+        self._filesystem = pafs.LocalFileSystem(use_mmap=True)
+
+    @property
+    def engine(self):
+        """同步使用的数据库引擎（延迟创建）"""
+        if self._engine is None:
+            db_config = config.get_db_config()
+            db_url = URL.create(
+                drivername="mysql+pymysql",
+                username=db_config["user"],
+                password=db_config["password"],
+                host=db_config["host"],
+                port=db_config["port"],
+                database=db_config["database"]
+            )
+            self._engine = create_engine(db_url, pool_pre_ping=True, pool_recycle=3600)
+        return self._engine
+
+    # ==================== 同步状态 ====================
+
+    def load_state(self):
+        """读取同步状态 {年份(str): 已同步的最大日期(YYYY-MM-DD)}"""
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"读取镜像同步状态失败: {e}")
+            return {}
+
+    def _save_state(self, state, path=None):
+        """保存同步状态（先写临时文件再改名）"""
+        path = path or self.state_path
+        os.makedirs(self.table_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def _load_refresh_state(self):
+        """读取改写检测状态 {年份(str): 上次同步开始时间(YYYY-MM-DD HH:MM:SS)}"""
+        if not os.path.exists(self.refresh_state_path):
+            return {}
+        try:
+            with open(self.refresh_state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"读取镜像改写检测状态失败: {e}")
+            return {}
+
+    def invalidate(self, market, code_int):
+        """
+        标记股票在镜像中的数据已过期，下次 sync 时重新拉取它所有已同步分区的行
+
+        供在已同步日期内改写数据的程序调用（前复权重算、删除后重建等）。
+        只追加一行到标记文件，不连接数据库，可在采集进程中调用。
+
+        Args:
+            market: 市场代码
+            code_int: 股票代码
+        """
+        os.makedirs(self.table_dir, exist_ok=True)
+        with open(self.stale_path, 'a', encoding='utf-8') as f:
+            f.write(f"{market},{int(code_int)}\n")
+
+    def _take_stale_codes(self):
+        """
+        取出待重新同步的股票
+
+        标记文件先改名再读取，改名之后 invalidate() 写入的新标记留给下一次同步；
+        上次同步中断遗留的 .processing 文件一并读取。
+
+        Returns:
+            tuple: ({(market, code_int), ...}, 处理完成后需要删除的文件列表)
+        """
+        if os.path.exists(self.stale_path):
+            os.replace(self.stale_path, f"{self.stale_path}.{datetime.now():%Y%m%d%H%M%S%f}.processing")
+        files = sorted(glob.glob(f"{self.stale_path}.*.processing"))
+        codes = set()
+        for path in files:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    market, _, code = line.strip().partition(',')
+                    if market and code.isdigit():
+                        codes.add((market, int(code)))
+        return codes, files
+
+    def watermark(self):
+        """镜像中最新一行的日期，镜像为空时返回 None"""
+        state = self.load_state()
+        if not state:
+            return None
+        return max(state.values())
+
+    def partition_dir(self, year):
+        """年分区目录"""
+        return os.path.join(self.table_dir, f"year={int(year)}")
+
+    def partition_files(self, year):
+        """年分区下的 part 文件（按文件名排序，即按同步先后排序）"""
+        return sorted(glob.glob(os.path.join(self.partition_dir(year), 'part-*.parquet')))
+
+    def covers(self, start_date, end_date):
+        """
+        判断镜像是否覆盖指定日期范围
+
+        覆盖条件：开始年份到 min(结束年份, 镜像最新年份) 的每个年分区都已同步。
+        镜像最新日期早于 end_date 时只记录警告（end_date 常为尚未到来的日期）。
+        """
+        state = self.load_state()
+        if not state:
+            return False
+
+        watermark = max(state.values())
+        start_year = pd.Timestamp(start_date).year
+        end_year = min(pd.Timestamp(end_date).year, pd.Timestamp(watermark).year)
+        if start_year > end_year:
+            return False
+
+        for year in range(start_year, end_year + 1):
+            if str(year) not in state:
+                return False
+
+        if watermark < pd.Timestamp(end_date).strftime('%Y-%m-%d'):
+            logger.warning(f"本地行情镜像数据截止 {watermark}，早于请求的结束日期 {end_date}，"
+                           f"如需最新数据请先执行增量同步")
+        return True
+
+    # ==================== 增量同步 ====================
+
+    def _query_year_range(self):
+        """查询 MySQL 中日线数据的年份范围"""
+        query = text(f"""
+            SELECT MIN(date) AS min_date, MAX(date) AS max_date
+            FROM {TABLE_NAME}
+            WHERE frequency = 'd'
+        """)
+        with self.engine.connect() as conn:
+            row = conn.execute(query).fetchone()
+        if row is None or row[0] is None:
+            return None, None
+        return pd.Timestamp(row[0]).year, pd.Timestamp(row[1]).year
+
+    def _fetch_range(self, start_date, end_date):
+        """
+        拉取 (start_date, end_date] 范围的日线（按月分段，限制单次查询和内存占用）
+
+        Yields:
+            DataFrame: 每个月的数据
+        """
+        month_start = pd.Timestamp(start_date) + timedelta(days=1)
+        end_ts = pd.Timestamp(end_date)
+        while month_start <= end_ts:
+            month_end = min(month_start + pd.offsets.MonthEnd(0), end_ts)
+            query = text(f"""
+                SELECT {', '.join(MIRROR_COLUMNS)}
+                FROM {TABLE_NAME}
+                WHERE frequency = 'd'
+                  AND date >= :start_date
+                  AND date <= :end_date
+            """)
+            with self.engine.connect() as conn:
+                df = pd.read_sql(query, conn, params={
+                    'start_date': month_start.strftime('%Y-%m-%d'),
+                    'end_date': month_end.strftime('%Y-%m-%d'),
+                })
+            if not df.empty:
+                yield df
+            month_start = month_end + timedelta(days=1)
+
+    def _db_now(self):
+        """数据库当前时间（与 updated_at 同一时钟）"""
+        with self.engine.connect() as conn:
+            return pd.Timestamp(conn.execute(text("SELECT NOW()")).scalar()).strftime('%Y-%m-%d %H:%M:%S')
+
+    def _changed_codes(self, year, synced_until, since):
+        """
+        分区已同步日期内 updated_at >= since 的股票（日期范围限定在分区内，按分区裁剪）
+
+        Returns:
+            set: {(market, code_int), ...}
+        """
+        query = text(f"""
+            SELECT DISTINCT market, code_int
+            FROM {TABLE_NAME}
+            WHERE frequency = 'd'
+              AND date >= :start_date
+              AND date <= :end_date
+              AND updated_at >= :since
+        """)
+        with self.engine.connect() as conn:
+            rows = conn.execute(query, {
+                'start_date': date(year, 1, 1).strftime('%Y-%m-%d'),
+                'end_date': synced_until,
+                'since': since,
+            }).fetchall()
+        return {(market, int(code_int)) for market, code_int in rows}
+
+    def _fetch_codes(self, codes, start_date, end_date):
+        """
+        拉取指定股票在 [start_date, end_date] 内的日线（每个市场按 IN 列表分块）
+
+        Yields:
+            DataFrame: 每块的数据
+        """
+        by_market = {}
+        for market, code_int in codes:
+            by_market.setdefault(market, []).append(int(code_int))
+        query = text(f"""
+            SELECT {', '.join(MIRROR_COLUMNS)}
+            FROM {TABLE_NAME}
+            WHERE frequency = 'd'
+              AND date >= :start_date
+              AND date <= :end_date
+              AND market = :market
+              AND code_int IN :code_ints
+        """).bindparams(bindparam('code_ints', expanding=True))
+        for market, code_ints in sorted(by_market.items()):
+            code_ints = sorted(code_ints)
+            for i in range(0, len(code_ints), REFRESH_CODES_PER_QUERY):
+                with self.engine.connect() as conn:
+                    df = pd.read_sql(query, conn, params={
+                        'start_date': start_date,
+                        'end_date': end_date,
+                        'market': market,
+                        'code_ints': code_ints[i:i + REFRESH_CODES_PER_QUERY],
+                    })
+                if not df.empty:
+                    yield df
+
+    def _refresh_partition(self, year, codes, synced_until):
+        """
+        重新拉取股票在分区已同步日期内的行，写成新的 part 文件（读取和合并时保留最后同步的版本）
+
+        Returns:
+            int: 写入的行数
+        """
+        rows = 0
+        for df in self._fetch_codes(codes, date(year, 1, 1).strftime('%Y-%m-%d'), synced_until):
+            self._write_part(year, df)
+            rows += len(df)
+        return rows
+
+    def _to_table(self, df):
+        """DataFrame 转换为统一 schema 的 Arrow 表（按 code_int, date 排序，利于行组统计裁剪）"""
+        df = df.copy()
+        df['date'] = pd.to_datetime(df['date']).dt.date
+        for col in MIRROR_COLUMNS:
+            if col in ('market', 'date'):
+                continue
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        df = df.sort_values(['code_int', 'date'], kind='mergesort')
+        return pa.Table.from_pandas(df[MIRROR_COLUMNS], schema=_arrow_schema(), preserve_index=False, safe=False)
+
+    def _write_part(self, year, df):
+        """写入一个 part 文件"""
+        os.makedirs(self.partition_dir(year), exist_ok=True)
+        dates = pd.to_datetime(df['date'])
+        name = (f"part-{dates.min():%Y%m%d}-{dates.max():%Y%m%d}-"
+                f"{datetime.now():%Y%m%d%H%M%S%f}.parquet")
+        path = os.path.join(self.partition_dir(year), name)
+        tmp_path = f"{path}.tmp"
+        pq.write_table(self._to_table(df), tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+        return path
+
+    def sync(self, full_years=None):
+        """
+        增量同步：每个年分区拉取比该分区已同步最大日期更新的行，
+        并重新拉取已同步日期内被改写（updated_at 更新或 invalidate 标记）的股票
+
+        Args:
+            full_years: 需要全量重建的年份列表（删除分区后从年初重新拉取）
+
+        Returns:
+            int: 本次同步写入的行数
+        """
+        start_time = time.time()
+        min_year, max_year = self._query_year_range()
+        if min_year is None:
+            logger.warning("数据库中没有日线数据，跳过同步")
+            return 0
+
+        state = self.load_state()
+        refresh_state = self._load_refresh_state()
+        stale_codes, stale_files = self._take_stale_codes()
+        # 在拉取之前取时间：同步过程中被改写的行下次会再拉取一次，不会漏掉
+        sync_started = self._db_now()
+        full_years = {int(y) for y in (full_years or [])}
+        total_rows = 0
+
+        for year in range(min_year, max_year + 1):
+            key = str(year)
+            if year in full_years:
+                for path in self.partition_files(year):
+                    os.remove(path)
+                state.pop(key, None)
+                refresh_state.pop(key, None)
+
+            year_end = date(year, 12, 31).strftime('%Y-%m-%d')
+            synced_until = state.get(key)
+
+            # 已同步日期内被改写的股票：标记的股票 + updated_at 晚于上次同步的股票
+            if synced_until is not None:
+                codes = set(stale_codes)
+                if key in refresh_state:
+                    codes |= self._changed_codes(year, synced_until, refresh_state[key])
+                if codes:
+                    refreshed = self._refresh_partition(year, codes, synced_until)
+                    logger.info(f"镜像分区 {year}: {len(codes)} 只股票的数据已改写，重新同步 {refreshed:,} 行")
+                    total_rows += refreshed
+            refresh_state[key] = sync_started
+            self._save_state(refresh_state, self.refresh_state_path)
+
+            if synced_until is not None and synced_until >= year_end:
+                if len(self.partition_files(year)) > COMPACT_THRESHOLD:
+                    self.compact(year)
+                continue
+
+            # 分区最大日期之后的行（新分区从上一年最后一天之后开始）
+            fetch_after = synced_until or date(year - 1, 12, 31).strftime('%Y-%m-%d')
+            year_rows = 0
+            for df in self._fetch_range(fetch_after, year_end):
+                self._write_part(year, df)
+                year_rows += len(df)
+                state[key] = pd.to_datetime(df['date']).max().strftime('%Y-%m-%d')
+                self._save_state(state)
+
+            if year_rows > 0:
+                logger.info(f"镜像分区 {year}: 新增 {year_rows:,} 行，同步至 {state[key]}")
+                total_rows += year_rows
+                if len(self.partition_files(year)) > COMPACT_THRESHOLD:
+                    self.compact(year)
+
+        # 标记的股票已在所有已同步分区中重新拉取
+        for path in stale_files:
+            os.remove(path)
+
+        logger.info(f"镜像同步完成: 写入 {total_rows:,} 行，耗时 {time.time() - start_time:.2f} 秒")
+        return total_rows
+
+    def compact(self, year):
+        """
+        合并年分区下的 part 文件（同一行出现多次时保留最后同步的版本）
+
+        Args:
+            year: 年份
+        """
+        files = self.partition_files(year)
+        if len(files) <= 1:
+            return
+
+        table = pq.read_table(files, schema=_arrow_schema())
+        df = table.to_pandas(date_as_object=False)
+        df = df.drop_duplicates(['market', 'code_int', 'date'], keep='last')
+        self._write_part(year, df)
+        for path in files:
+            os.remove(path)
+        logger.info(f"镜像分区 {year}: 合并 {len(files)} 个文件，共 {len(df):,} 行")
+
+    # ==================== 读取 ====================
+
+    def read_daily(self, start_date, end_date, codes=None, columns=None):
+        """
+        读取日线数据（内存映射 + 谓词/列下推）
+
+        Args:
+            start_date: 开始日期（含）
+            end_date: 结束日期（含）
+            codes: 股票列表 [(market, code_int), ...]，None 表示全部
+            columns: 需要的列，None 表示全部镜像列
+
+        Returns:
+            DataFrame: date 列为 datetime64，按 code_int, date 排序；无数据时返回空 DataFrame
+        """
+        start_ts, end_ts = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        files = []
+        for year in range(start_ts.year, end_ts.year + 1):
+            files.extend(self.partition_files(year))
+        columns = list(columns or MIRROR_COLUMNS)
+        if not files:
+            return pd.DataFrame(columns=columns)
+
+        # 去重和排序需要的键列
+        read_columns = list(dict.fromkeys(columns + ['market', 'code_int', 'date']))
+
+        dataset = ds.dataset(files, schema=_arrow_schema(), format='parquet', filesystem=self._filesystem)
+        expr = (ds.field('date') >= start_ts.date()) & (ds.field('date') <= end_ts.date())
+        if codes is not None:
+            by_market = {}
+            for market, code_int in codes:
+                by_market.setdefault(market, []).append(int(code_int))
+            code_expr = None
+            for market, code_ints in by_market.items():
+                term = (ds.field('market') == market) & ds.field('code_int').isin(code_ints)
+                code_expr = term if code_expr is None else (code_expr | term)
+            if code_expr is None:
+                return pd.DataFrame(columns=columns)
+            expr = expr & code_expr
+
+        table = dataset.to_table(columns=read_columns, filter=expr)
+        df = table.to_pandas(date_as_object=False)
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+
+        # 同一分区多个 part 文件中可能有重复行，保留最后同步的版本
+        df = df.drop_duplicates(['market', 'code_int', 'date'], keep='last')
+        df = df.sort_values(['code_int', 'date'], kind='mergesort').reset_index(drop=True)
+        return df[columns]
+
+
+_default_mirror = None
+
+
+def get_market_mirror():
+    """
+    获取配置启用的本地行情镜像
+
+    Returns:
+        MarketDataMirror: 镜像对象，未启用或 pyarrow 未安装时返回 None
+    """
+    global _default_mirror
+    mirror_config = config.get_mirror_config()
+    if not mirror_config['enabled']:
+        return None
+    if not PYARROW_AVAILABLE:
+        logger.warning("已启用本地行情镜像，但 pyarrow 未安装，回退到数据库查询")
+        return None
+    if _default_mirror is None or _default_mirror.root != mirror_config['root']:
+        _default_mirror = MarketDataMirror(mirror_config['root'])
+    return _default_mirror
+
+
+def main():
+    """命令行入口：增量同步本地行情镜像"""
+    parser = argparse.ArgumentParser(description="同步 stock_daily_data 本地 Parquet 镜像")
+    parser.add_argument('--root', default=None, help="镜像根目录（默认读取配置文件 [mirror] root）")
+    parser.add_argument('--full', nargs='*', type=int, default=None, help="需要全量重建的年份")
+    parser.add_argument('--compact', nargs='*', type=int, default=None, help="需要合并文件的年份")
+    args = parser.parse_args()
+
+    root = args.root or config.get_mirror_config()['root']
+    mirror = MarketDataMirror(root)
+    mirror.sync(full_years=args.full)
+    for year in args.compact or []:
+        mirror.compact(year)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+# utils/data_loader/market_panel.py
+"""
+全市场日线数据的列式面板存储
+
+数据布局：
+1. 所有股票的日线按 (股票, 日期) 排序后拼接成一个连续的二维 float64 数组 values，
+   形状为 (总行数, 字段数)，每只股票占据 [offsets[s], offsets[s+1]) 这一段连续行
+2. dates 为面板覆盖的全部日期（升序去重）
+3. row_ptr 为 (日期数, 股票数) 的行指针矩阵：row_ptr[d, s] 表示股票 s 截止 dates[d]（含）
+   已有的数据行数，因此"截止到某日的历史数据"就是 values[offsets[s]: offsets[s] + row_ptr[d, s]]
+4. present 为 (日期数, 股票数) 的布尔矩阵，表示股票 s 在 dates[d] 当天是否有数据（停牌为 False）
+
+每只股票的 DataFrame 只在首次访问时基于 values 的切片构建一次（零拷贝视图），
+之后按整数偏移 iloc[:n] 返回历史数据，不再做布尔筛选和数据复制。
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# 回测使用的日线数值字段（顺序即 values 的列顺序）
+PANEL_FIELDS = (
+    'open', 'high', 'low', 'close', 'volume', 'amount',
+    'pctChg', 'peTTM', 'psTTM', 'pcfNcfTTM', 'pbMRQ',
+)
+
+
+class MarketPanel:
+    """
+    全市场日线列式面板
+
+    股票以 str(code_int) 作为代码键，与 TimeBasedBacktester 中的 stock_code 保持一致。
+    """
+
+    def __init__(self, codes, markets, offsets, row_dates, values, fields=PANEL_FIELDS):
+        """
+        初始化面板（一般通过 from_frame / from_arrays 构建）
+
+        Args:
+            codes: 股票代码数组（str(code_int)），长度为股票数
+            markets: 市场数组（'sh' / 'sz'），与 codes 一一对应
+            offsets: 每只股票在 values 中的起始行，长度为股票数 + 1
+            row_dates: 每一行对应的日期（datetime64[ns]），长度为总行数
+            values: 二维 float64 数组，形状为 (总行数, 字段数)
+            fields: 字段名列表
+        """
+        self.fields = tuple(fields)
+        self.field_index = {name: i for i, name in enumerate(self.fields)}
+        self.codes = np.asarray(codes, dtype=object)
+        self.markets = np.asarray(markets, dtype=object)
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.row_dates = np.asarray(row_dates, dtype='datetime64[ns]')
+        self.values = values
+
+        # 每一行所属的股票下标
+        lengths = np.diff(self.offsets)
+        self.row_stock = np.repeat(np.arange(len(self.codes), dtype=np.int64), lengths)
+        # 每一行在所属股票内的序号（第几根K线，从 0 开始），用于判断滚动窗口是否跨越股票边界
+        self.segment_pos = np.arange(len(self.row_dates), dtype=np.int64) - self.offsets[:-1][self.row_stock]
+
+        # 面板日期轴
+        self.dates = np.unique(self.row_dates)
+        self.date_index = pd.DatetimeIndex(self.dates)
+
+        # 行指针矩阵：按 (股票下标, 日期下标) 组合键做一次 searchsorted 即可向量化得到
+        n_dates = len(self.dates)
+        row_date_pos = np.searchsorted(self.dates, self.row_dates)
+        row_keys = self.row_stock * n_dates + row_date_pos
+        query_keys = (np.arange(len(self.codes), dtype=np.int64)[np.newaxis, :] * n_dates
+                      + np.arange(n_dates, dtype=np.int64)[:, np.newaxis])
+        ends = np.searchsorted(row_keys, query_keys, side='right')
+        self.row_ptr = (ends - self.offsets[:-1][np.newaxis, :]).astype(np.int32)
+
+        self.present = np.zeros((n_dates, len(self.codes)), dtype=bool)
+        self.present[row_date_pos, self.row_stock] = True
+
+        self._frames = {}
+
+    @classmethod
+    def from_frame(cls, df, fields=PANEL_FIELDS):
+        """
+        由 read_sql 得到的长表构建面板
+
+        Args:
+            df: 至少包含 market, code_int, date 以及 fields 中各列的 DataFrame
+
+        Returns:
+            MarketPanel: 面板对象
+        """
+        df = df.sort_values(['code_int', 'date'], kind='mergesort')
+        return cls.from_arrays(
+            code_ints=df['code_int'].to_numpy(dtype=np.int64),
+            markets=df['market'].to_numpy(dtype=object),
+            row_dates=pd.to_datetime(df['date']).to_numpy(dtype='datetime64[ns]'),
+            values=df[list(fields)].to_numpy(dtype=np.float64),
+            fields=fields,
+            presorted=True
+        )
+
+    @classmethod
+    def from_arrays(cls, code_ints, markets, row_dates, values, fields=PANEL_FIELDS, presorted=False):
+        """
+        由按行排列的数组构建面板
+
+        Args:
+            code_ints: 每行的股票代码（整数）
+            markets: 每行的市场
+            row_dates: 每行的日期
+            values: 二维数值数组，形状为 (行数, 字段数)
+            presorted: 数据是否已按 (code_int, date) 排序
+
+        Returns:
+            MarketPanel: 面板对象
+        """
+        code_ints = np.asarray(code_ints, dtype=np.int64)
+        row_dates = np.asarray(row_dates, dtype='datetime64[ns]')
+        values = np.asarray(values, dtype=np.float64)
+
+        if not presorted:
+            order = np.lexsort((row_dates, code_ints))
+            code_ints = code_ints[order]
+            row_dates = row_dates[order]
+            values = values[order]
+            markets = np.asarray(markets, dtype=object)[order]
+
+        values = np.ascontiguousarray(values)
+        unique_codes, starts = np.unique(code_ints, return_index=True)
+        offsets = np.append(starts, len(code_ints))
+        stock_markets = np.asarray(markets, dtype=object)[starts] if len(starts) else np.array([], dtype=object)
+
+        return cls(
+            codes=[str(c) for c in unique_codes],
+            markets=stock_markets,
+            offsets=offsets,
+            row_dates=row_dates,
+            values=values,
+            fields=fields
+        )
+
+    # 持久化时保存的数组（其余派生数组在加载时重新计算）
+    _SAVED_ARRAYS = ('values', 'row_dates', 'offsets')
+
+    def save(self, directory):
+        """
+        将面板保存为 .npy 文件，便于其他进程以内存映射方式共享（见 load）
+
+        Args:
+            directory: 保存目录
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in self._SAVED_ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        meta = {
+            'fields': list(self.fields),
+            'codes': [str(c) for c in self.codes],
+            'markets': [str(m) for m in self.markets],
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        加载 save 保存的面板
+
+        Args:
+            directory: 保存目录
+            mmap_mode: np.load 的内存映射模式，默认只读映射（多进程共享同一份物理内存）
+
+        Returns:
+            MarketPanel: 面板对象
+        """
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in cls._SAVED_ARRAYS}
+        return cls(
+            codes=meta['codes'],
+            markets=meta['markets'],
+            offsets=np.asarray(arrays['offsets']),
+            row_dates=np.asarray(arrays['row_dates']),
+            values=arrays['values'],
+            fields=meta['fields']
+        )
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, stock_code):
+        return stock_code in self.code_index
+
+    @property
+    def total_rows(self):
+        """面板总数据行数"""
+        return len(self.row_dates)
+
+    @property
+    def nbytes(self):
+        """面板主要数组占用的内存字节数"""
+        return (self.values.nbytes + self.row_dates.nbytes + self.row_ptr.nbytes
+                + self.present.nbytes + self.row_stock.nbytes)
+
+    def date_pos(self, current_date):
+        """
+        获取不晚于指定日期的最后一个面板日期下标
+
+        Args:
+            current_date: 日期（str / Timestamp）
+
+        Returns:
+            int: 日期下标，早于面板首日时返回 -1
+        """
+        dt = np.datetime64(pd.Timestamp(current_date), 'ns')
+        return int(np.searchsorted(self.dates, dt, side='right')) - 1
+
+    def is_exact_date(self, date_pos, current_date):
+        """判断日期下标是否恰好对应指定日期"""
+        return date_pos >= 0 and self.dates[date_pos] == np.datetime64(pd.Timestamp(current_date), 'ns')
+
+    def column(self, field):
+        """获取某个字段的全部行（按面板行顺序），返回视图"""
+        return self.values[:, self.field_index[field]]
+
+    def frame(self, stock_code):
+        """
+        获取单只股票的完整 DataFrame（values 的零拷贝视图，首次访问时构建）
+
+        Args:
+            stock_code: 股票代码
+
+        Returns:
+            DataFrame: 以 date 为索引的日线数据，股票不存在时返回 None
+        """
+        frame = self._frames.get(stock_code)
+        if frame is None:
+            s = self.code_index.get(stock_code)
+            if s is None:
+                return None
+            start, end = self.offsets[s], self.offsets[s + 1]
+            frame = pd.DataFrame(
+                self.values[start:end],
+                index=pd.DatetimeIndex(self.row_dates[start:end], name='date'),
+                columns=list(self.fields),
+                copy=False
+            )
+            self._frames[stock_code] = frame
+        return frame
+
+    def history(self, stock_code, date_pos):
+        """
+        获取单只股票截止到某个日期（含）的历史数据
+
+        Args:
+            stock_code: 股票代码
+            date_pos: 面板日期下标（见 date_pos）
+
+        Returns:
+            DataFrame: 历史数据视图，股票不存在时返回 None
+        """
+        s = self.code_index.get(stock_code)
+        if s is None:
+            return None
+        n = int(self.row_ptr[date_pos, s]) if date_pos >= 0 else 0
+        return self.frame(stock_code).iloc[:n]
+
+    def row_on(self, stock_code, date_pos):
+        """
+        获取单只股票在某个日期当天的数据行号
+
+        Returns:
+            int: values 中的行号，当天无数据时返回 -1
+        """
+        s = self.code_index.get(stock_code)
+        if s is None or date_pos < 0 or not self.present[date_pos, s]:
+            return -1
+        return int(self.offsets[s] + self.row_ptr[date_pos, s] - 1)
+
+    def value_on(self, stock_code, date_pos, field):
+        """获取单只股票某日某个字段的值，当天无数据时返回 None"""
+        row = self.row_on(stock_code, date_pos)
+        if row < 0:
+            return None
+        return float(self.values[row, self.field_index[field]])
+
+    def rows_on(self, date_pos):
+        """
+        获取某个日期全市场各股票当天的数据行号
+
+        Returns:
+            ndarray: 长度为股票数，当天无数据的股票为 -1
+        """
+        rows = self.offsets[:-1] + self.row_ptr[date_pos].astype(np.int64) - 1
+        return np.where(self.present[date_pos], rows, -1)
+
+    # ==================== 按股票分段的向量化计算 ====================
+    # 以下方法的输入输出均为与面板行一一对应的一维数组（长度为总行数），
+    # 窗口只在同一只股票的连续行内滑动，语义与逐股 Series.rolling 一致
+
+    def _as_rows(self, data):
+        """字段名或行数组统一转换为 float64 行数组"""
+        if isinstance(data, str):
+            return self.column(data)
+        return np.asarray(data, dtype=np.float64)
+
+    def rolling_mean(self, data, window, skipna=False):
+        """
+        分段滚动均值
+
+        Args:
+            data: 字段名或行数组
+            window: 窗口长度
+            skipna: False 时窗口内有 NaN 结果即为 NaN（同 Series.rolling(window).mean()），
+                    True 时忽略 NaN（同对窗口切片调用 Series.mean()）
+
+        Returns:
+            ndarray: 行数组，数据不足 window 行的位置为 NaN
+        """
+        arr = self._as_rows(data)
+        out = np.full(len(arr), np.nan)
+        idx = np.nonzero(self.segment_pos >= window - 1)[0]
+        if len(idx) == 0:
+            return out
+
+        nan_mask = np.isnan(arr)
+        csum = np.cumsum(np.where(nan_mask, 0.0, arr))
+        ccnt = np.cumsum(nan_mask)
+        prev = idx - window
+        has_prev = prev >= 0
+        prev = np.maximum(prev, 0)
+        sums = csum[idx] - np.where(has_prev, csum[prev], 0.0)
+        nans = ccnt[idx] - np.where(has_prev, ccnt[prev], 0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if skipna:
+                counts = window - nans
+                out[idx] = np.where(counts > 0, sums / counts, np.nan)
+            else:
+                out[idx] = np.where(nans == 0, sums / window, np.nan)
+        return out
+
+    def rolling_min(self, data, window):
+        """
+        分段滚动最小值（忽略 NaN，同对窗口切片调用 Series.min()）
+
+        Returns:
+            ndarray: 行数组，数据不足 window 行或窗口全为 NaN 的位置为 NaN
+        """
+        arr = self._as_rows(data)
+        out = np.full(len(arr), np.nan)
+        idx = np.nonzero(self.segment_pos >= window - 1)[0]
+        if len(idx) == 0:
+            return out
+
+        filled = np.where(np.isnan(arr), np.inf, arr)
+        window_min = sliding_window_view(filled, window).min(axis=1)
+        mins = window_min[idx - window + 1]
+        out[idx] = np.where(np.isinf(mins), np.nan, mins)
+        return out
+
+    def shift(self, data, periods=1):
+        """
+        分段平移：结果第 r 行为同一只股票第 r - periods 行的值，越过股票起点的位置为 NaN
+        """
+        arr = self._as_rows(data)
+        out = np.full(len(arr), np.nan)
+        idx = np.nonzero(self.segment_pos >= periods)[0]
+        out[idx] = arr[idx - periods]
+        return out
@@ -0,0 +1,153 @@
+# utils/data_loader/minute_loader.py
+"""
+分钟线读取（兼容原表 stock_minute_data 与紧凑表 stock_minute_bar）
+
+原表的 time 为 varchar(17)（YYYYMMDDHHMMSSsss），紧凑表存 bar_minute（当日分钟数）。
+两种来源统一解码为：
+    bar_minute  当日分钟数（int）
+    datetime    bar 结束时间（datetime64）
+    time        原格式字符串，兼容按 time 处理的旧代码（如 minute_resampler）
+解码全部按列向量化，不逐行解析字符串。
+
+storage 取 [collector] minute_storage：
+    legacy   读原表
+    compact  读紧凑表
+    both     迁移期间：两表都读，紧凑表缺少的日期用原表补齐（同一日期以紧凑表为准）
+
+使用方式：
+    df = load_minute_bars(conn, 'sh', 600000, '2025-01-01', '2025-03-31', frequency=5)
+"""
+
+import numpy as np
+import pandas as pd
+
+from baostock_tool.config import get_collector_config
+from baostock_tool.database_schema.bulk_loader import MINUTE_STORAGES
+from baostock_tool.utils.logger_utils.logger_tool import get_logger
+
+
+logger = get_logger(__name__)
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'amount')
+
+_LEGACY_SQL = (f"SELECT date, time, {', '.join(BAR_FIELDS)} FROM stock_minute_data "
+               "WHERE market = %s AND code_int = %s AND frequency = %s AND date BETWEEN %s AND %s "
+               "ORDER BY date, time")
+_COMPACT_SQL = (f"SELECT date, bar_minute, {', '.join(BAR_FIELDS)} FROM stock_minute_bar "
+                "WHERE market = %s AND code_int = %s AND frequency = %s AND date BETWEEN %s AND %s "
+                "ORDER BY date, bar_minute")
+
+
+def decode_legacy_time(time_values):
+    """
+    原表 time 字段解码
+
+    Args:
+        time_values: YYYYMMDDHHMMSSsss 字符串数组
+
+    Returns:
+        tuple: (bar_minute int64 数组, datetime64[m] 数组)；无法解析的 time 对应 bar_minute 为 -1、datetime 为 NaT
+    """
+    t = pd.to_numeric(pd.Series(np.asarray(time_values)), errors='coerce')
+    valid = t.notna().to_numpy()
+    t = t.fillna(0).to_numpy(np.int64)
+    day = t // 10 ** 9
+    hhmm = (t // 10 ** 5) % 10000
+    bar_minute = hhmm // 100 * 60 + hhmm % 100
+    dates = pd.to_datetime(pd.Series(day).astype(str), format='%Y%m%d', errors='coerce').to_numpy('datetime64[m]')
+    datetimes = dates + bar_minute.astype('timedelta64[m]')
+    invalid = ~valid | np.isnat(datetimes)
+    datetimes[invalid] = np.datetime64('NaT')
+    bar_minute[invalid] = -1
+    return bar_minute, datetimes
+
+
+def decode_bar_minute(dates, bar_minute):
+    """
+    紧凑表 (date, bar_minute) 解码
+
+    Returns:
+        tuple: (datetime64[m] 数组, 原格式 time 字符串数组)
+    """
+    bar_minute = np.asarray(bar_minute, dtype=np.int64)
+    day = pd.to_datetime(pd.Series(dates))
+    datetimes = day.to_numpy('datetime64[m]') + bar_minute.astype('timedelta64[m]')
+    day_int = (day.dt.year * 10000 + day.dt.month * 100 + day.dt.day).to_numpy(np.int64)
+    hhmm = bar_minute // 60 * 100 + bar_minute % 60
+    return datetimes, (day_int * 10 ** 9 + hhmm * 10 ** 5).astype(str)
+
+
+def _query(conn, sql, params):
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        columns = [d[0] for d in cursor.description]
+    return pd.DataFrame(list(rows), columns=columns)
+
+
+def _numeric(df):
+    for field in BAR_FIELDS:
+        df[field] = df[field].astype(np.int64 if field == 'volume' else np.float64)
+    return df
+
+
+def read_legacy(conn, market, code_int, start_date, end_date, frequency=5):
+    """读原表并解码（time 无法解析的行丢弃）"""
+    df = _query(conn, _LEGACY_SQL, (market, code_int, frequency, start_date, end_date))
+    if df.empty:
+        return df
+    df['bar_minute'], df['datetime'] = decode_legacy_time(df['time'])
+    bad = df['datetime'].isna()
+    if bad.any():
+        logger.warning(f"{market}.{code_int} 原表分钟线 {int(bad.sum())} 行 time 无法解析，已丢弃")
+        df = df[~bad].reset_index(drop=True)
+    return _numeric(df)
+
+
+def read_compact(conn, market, code_int, start_date, end_date, frequency=5):
+    """读紧凑表并解码"""
+    df = _query(conn, _COMPACT_SQL, (market, code_int, frequency, start_date, end_date))
+    if df.empty:
+        return df
+    df['datetime'], df['time'] = decode_bar_minute(df['date'], df['bar_minute'])
+    return _numeric(df)
+
+
+def load_minute_bars(conn, market, code_int, start_date, end_date, frequency=5, storage=None):
+    """
+    加载单只股票的分钟线
+
+    Args:
+        conn: pymysql 连接
+        market (str): 市场代码
+        code_int (int): 股票代码
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+        frequency (int): 5 / 15 / 30 / 60
+        storage (str, optional): legacy / both / compact，默认取 [collector] minute_storage
+
+    Returns:
+        pd.DataFrame: 列为 date, time, bar_minute, datetime 和 BAR_FIELDS，按时间升序；无数据时为空 DataFrame
+    """
+    if storage is None:
+        storage = get_collector_config()['minute_storage']
+    if storage not in MINUTE_STORAGES:
+        raise ValueError(f"不支持的分钟线存储: {storage}，可选 {MINUTE_STORAGES}")
+
+    columns = ['date', 'time', 'bar_minute', 'datetime', *BAR_FIELDS]
+    frames = []
+    if storage in ('compact', 'both'):
+        frames.append(read_compact(conn, market, code_int, start_date, end_date, frequency))
+    if storage in ('legacy', 'both'):
+        legacy = read_legacy(conn, market, code_int, start_date, end_date, frequency)
+        if storage == 'both' and not legacy.empty and not frames[0].empty:
+            # 迁移未完成时紧凑表只有部分日期：按日期补齐，同一日期以紧凑表为准
+            compact_days = pd.to_datetime(frames[0]['date']).dt.normalize()
+            legacy = legacy[~pd.to_datetime(legacy['date']).dt.normalize().isin(compact_days)]
+        frames.append(legacy)
+    frames = [df[columns] for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True).sort_values('datetime', kind='mergesort', ignore_index=True)
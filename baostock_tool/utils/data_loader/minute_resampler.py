@@ -0,0 +1,257 @@
+# utils/data_loader/minute_resampler.py
+"""
+分钟线本地合成：由最细频率（通常为 5 分钟）的 K 线聚合出 15/30/60 分钟线和日线
+
+A 股连续竞价分上午 09:30-11:30、下午 13:00-15:00 两个时段，baostock 分钟线的 time 字段
+（YYYYMMDDHHMMSSsss）为 bar 的结束时间。每根源 bar 按所在时段向上取整到目标周期的结束时间，
+例如 60 分钟线的结束时间为 10:30 / 11:30 / 14:00 / 15:00，与 baostock 直接返回的 bar 对齐。
+
+聚合全部向量化：按 (股票, 日期, 目标 bar) 排序后用 np.*.reduceat 一次算出
+open=首根开盘、high=最高、low=最低、close=末根收盘、volume/amount=求和。
+
+用途：
+1. 采集时只拉取最细频率，其余频率本地合成（[collector] derive_minute），减少接口请求
+2. 合成结果与库中已存的 bar 对比，检查数据一致性：
+    python -m baostock_tool.utils.data_loader.minute_resampler --code sh.600000 --start 2025-01-01 --end 2025-03-31
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from baostock_tool.utils.data_loader.minute_loader import load_minute_bars
+from baostock_tool.utils.logger_utils.logger_tool import get_logger
+
+
+logger = get_logger(__name__)
+
+# 交易时段（当日分钟数）：上午 09:30-11:30，下午 13:00-15:00
+SESSIONS = ((9 * 60 + 30, 11 * 60 + 30), (13 * 60, 15 * 60))
+# 可由更细频率合成的分钟周期（均能整除每个时段的 120 分钟）
+MINUTE_PERIODS = (5, 15, 30, 60)
+DAILY = 'd'
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'amount')
+# 识别股票的列（按顺序取 DataFrame 中存在的列）
+STOCK_KEYS = ('market', 'code_int', 'code')
+
+
+def bar_minutes(time_values):
+    """
+    time 字段（YYYYMMDDHHMMSSsss）转换为当日分钟数
+
+    Args:
+        time_values: 字符串或整数数组
+
+    Returns:
+        np.ndarray: int64 数组，如 10:30 -> 630
+    """
+    t = pd.to_numeric(pd.Series(np.asarray(time_values))).to_numpy(np.int64)
+    hhmm = (t // 100000) % 10000
+    return hhmm // 100 * 60 + hhmm % 100
+
+
+def bucket_end_minutes(minutes, period):
+    """
+    源 bar 结束时间所属目标 bar 的结束时间（当日分钟数）
+
+    Args:
+        minutes: 源 bar 结束时间（当日分钟数）数组
+        period (int): 目标周期（分钟）
+
+    Returns:
+        np.ndarray: 目标 bar 结束时间数组
+    """
+    minutes = np.asarray(minutes, dtype=np.int64)
+    session_start = np.where(minutes > SESSIONS[0][1], SESSIONS[1][0], SESSIONS[0][0])
+    # 向上取整；集合竞价等落在时段起点的 bar 归入第一根
+    index = np.maximum(1, -(-(minutes - session_start) // period))
+    return session_start + index * period
+
+
+def derivable_frequencies(frequencies):
+    """
+    拆分需要拉取和可以本地合成的分钟频率
+
+    最细的分钟频率需要拉取，其余能被它整除的分钟频率由它合成；日线和其他频率照常拉取
+
+    Args:
+        frequencies: 频率列表，如 ['d', '5', '15', '30', '60']
+
+    Returns:
+        tuple: (拉取的频率列表, {合成频率: 源频率})
+    """
+    minute = sorted({int(f) for f in frequencies if f != DAILY and int(f) in MINUTE_PERIODS})
+    if len(minute) < 2:
+        return list(frequencies), {}
+    source = minute[0]
+    derived = {str(f): str(source) for f in minute[1:] if f % source == 0}
+    return [f for f in frequencies if f not in derived], derived
+
+
+def resample_minute_bars(df, period):
+    """
+    分钟线聚合为更粗的分钟线或日线
+
+    Args:
+        df: 分钟线 DataFrame，需包含 date, time 和 BAR_FIELDS（字符串或数值均可），
+            可包含 market / code_int / code 区分多只股票
+        period: 目标周期（分钟数，如 15/30/60）或 'd'（日线）
+
+    Returns:
+        pd.DataFrame: 股票列、date、time（日线无此列）、BAR_FIELDS，以及 bars（参与聚合的源 bar 数，
+                      可用于识别停牌或缺失导致的不完整 bar）；输入为空时返回空 DataFrame
+    """
+    keys = [k for k in STOCK_KEYS if k in df.columns]
+    out_columns = keys + ['date'] + ([] if period == DAILY else ['time']) + list(BAR_FIELDS) + ['bars']
+    if df.empty:
+        return pd.DataFrame(columns=out_columns)
+
+    times = pd.to_numeric(df['time']).to_numpy(np.int64)
+    if period == DAILY:
+        bucket = np.zeros(len(df), dtype=np.int64)
+    else:
+        bucket = bucket_end_minutes(bar_minutes(times), int(period))
+
+    # 股票 -> 整数编号，日期取 time 的 YYYYMMDD 部分
+    stock_id = np.zeros(len(df), dtype=np.int64)
+    for key in keys:
+        codes, _ = pd.factorize(df[key], sort=True)
+        stock_id = stock_id * (codes.max() + 1) + codes
+    day = times // 10 ** 9
+
+    order = np.lexsort((times, bucket, day, stock_id))
+    stock_id, day, bucket, times = stock_id[order], day[order], bucket[order], times[order]
+    change = (np.diff(stock_id) != 0) | (np.diff(day) != 0) | (np.diff(bucket) != 0)
+    starts = np.concatenate(([0], np.flatnonzero(change) + 1))
+    ends = np.append(starts[1:], len(order))
+
+    values = {name: pd.to_numeric(pd.Series(np.asarray(df[name])[order]), errors='coerce').to_numpy(np.float64)
+              for name in BAR_FIELDS}
+    result = {key: np.asarray(df[key])[order][starts] for key in keys}
+    result['date'] = np.asarray(df['date'])[order][starts]
+    if period != DAILY:
+        hhmm = bucket[starts] // 60 * 100 + bucket[starts] % 60
+        result['time'] = (day[starts] * 10 ** 9 + hhmm * 10 ** 5).astype(str)
+    result['open'] = values['open'][starts]
+    result['high'] = np.fmax.reduceat(values['high'], starts)
+    result['low'] = np.fmin.reduceat(values['low'], starts)
+    result['close'] = values['close'][ends - 1]
+    result['volume'] = np.add.reduceat(np.nan_to_num(values['volume']), starts).astype(np.int64)
+    result['amount'] = np.add.reduceat(np.nan_to_num(values['amount']), starts)
+    result['bars'] = ends - starts
+    return pd.DataFrame(result, columns=out_columns)
+
+
+def compare_bars(derived, stored, fields=BAR_FIELDS, rtol=1e-6, atol=1e-4):
+    """
+    对比合成的 bar 与库中已存的 bar
+
+    Args:
+        derived: resample_minute_bars 的结果
+        stored: 库中同频率的 bar（列同 derived，数值字段可为 Decimal）
+        fields: 参与对比的字段（日线前复权价格与分钟线不同时只对比 volume / amount）
+        rtol, atol: 数值容差，同 np.isclose
+
+    Returns:
+        pd.DataFrame: 不一致或只在一方存在的 bar，列为键、各字段的 _derived / _stored 值和 issue
+    """
+    keys = [k for k in STOCK_KEYS if k in derived.columns and k in stored.columns]
+    keys += ['date'] + (['time'] if 'time' in derived.columns and 'time' in stored.columns else [])
+    left = derived[keys + list(fields)].copy()
+    right = stored[keys + list(fields)].copy()
+    for frame in (left, right):
+        frame['date'] = pd.to_datetime(frame['date'])
+        if 'time' in keys:
+            frame['time'] = frame['time'].astype(str)
+        for field in fields:
+            frame[field] = pd.to_numeric(frame[field], errors='coerce').astype(float)
+
+    merged = left.merge(right, on=keys, how='outer', suffixes=('_derived', '_stored'), indicator=True)
+    mismatch = np.zeros(len(merged), dtype=bool)
+    for field in fields:
+        a = merged[f'{field}_derived'].to_numpy()
+        b = merged[f'{field}_stored'].to_numpy()
+        mismatch |= ~np.isclose(a, b, rtol=rtol, atol=atol, equal_nan=True)
+    issue = np.select(
+        [merged['_merge'] == 'left_only', merged['_merge'] == 'right_only', mismatch],
+        ['missing_stored', 'missing_derived', 'mismatch'], ''
+    )
+    merged = merged.drop(columns='_merge')
+    merged['issue'] = issue
+    return merged[issue != ''].reset_index(drop=True)
+
+
+def _load(conn, sql, params):
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        columns = [d[0] for d in cursor.description]
+    return pd.DataFrame(list(rows), columns=columns)
+
+
+def check_consistency(conn, market, code_int, start_date, end_date, source=5, targets=(15, 30, 60)):
+    """
+    用库中的源频率分钟线合成各目标频率，与库中已存数据对比
+
+    Returns:
+        dict: {频率: 不一致的 bar DataFrame}，日线（键 'd'）只对比 volume / amount
+    """
+    # 按 [collector] minute_storage 读取原表或紧凑表
+    source_bars = load_minute_bars(conn, market, code_int, start_date, end_date, source)
+    if source_bars.empty:
+        logger.warning(f"{market}.{code_int:06d} 无 {source} 分钟线数据")
+        return {}
+
+    report = {}
+    for period in targets:
+        stored = load_minute_bars(conn, market, code_int, start_date, end_date, period)
+        if stored.empty:
+            continue
+        report[str(period)] = compare_bars(resample_minute_bars(source_bars, period), stored)
+
+    stored_daily = _load(conn, "SELECT date, volume, amount FROM stock_daily_data "
+                               "WHERE market = %s AND code_int = %s AND frequency = 'd' AND date BETWEEN %s AND %s",
+                         (market, code_int, start_date, end_date))
+    if not stored_daily.empty:
+        derived_daily = resample_minute_bars(source_bars, DAILY)
+        # 日线只覆盖分钟线已有的日期（分钟线起始日期通常晚于日线）
+        stored_daily = stored_daily[pd.to_datetime(stored_daily['date']).isin(pd.to_datetime(derived_daily['date']))]
+        report[DAILY] = compare_bars(derived_daily, stored_daily, fields=('volume', 'amount'), rtol=1e-3, atol=1)
+    return report
+
+
+def main():
+    import pymysql
+    from baostock_tool.config import get_db_config
+
+    parser = argparse.ArgumentParser(description='由分钟线合成更粗频率并与库中数据对比')
+    parser.add_argument('--code', required=True, help='股票代码，如 sh.600000')
+    parser.add_argument('--start', required=True, help='开始日期')
+    parser.add_argument('--end', required=True, help='结束日期')
+    parser.add_argument('--source', type=int, default=5, help='源频率（分钟）')
+    parser.add_argument('--show', type=int, default=10, help='每个频率打印的不一致 bar 数量')
+    args = parser.parse_args()
+
+    market, code = args.code.split('.')
+    targets = tuple(p for p in MINUTE_PERIODS if p > args.source and p % args.source == 0)
+    db_config = get_db_config()
+    conn = pymysql.connect(host=db_config['host'], port=db_config['port'], user=db_config['user'],
+                           password=db_config['password'], database=db_config['database'], charset='utf8mb4')
+    try:
+        report = check_consistency(conn, market, int(code), args.start, args.end, args.source, targets)
+    finally:
+        conn.close()
+
+    if not report:
+        print("没有可对比的数据")
+    for frequency, issues in report.items():
+        counts = issues['issue'].value_counts().to_dict() if not issues.empty else {}
+        print(f"{frequency}: 不一致 {len(issues)} 根 {counts}")
+        if not issues.empty and args.show:
+            print(issues.head(args.show).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# utils/data_loader/panel_loader.py
+"""
+从 stock_daily_data 流式加载全市场日线面板
+
+与一次性 read_sql 的区别：
+1. 股票条件按市场分组写成 market = :market AND code_int IN (...)，不再拼接成千上万个 OR 条件，
+   IN 列表按批拆分，避免语句过长
+2. 查询区间按自然年切分，与表的年分区一致，每条语句只扫描一个分区，首批数据更快返回
+3. 不在服务端 ORDER BY，使用服务端游标（stream_results）分批取数，
+   每批直接写入预分配的 NumPy 缓冲区（按需倍增扩容），峰值内存只多出一批原始行
+4. 全部读完后在客户端做一次 lexsort，交给 MarketPanel.from_arrays 构建面板
+
+使用方式：
+    panel = load_daily_panel(engine, stock_codes, '2023-01-01', '2024-12-31')
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from baostock_tool.utils.data_loader.market_panel import MarketPanel, PANEL_FIELDS
+from baostock_tool.utils.logger_utils.logger_tool import get_logger
+
+
+logger = get_logger(__name__)
+
+# 每次从服务端游标读取的行数
+DEFAULT_CHUNK_ROWS = 100000
+# 单条语句 IN 列表中的股票数量上限
+DEFAULT_CODES_PER_QUERY = 1000
+# 缓冲区初始行数
+INITIAL_CAPACITY = 1 << 20
+
+
+class _RowBuffer:
+    """按列存放的定长类型缓冲区，容量不足时倍增"""
+
+    def __init__(self, n_fields, capacity=INITIAL_CAPACITY):
+        self.size = 0
+        self.code_ints = np.empty(capacity, dtype=np.int64)
+        self.market_ids = np.empty(capacity, dtype=np.int8)
+        self.dates = np.empty(capacity, dtype='datetime64[D]')
+        self.values = np.empty((capacity, n_fields), dtype=np.float64)
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        capacity = len(self.code_ints)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('code_ints', 'market_ids', 'dates', 'values'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def append(self, rows, market_id):
+        """
+        追加一批查询结果
+
+        Args:
+            rows: 行元组列表 (code_int, date, field1, field2, ...)
+            market_id: 该批数据所属市场的编号
+        """
+        n = len(rows)
+        if n == 0:
+            return
+        self._reserve(n)
+        end = self.size + n
+        columns = list(zip(*rows))
+        self.code_ints[self.size:end] = np.fromiter(columns[0], dtype=np.int64, count=n)
+        self.market_ids[self.size:end] = market_id
+        self.dates[self.size:end] = np.array(columns[1], dtype='datetime64[D]')
+        # DECIMAL 转 float，NULL 转 NaN
+        for j, column in enumerate(columns[2:]):
+            self.values[self.size:end, j] = np.array(column, dtype=np.float64)
+        self.size = end
+
+    def trim(self):
+        """返回实际使用部分的视图"""
+        n = self.size
+        return self.code_ints[:n], self.market_ids[:n], self.dates[:n], self.values[:n]
+
+
+def _year_ranges(start_date, end_date):
+    """把日期区间按自然年切分为 [(开始, 结束), ...]"""
+    start_ts, end_ts = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    ranges = []
+    for year in range(start_ts.year, end_ts.year + 1):
+        range_start = max(start_ts, pd.Timestamp(year=year, month=1, day=1))
+        range_end = min(end_ts, pd.Timestamp(year=year, month=12, day=31))
+        ranges.append((range_start.strftime('%Y-%m-%d'), range_end.strftime('%Y-%m-%d')))
+    return ranges
+
+
+def load_daily_panel(engine, stock_codes, start_date, end_date, fields=PANEL_FIELDS,
+                     chunk_rows=DEFAULT_CHUNK_ROWS, codes_per_query=DEFAULT_CODES_PER_QUERY):
+    """
+    流式加载日线数据并构建面板
+
+    Args:
+        engine: SQLAlchemy 引擎
+        stock_codes: 股票列表 [(market, code_int, ...), ...]
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+        fields: 面板数值字段
+        chunk_rows: 每次从游标读取的行数
+        codes_per_query: 单条语句中 IN 列表的股票数量上限
+
+    Returns:
+        MarketPanel: 全市场日线面板，无数据时返回 None
+    """
+    codes_by_market = {}
+    for item in stock_codes:
+        codes_by_market.setdefault(item[0], []).append(int(item[1]))
+    if not codes_by_market:
+        return None
+
+    markets = sorted(codes_by_market)
+    query = text(f"""
+        SELECT code_int, date, {', '.join(fields)}
+        FROM stock_daily_data
+        WHERE frequency = 'd'
+          AND date >= :start_date
+          AND date <= :end_date
+          AND market = :market
+          AND code_int IN :code_ints
+    """).bindparams(bindparam('code_ints', expanding=True))
+
+    buffer = _RowBuffer(len(fields))
+    start_time = time.time()
+    first_row_time = None
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True)
+        for range_start, range_end in _year_ranges(start_date, end_date):
+            for market_id, market in enumerate(markets):
+                code_ints = sorted(codes_by_market[market])
+                for i in range(0, len(code_ints), codes_per_query):
+                    result = conn.execute(query, {
+                        'start_date': range_start,
+                        'end_date': range_end,
+                        'market': market,
+                        'code_ints': code_ints[i:i + codes_per_query],
+                    })
+                    try:
+                        while True:
+                            rows = result.fetchmany(chunk_rows)
+                            if not rows:
+                                break
+                            if first_row_time is None:
+                                first_row_time = time.time() - start_time
+                            buffer.append(rows, market_id)
+                    finally:
+                        result.close()
+
+    if buffer.size == 0:
+        return None
+
+    code_ints, market_ids, dates, values = buffer.trim()
+    order = np.lexsort((dates, code_ints))
+    del buffer
+
+    panel = MarketPanel.from_arrays(
+        code_ints=code_ints[order],
+        markets=np.asarray(markets, dtype=object)[market_ids[order]],
+        row_dates=dates[order],
+        values=values[order],
+        fields=fields,
+        presorted=True
+    )
+    logger.info(f"流式加载完成: {panel.total_rows:,} 行 | 首批数据 {first_row_time:.2f} 秒 | "
+                f"总耗时 {time.time() - start_time:.2f} 秒")
+    return panel
@@ -0,0 +1,230 @@
+# utils/run_manifest.py
+"""
+数据采集运行清单（SQLite）
+
+记录每次采集（以截止日期为运行标识）中每只股票的状态：
+    pending   待处理
+    fetched   已拉取并交给写库阶段
+    stored    已提交到数据库
+    failed    失败（下次运行重试）
+以及写入行数、最新数据日期、使用的前复权因子（factor_version）和时间戳。
+
+采集中断后以相同截止日期重跑，只处理未 stored 的股票；
+throughput() 给出每分钟股票数、每秒行数，用于排查采集慢的夜间任务。
+
+使用方式：
+    python -m baostock_tool.utils.run_manifest              # 查看最近一次运行
+    python -m baostock_tool.utils.run_manifest --run 2025-10-20
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+
+# 状态
+PENDING = 'pending'
+FETCHED = 'fetched'
+STORED = 'stored'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    total_codes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS codes (
+    run_id TEXT NOT NULL,
+    code TEXT NOT NULL,
+    status TEXT NOT NULL,
+    rows INTEGER NOT NULL DEFAULT 0,
+    max_date TEXT,
+    factor_version REAL,
+    fetched_at REAL,
+    stored_at REAL,
+    error TEXT,
+    PRIMARY KEY (run_id, code)
+);
+CREATE INDEX IF NOT EXISTS idx_codes_status ON codes (run_id, status);
+"""
+
+
+class RunManifest:
+    """
+    采集运行清单
+
+    SQLite 连接不能跨线程/进程共享，每个写入方（写库线程或写库进程）各自创建实例
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): SQLite 文件路径（目录不存在时自动创建）
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 写库进程与主进程可能同时访问，等待锁而不是立即报错
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # ==================== 运行 ====================
+
+    def start_run(self, run_id, codes):
+        """
+        开始（或续传）一次运行
+
+        Args:
+            run_id (str): 运行标识（采集截止日期）
+            codes (list): 本次需要处理的全部股票代码
+
+        Returns:
+            list: 尚未 stored 的股票代码（保持 codes 的顺序）
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO runs (run_id, created_at, started_at, total_codes) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET started_at = excluded.started_at, "
+                "finished_at = NULL, total_codes = excluded.total_codes",
+                (run_id, now, now, len(codes))
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO codes (run_id, code, status) VALUES (?, ?, ?)",
+                [(run_id, code, PENDING) for code in codes]
+            )
+        stored = {row[0] for row in self.conn.execute(
+            "SELECT code FROM codes WHERE run_id = ? AND status = ?", (run_id, STORED))}
+        return [code for code in codes if code not in stored]
+
+    def finish_run(self, run_id):
+        with self.conn:
+            self.conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def latest_run_id(self):
+        row = self.conn.execute("SELECT run_id FROM runs ORDER BY started_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    # ==================== 股票状态 ====================
+
+    def mark_fetched(self, run_id, items):
+        """
+        记录已拉取的股票
+
+        Args:
+            items: [(code, rows, max_date, factor_version), ...]
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE codes SET status = ?, rows = ?, max_date = ?, factor_version = ?, "
+                "fetched_at = ?, error = NULL WHERE run_id = ? AND code = ?",
+                [(FETCHED, rows, max_date, factor_version, now, run_id, code)
+                 for code, rows, max_date, factor_version in items]
+            )
+
+    def mark_stored(self, run_id, codes):
+        """记录已提交到数据库的股票"""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE codes SET status = ?, stored_at = ? WHERE run_id = ? AND code = ?",
+                [(STORED, now, run_id, code) for code in codes]
+            )
+
+    def mark_failed(self, run_id, codes, error=None):
+        """记录失败的股票"""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE codes SET status = ?, error = ? WHERE run_id = ? AND code = ?",
+                [(FAILED, error, run_id, code) for code in codes]
+            )
+
+    # ==================== 统计 ====================
+
+    def status_counts(self, run_id):
+        """各状态的股票数量 {status: count}"""
+        return dict(self.conn.execute(
+            "SELECT status, COUNT(*) FROM codes WHERE run_id = ? GROUP BY status", (run_id,)))
+
+    def throughput(self, run_id):
+        """
+        本次运行（最近一次开始/续传以来）的吞吐量
+
+        Returns:
+            dict: {stored_codes, rows, elapsed_seconds, codes_per_minute, rows_per_second}
+        """
+        row = self.conn.execute("SELECT started_at, finished_at FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return {}
+        started_at, finished_at = row
+        stored_codes, rows, last_stored_at = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(rows), 0), MAX(stored_at) FROM codes "
+            "WHERE run_id = ? AND status = ? AND stored_at >= ?",
+            (run_id, STORED, started_at)
+        ).fetchone()
+        end = finished_at or last_stored_at or time.time()
+        elapsed = max(end - started_at, 1e-9)
+        return {
+            'stored_codes': stored_codes,
+            'rows': rows,
+            'elapsed_seconds': elapsed,
+            'codes_per_minute': stored_codes / elapsed * 60,
+            'rows_per_second': rows / elapsed,
+        }
+
+    def slowest(self, run_id, limit=10):
+        """拉取到提交耗时最长的股票 [(code, seconds, rows), ...]"""
+        return self.conn.execute(
+            "SELECT code, stored_at - fetched_at AS seconds, rows FROM codes "
+            "WHERE run_id = ? AND status = ? ORDER BY seconds DESC LIMIT ?",
+            (run_id, STORED, limit)
+        ).fetchall()
+
+    def summary(self, run_id):
+        """运行摘要文本"""
+        counts = self.status_counts(run_id)
+        stats = self.throughput(run_id)
+        lines = [
+            f"运行 {run_id}: " + ", ".join(f"{status} {counts.get(status, 0)}"
+                                           for status in (STORED, FETCHED, PENDING, FAILED)),
+        ]
+        if stats:
+            lines.append(f"吞吐: {stats['codes_per_minute']:.1f} 只/分钟, {stats['rows_per_second']:.1f} 行/秒 "
+                         f"（{stats['stored_codes']} 只, {stats['rows']} 行, {stats['elapsed_seconds']:.0f} 秒）")
+        return "\n".join(lines)
+
+
+def main():
+    from baostock_tool.config import get_collector_config
+
+    parser = argparse.ArgumentParser(description='查看数据采集运行清单')
+    parser.add_argument('--path', default=get_collector_config()['manifest_path'], help='清单文件路径')
+    parser.add_argument('--run', default=None, help='运行标识（采集截止日期），默认最近一次')
+    parser.add_argument('--slowest', type=int, default=10, help='列出耗时最长的股票数量')
+    args = parser.parse_args()
+
+    manifest = RunManifest(args.path)
+    try:
+        run_id = args.run or manifest.latest_run_id()
+        if run_id is None:
+            print("暂无运行记录")
+            return
+        print(manifest.summary(run_id))
+        for code, seconds, rows in manifest.slowest(run_id, args.slowest):
+            print(f"  {code}: {seconds:.1f} 秒, {rows} 行")
+    finally:
+        manifest.close()
+
+
+if __name__ == "__main__":
+    main()
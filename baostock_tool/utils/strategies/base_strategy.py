@@ -7,7 +7,9 @@
 
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Tuple, Optional
+import numpy as np
 import pandas as pd
+from ..data_loader.indicator_cache import get_indicator_cache
 
 
 class BaseStrategy(ABC):
@@ -138,6 +140,128 @@ class BaseStrategy(ABC):
         """
         pass
     
+    def prepare_bulk_signals(self, panel: Any):
+        """
+        回测开始前的批量预计算（可选实现）
+        
+        向量化策略可以在这里用 _register_bulk_indicator 登记需要的指标（同时预先计算），
+        之后 check_buy_signals_bulk 每天用 _bulk_array 从指标缓存取数组再按行号取值
+        
+        Args:
+            panel: 全市场日线面板（MarketPanel）
+        """
+        self._bulk_panel = panel
+        self._bulk_indicators = {}
+    
+    def _ensure_bulk_prepared(self, panel: Any):
+        """确保已针对当前面板完成预计算"""
+        if getattr(self, '_bulk_panel', None) is not panel:
+            self.prepare_bulk_signals(panel)
+    
+    def _indicator(self, panel: Any, indicator: str, lag: int = 0, **params) -> np.ndarray:
+        """
+        从共享指标缓存获取面板行数组（同一面板、同一参数只计算一次）
+        
+        Args:
+            panel: 全市场日线面板（MarketPanel）
+            indicator: 指标名称（rolling_mean / rolling_min / field 等）
+            lag: 向后平移的行数
+            **params: 指标参数
+        """
+        return get_indicator_cache().get(panel, indicator, lag=lag, **params)
+    
+    def _register_bulk_indicator(self, name: str, indicator: str, lag: int = 0, **params):
+        """
+        登记批量信号使用的指标并预先计算
+        
+        策略只保存指标参数，不持有数组：数组由共享指标缓存管理，
+        缓存按内存预算淘汰后即可释放，下次 _bulk_array 时重新计算或从磁盘读取。
+        
+        Args:
+            name: 策略内使用的名称
+            indicator: 指标名称
+            lag: 向后平移的行数
+            **params: 指标参数
+        """
+        self._bulk_indicators[name] = (indicator, lag, params)
+        self._indicator(self._bulk_panel, indicator, lag=lag, **params)
+    
+    def _bulk_array(self, name: str) -> np.ndarray:
+        """从共享指标缓存获取已登记指标的面板行数组"""
+        indicator, lag, params = self._bulk_indicators[name]
+        return self._indicator(self._bulk_panel, indicator, lag=lag, **params)
+    
+    def _indicator_on_last_row(
+        self,
+        stock_code: str,
+        stock_data: pd.DataFrame,
+        indicator: str,
+        lag: int = 0,
+        **params
+    ) -> Optional[float]:
+        """
+        逐股检查时从指标缓存读取 stock_data 最后一行对应的指标值
+        
+        仅当 stock_data 是回测面板中该股票的历史前缀时可用，否则返回 None，
+        调用方应回退到基于 stock_data 直接计算。
+        
+        Returns:
+            Optional[float]: 指标值（可能为 NaN），无法使用缓存时返回 None
+        """
+        panel = getattr(self, '_bulk_panel', None)
+        if panel is None or stock_data is None or len(stock_data) == 0:
+            return None
+        
+        stock_idx = panel.code_index.get(stock_code)
+        if stock_idx is None:
+            return None
+        
+        row = panel.offsets[stock_idx] + len(stock_data) - 1
+        if row >= panel.offsets[stock_idx + 1] or panel.row_dates[row] != np.datetime64(stock_data.index[-1], 'ns'):
+            return None
+        
+        return float(self._indicator(panel, indicator, lag=lag, **params)[row])
+    
+    def check_buy_signals_bulk(
+        self,
+        panel: Any,
+        date_pos: int
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, Dict[str, Any]]]:
+        """
+        全市场横截面买入信号（可选实现）
+        
+        回测引擎优先调用本方法，返回 None 时回退到逐股调用 check_buy_signal。
+        实现时需与 check_buy_signal 保持相同的信号语义。
+        
+        Args:
+            panel: 全市场日线面板（MarketPanel）
+            date_pos: 当前交易日在面板中的日期下标（当天有行情）
+            
+        Returns:
+            Optional[Tuple[ndarray, ndarray, Dict]]:
+                - signal_mask: 布尔数组（长度为面板股票数），是否触发买入信号
+                - signal_strength: 信号强度数组
+                - signal_info: 信号详情，值为数组（按股票下标取值）或标量，至少包含 close_price
+            不支持向量化时返回 None
+        """
+        return None
+    
+    def build_bulk_signal_info(self, signal_info: Dict[str, Any], stock_idx: int) -> Dict[str, Any]:
+        """
+        从 check_buy_signals_bulk 返回的信号详情中取出单只股票的 signal_info
+        
+        Args:
+            signal_info: 批量信号详情
+            stock_idx: 面板股票下标
+            
+        Returns:
+            Dict: 与 check_buy_signal 返回格式一致的信号详情
+        """
+        return {
+            key: float(value[stock_idx]) if isinstance(value, np.ndarray) else value
+            for key, value in signal_info.items()
+        }
+    
     def on_backtest_start(self, context: Dict[str, Any]):
         """
         回测开始时的回调（可选实现）
@@ -117,6 +117,47 @@ class CodeBuddyStrategyTimeBased(BaseStrategy):
         
         return False, 0, None
     
+    def prepare_bulk_signals(self, panel):
+        """预计算整个日期范围的前 N 日成交量统计（不含当日）"""
+        super().prepare_bulk_signals(panel)
+        period = self.params['period']
+        self._register_bulk_indicator('yesterday_volume', 'field', lag=1, field='volume')
+        self._register_bulk_indicator('min_volume', 'rolling_min', lag=1, field='volume', window=period)
+        self._register_bulk_indicator('avg_volume', 'rolling_mean', lag=1, field='volume',
+                                       window=period, skipna=True)
+    
+    def check_buy_signals_bulk(self, panel, date_pos):
+        """
+        全市场横截面买入信号（与 check_buy_signal 条件一致）
+        """
+        self._ensure_bulk_prepared(panel)
+        
+        rows = panel.rows_on(date_pos)
+        has_today = rows >= 0
+        rows = np.where(has_today, rows, 0)
+        
+        yesterday_volume = self._bulk_array('yesterday_volume')[rows]
+        min_volume = self._bulk_array('min_volume')[rows]
+        avg_volume = self._bulk_array('avg_volume')[rows]
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            signal_mask = (
+                has_today
+                & (panel.row_ptr[date_pos] >= self.params['period'] + 1)
+                & (yesterday_volume == min_volume)
+            )
+            volume_shrink_rate = np.where(avg_volume > 0, 1 - yesterday_volume / avg_volume, 0.0)
+        signal_strength = np.minimum(1.0, volume_shrink_rate + 0.5)
+        
+        signal_info = {
+            'close_price': panel.column('open')[rows],  # 使用开盘价买入
+            'yesterday_volume': yesterday_volume,
+            'min_volume': min_volume,
+            'volume_rank': f'{self.params["period"]}日最低',
+            'volume_shrink_rate': np.round(volume_shrink_rate, 4),
+        }
+        return signal_mask, signal_strength, signal_info
+    
     def check_sell_signal(self, position: Position, stock_data: pd.DataFrame, 
                           current_date: str) -> Tuple[bool, str, float]:
         """
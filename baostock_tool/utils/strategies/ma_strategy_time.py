@@ -40,6 +40,24 @@ class MAStrategyTimeBased(BaseStrategy):
         """需要至少MA周期+1的数据"""
         return self.params['ma_period'] + 1
     
+    def _last_two_ma(self, stock_code, stock_data, close_prices):
+        """
+        获取当日和昨日的MA值（优先读取指标缓存）
+        
+        Returns:
+            Tuple[float, float]: (当日MA, 昨日MA)
+        """
+        ma_period = self.params['ma_period']
+        current_ma = self._indicator_on_last_row(stock_code, stock_data, 'rolling_mean',
+                                                 field='close', window=ma_period)
+        if current_ma is not None:
+            prev_ma = self._indicator_on_last_row(stock_code, stock_data, 'rolling_mean', lag=1,
+                                                  field='close', window=ma_period)
+            return current_ma, prev_ma
+        
+        ma_series = close_prices.rolling(window=ma_period).mean()
+        return ma_series.iloc[-1], ma_series.iloc[-2]
+    
     def check_buy_signal(
         self, 
         stock_code: str,
@@ -66,14 +84,10 @@ class MAStrategyTimeBased(BaseStrategy):
             # 获取收盘价序列
             close_prices = stock_data['close']
             
-            # 计算MA
-            ma_series = close_prices.rolling(window=ma_period).mean()
-            
             # 获取当日和昨日数据
             current_close = close_prices.iloc[-1]
             prev_close = close_prices.iloc[-2]
-            current_ma = ma_series.iloc[-1]
-            prev_ma = ma_series.iloc[-2]
+            current_ma, prev_ma = self._last_two_ma(stock_code, stock_data, close_prices)
             
             if pd.isna(current_ma) or pd.isna(prev_ma):
                 return False, 0, {'reason': '均线无效'}
@@ -97,6 +111,50 @@ class MAStrategyTimeBased(BaseStrategy):
         except Exception as e:
             return False, 0, {'error': str(e)}
     
+    def prepare_bulk_signals(self, panel):
+        """预计算整个日期范围的均线及前一日数据"""
+        super().prepare_bulk_signals(panel)
+        ma_period = self.params['ma_period']
+        self._register_bulk_indicator('ma', 'rolling_mean', field='close', window=ma_period)
+        self._register_bulk_indicator('prev_ma', 'rolling_mean', lag=1, field='close', window=ma_period)
+        self._register_bulk_indicator('prev_close', 'field', lag=1, field='close')
+    
+    def check_buy_signals_bulk(self, panel, date_pos):
+        """
+        全市场横截面买入信号（与 check_buy_signal 条件一致）
+        """
+        self._ensure_bulk_prepared(panel)
+        
+        rows = panel.rows_on(date_pos)
+        has_today = rows >= 0
+        rows = np.where(has_today, rows, 0)
+        
+        current_close = panel.column('close')[rows]
+        current_ma = self._bulk_array('ma')[rows]
+        prev_close = self._bulk_array('prev_close')[rows]
+        prev_ma = self._bulk_array('prev_ma')[rows]
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            breakthrough_pct = (current_close - current_ma) / current_ma
+            signal_mask = (
+                has_today
+                & (panel.row_ptr[date_pos] >= self.params['ma_period'] + 1)
+                & ~np.isnan(current_ma)
+                & ~np.isnan(prev_ma)
+                & (prev_close < prev_ma)
+                & (current_close > current_ma)
+            )
+        
+        signal_info = {
+            'current_close': current_close,
+            'current_ma': current_ma,
+            'prev_close': prev_close,
+            'prev_ma': prev_ma,
+            'breakthrough_pct': breakthrough_pct,
+            'close_price': current_close,
+        }
+        return signal_mask, breakthrough_pct, signal_info
+    
     def check_sell_signal(
         self,
         position: Position,
@@ -120,12 +178,10 @@ class MAStrategyTimeBased(BaseStrategy):
             
             # 获取收盘价序列
             close_prices = stock_data['close']
-            ma_series = close_prices.rolling(window=ma_period).mean()
             
             current_close = close_prices.iloc[-1]
             prev_close = close_prices.iloc[-2]
-            current_ma = ma_series.iloc[-1]
-            prev_ma = ma_series.iloc[-2]
+            current_ma, prev_ma = self._last_two_ma(position.stock_code, stock_data, close_prices)
             
             # 1. 检查动态止盈止损
             should_stop, stop_reason = self.check_dynamic_stop_loss(position, current_close)
@@ -90,9 +90,12 @@ class ValueStrategyTimeBased(BaseStrategy):
             if pb_mrq is None or pb_mrq <= 0 or pb_mrq >= self.params['max_pb_mrq']:
                 return False, 0, {'reason': f'PB不满足: {pb_mrq}'}
             
-            # 计算均线
-            close_prices = stock_data['close']
-            ma_value = close_prices.rolling(window=ma_period).mean().iloc[-1]
+            # 计算均线（优先读取指标缓存）
+            ma_value = self._indicator_on_last_row(stock_code, stock_data, 'rolling_mean',
+                                                   field='close', window=ma_period)
+            if ma_value is None:
+                close_prices = stock_data['close']
+                ma_value = close_prices.rolling(window=ma_period).mean().iloc[-1]
             
             if pd.isna(ma_value) or ma_value <= 0:
                 return False, 0, {'reason': '均线无效'}
@@ -119,6 +122,50 @@ class ValueStrategyTimeBased(BaseStrategy):
         except Exception as e:
             return False, 0, {'error': str(e)}
     
+    def prepare_bulk_signals(self, panel):
+        """预计算整个日期范围的收盘价均线"""
+        super().prepare_bulk_signals(panel)
+        self._register_bulk_indicator('ma', 'rolling_mean', field='close', window=self.params['ma_period'])
+    
+    def check_buy_signals_bulk(self, panel, date_pos):
+        """
+        全市场横截面买入信号（与 check_buy_signal 条件一致）
+        """
+        self._ensure_bulk_prepared(panel)
+        
+        rows = panel.rows_on(date_pos)
+        has_today = rows >= 0
+        rows = np.where(has_today, rows, 0)
+        
+        today = panel.values[rows]
+        fi = panel.field_index
+        low = today[:, fi['low']]
+        close = today[:, fi['close']]
+        pe_ttm = today[:, fi['peTTM']]
+        pb_mrq = today[:, fi['pbMRQ']]
+        ma_value = self._bulk_array('ma')[rows]
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            deviation = (low - ma_value) / ma_value
+            signal_mask = (
+                has_today
+                & (panel.row_ptr[date_pos] >= self.params['ma_period'])
+                & ~((pe_ttm <= 0) | (pe_ttm >= self.params['max_pe_ttm']))
+                & ~((pb_mrq <= 0) | (pb_mrq >= self.params['max_pb_mrq']))
+                & (ma_value > 0)
+                & (deviation <= self.params['buy_threshold'])
+            )
+        
+        signal_info = {
+            'low_price': low,
+            'ma_value': ma_value,
+            'deviation': deviation,
+            'pe_ttm': pe_ttm,
+            'pb_mrq': pb_mrq,
+            'close_price': close,
+        }
+        return signal_mask, np.abs(deviation), signal_info
+    
     def check_sell_signal(
         self,
         position: Position,
@@ -150,7 +197,10 @@ class ValueStrategyTimeBased(BaseStrategy):
             ma_period = self.params['ma_period']
             close_prices = stock_data['close']
             if len(close_prices) >= ma_period:
-                ma_value = close_prices.rolling(window=ma_period).mean().iloc[-1]
+                ma_value = self._indicator_on_last_row(position.stock_code, stock_data, 'rolling_mean',
+                                                       field='close', window=ma_period)
+                if ma_value is None:
+                    ma_value = close_prices.rolling(window=ma_period).mean().iloc[-1]
                 if not pd.isna(ma_value) and ma_value > 0:
                     high_price = today_data['high']
                     if high_price >= ma_value * (1 + self.params['sell_threshold_up']):
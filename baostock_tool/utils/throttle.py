@@ -0,0 +1,105 @@
+# utils/throttle.py
+"""
+数据接口限流与重试工具
+
+RateLimiter      令牌桶限流（线程安全），替代请求之间固定的 time.sleep
+backoff_delay    带随机抖动的指数退避时长（full jitter），多个进程同时失败时不会同时重试
+retry_call       按退避时长重试调用
+
+使用方式：
+    limiter = RateLimiter(rate=5)          # 每秒最多 5 次请求
+    limiter.acquire()
+    rs = retry_call(bs.query_history_k_data_plus, code=..., retries=3)
+"""
+
+import random
+import threading
+import time
+
+
+class RateLimiter:
+    """令牌桶限流器"""
+
+    def __init__(self, rate, burst=None):
+        """
+        Args:
+            rate (float): 每秒允许的请求数，<= 0 表示不限流
+            burst (int, optional): 桶容量（允许的瞬时突发请求数），默认等于 max(1, rate)
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, self.rate))
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        获取令牌，不足时阻塞等待
+
+        Returns:
+            float: 本次等待的秒数
+        """
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=60.0):
+    """
+    第 attempt 次重试前的等待时长（指数退避 + 全抖动）
+
+    Args:
+        attempt (int): 重试序号，从 0 开始
+        base_delay (float): 首次退避上限（秒）
+        max_delay (float): 退避上限（秒）
+
+    Returns:
+        float: 等待秒数，取值范围 [0, min(max_delay, base_delay * 2 ** attempt)]
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def retry_call(func, *args, retries=3, base_delay=1.0, max_delay=60.0,
+               should_retry=None, on_retry=None, **kwargs):
+    """
+    调用 func，抛出异常或 should_retry(结果) 为 True 时按抖动退避重试
+
+    Args:
+        func: 被调用的函数
+        retries (int): 最大重试次数（不含首次调用）
+        base_delay (float): 首次退避上限（秒）
+        max_delay (float): 退避上限（秒）
+        should_retry (callable, optional): 根据返回值判断是否需要重试
+        on_retry (callable, optional): 每次重试前回调 on_retry(attempt, error_or_result, delay)
+
+    Returns:
+        最后一次调用的返回值（重试用尽且最后一次抛出异常时重新抛出）
+    """
+    attempt = 0
+    while True:
+        try:
+            result = func(*args, **kwargs)
+            if should_retry is None or not should_retry(result) or attempt >= retries:
+                return result
+            reason = result
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            reason = e
+
+        delay = backoff_delay(attempt, base_delay, max_delay)
+        if on_retry is not None:
+            on_retry(attempt, reason, delay)
+        time.sleep(delay)
+        attempt += 1
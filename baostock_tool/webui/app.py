@@ -530,142 +530,33 @@ def kronos_predict():
         # 确定市场
         market = determine_market_by_code(stock_code)
 
-        # 从数据库获取历史数据
-        db_config = config.get_db_config()
-        from sqlalchemy import create_engine, text
-        from sqlalchemy.engine import URL
-
-        db_url = URL.create(
-            drivername="mysql+pymysql",
-            username=db_config["user"],
-            password=db_config["password"],
-            host=db_config["host"],
-            port=db_config["port"],
-            database=db_config["database"],
-            query={"charset": "utf8mb4"}
+        # 常驻模型 + 预测缓存：同一只股票在没有新 K 线时重复请求直接返回缓存结果
+        from baostock_tool.kronos_master.prediction_server import get_prediction_server
+
+        payload = get_prediction_server().predict(
+            market, stock_code,
+            lookback_days=lookback_days,
+            pred_len=pred_days,
+            temperature=temperature,
+            top_p=top_p / 10.0,  # 转换为0.1-1.0范围
+            sample_count=sample_count,
+            fallback=lambda historical, n: generate_mock_prediction(historical, n, stock_code, market)
         )
-
-        engine = create_engine(db_url, pool_pre_ping=True, pool_recycle=3600)
-
-        # 查询最新日期
-        max_date_query = f"""
-        SELECT MAX(date) as max_date FROM stock_daily_data
-        WHERE code_int = {int(stock_code)} AND market = '{market}' AND frequency = 'd'
-        """
-        max_date_result = pd.read_sql(max_date_query, engine)
-        if max_date_result.empty or max_date_result['max_date'].iloc[0] is None:
+        if payload is None:
             return jsonify({'success': False, 'error': '未找到该股票的历史数据'})
 
-        max_date = max_date_result['max_date'].iloc[0]
-        start_date = (max_date - timedelta(days=lookback_days * 1.5)).strftime('%Y-%m-%d')
-        end_date = max_date.strftime('%Y-%m-%d')
-
-        # 查询历史K线数据
-        hist_query = f"""
-        SELECT date, open, high, low, close, volume, amount, pctChg
-        FROM stock_daily_data
-        WHERE market = '{market}'
-          AND code_int = {int(stock_code)}
-          AND frequency = 'd'
-          AND date >= '{start_date}'
-          AND date <= '{end_date}'
-        ORDER BY date DESC
-        LIMIT {lookback_days}
-        """
-        hist_df = pd.read_sql(hist_query, engine)
-        hist_df = hist_df.sort_values('date').reset_index(drop=True)
-
-        if hist_df.empty:
-            return jsonify({'success': False, 'error': '未找到足够的历史数据'})
-
-        # 构建历史K线数据
-        historical_data = []
-        for _, row in hist_df.iterrows():
-            historical_data.append({
-                'date': row['date'].strftime('%Y-%m-%d') if isinstance(row['date'], datetime) else str(row['date']),
-                'open': float(row['open']) if pd.notna(row['open']) else 0,
-                'high': float(row['high']) if pd.notna(row['high']) else 0,
-                'low': float(row['low']) if pd.notna(row['low']) else 0,
-                'close': float(row['close']) if pd.notna(row['close']) else 0,
-                'volume': int(row['volume']) if pd.notna(row['volume']) else 0,
-                'amount': float(row['amount']) if pd.notna(row['amount']) else 0,
-                'pctChg': float(row['pctChg']) if pd.notna(row['pctChg']) else 0,
-                'isPrediction': False
-            })
-
-        # 获取股票名称
-        name_query = f"""
-        SELECT name FROM stock_basic_info
-        WHERE code_int = {int(stock_code)} AND market = '{market}'
-        LIMIT 1
-        """
-        name_df = pd.read_sql(name_query, engine)
-        stock_name = name_df['name'].iloc[0] if not name_df.empty else 'Unknown'
-
-        # 调用Kronos模型进行预测
-        try:
-            from baostock_tool.kronos_master.kronos_service import KronosPredictorService, KronosConfig
-
-            kronos_config = KronosConfig(
-                lookback=lookback_days,
-                pred_len=pred_days,
-                temperature=temperature,
-                top_p=top_p / 10.0,  # 转换为0.1-1.0范围
-                sample_count=sample_count,
-                device='cpu'
-            )
-            service = KronosPredictorService(kronos_config)
-            result = service.predict(f"{market}.{stock_code}", output_dir=None, save_csv=False, save_chart=False)
-
-            # 构建预测K线数据
-            prediction_data = []
-            for _, row in result.prediction_df.iterrows():
-                date_val = row['date']
-                if isinstance(date_val, datetime):
-                    date_str = date_val.strftime('%Y-%m-%d')
-                elif hasattr(date_val, 'strftime'):
-                    date_str = date_val.strftime('%Y-%m-%d')
-                else:
-                    date_str = str(date_val)
-                prediction_data.append({
-                    'date': date_str,
-                    'open': float(row['open']) if pd.notna(row['open']) else 0,
-                    'high': float(row['high']) if pd.notna(row['high']) else 0,
-                    'low': float(row['low']) if pd.notna(row['low']) else 0,
-                    'close': float(row['close']) if pd.notna(row['close']) else 0,
-                    'volume': int(row['volume']) if pd.notna(row['volume']) else 0,
-                    'amount': float(row['amount']) if pd.notna(row['amount']) else 0,
-                    'pctChg': 0,
-                    'isPrediction': True
-                })
-
-            last_close = result.last_close
-            pred_change_pct = result.predicted_change_pct
-
-        except ImportError as ie:
-            # 如果Kronos模块未安装，生成模拟预测数据
-            print(f"Kronos模块未安装: {ie}")
-            prediction_data = generate_mock_prediction(historical_data, pred_days, stock_code, market)
-            last_close = historical_data[-1]['close'] if historical_data else 0
-            pred_change_pct = 0
-        except Exception as e:
-            print(f"预测出错: {e}")
-            traceback.print_exc()
-            prediction_data = generate_mock_prediction(historical_data, pred_days, stock_code, market)
-            last_close = historical_data[-1]['close'] if historical_data else 0
-            pred_change_pct = 0
-
         return jsonify({
             'success': True,
             'data': {
                 'stock_code': stock_code,
-                'stock_name': stock_name,
+                'stock_name': payload['stock_name'],
                 'market': market,
-                'historical': historical_data,
-                'prediction': prediction_data,
-                'last_close': last_close,
-                'pred_change_pct': pred_change_pct,
-                'pred_days': pred_days
+                'historical': payload['historical'],
+                'prediction': payload['prediction'],
+                'last_close': payload['last_close'],
+                'pred_change_pct': payload['pred_change_pct'],
+                'pred_days': pred_days,
+                'cached': payload['cached']
             }
         })
 
@@ -24,6 +24,7 @@ from baostock_tool.database_schema.strategy_trigger_db import StrategyTriggerDB
 from baostock_tool.utils.trigger_points_reader import TriggerPointsReader
 from baostock_tool.webui.app import determine_market_by_code
 from baostock_tool import config
+from baostock_tool.utils.data_loader.kline_cache import get_kline_cache
 
 # 配置静态文件和模板路径
 app = Flask(__name__,
@@ -63,67 +64,34 @@ load_all_stock_codes()
 
 def get_kline_data_optimized(stock_code, market, buy_date, sell_date=None):
     """
-    从数据库获取股票K线数据（优化版本）
+    获取股票K线数据（按股票缓存完整序列，窗口二分切片）
     参数:
         stock_code: 证券代码
         market: 市场（sh/sz/bj）
         buy_date: 买入日期
         sell_date: 卖出日期（可选）
+    返回:
+        (K线字典列表, ETag, Last-Modified)
     """
-    try:
-        # 计算查询时间范围
-        buy_dt = datetime.strptime(buy_date, "%Y-%m-%d")
-
-        if sell_date:
-            sell_dt = datetime.strptime(sell_date, "%Y-%m-%d")
-            query_start_date = (buy_dt - timedelta(days=42)).strftime("%Y-%m-%d")
-            query_end_date = (sell_dt + timedelta(days=42)).strftime("%Y-%m-%d")
-        else:
-            query_start_date = (buy_dt - timedelta(days=60)).strftime("%Y-%m-%d")
-            query_end_date = (buy_dt + timedelta(days=60)).strftime("%Y-%m-%d")
-
-        # 优化查询：使用索引提示，只查询必要字段
-        # idx_market_code_date 索引覆盖 (market, code_int, date)，配合分区裁剪
-        query = f"""
-        SELECT date, open, high, low, close, volume, amount, pctChg
-        FROM stock_daily_data USE INDEX (idx_market_code_date)
-        WHERE market = '{market}'
-          AND code_int = {int(stock_code)}
-          AND frequency = 'd'
-          AND date >= '{query_start_date}'
-          AND date <= '{query_end_date}'
-        ORDER BY date
-        """
-
-        # 使用原生连接执行查询，避免pandas开销
-        with db_manager.engine.connect() as conn:
-            df = pd.read_sql(query, conn)
-
-        if df.empty:
-            return []
-
-        # 优化数据处理：使用向量化操作替代循环
-        df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
-        df = df.fillna(0)
-
-        # 直接转换为字典列表，避免逐行迭代
-        result = df.to_dict('records')
-
-        # 转换数值类型
-        for item in result:
-            item['open'] = float(item['open'])
-            item['high'] = float(item['high'])
-            item['low'] = float(item['low'])
-            item['close'] = float(item['close'])
-            item['volume'] = int(item['volume'])
-            item['amount'] = float(item['amount'])
-            item['pctChg'] = float(item['pctChg'])
-
-        return result
-
-    except Exception as e:
-        print(f"查询K线数据失败: {str(e)}")
-        return []
+    # 计算查询时间范围
+    buy_dt = datetime.strptime(buy_date, "%Y-%m-%d")
+
+    if sell_date:
+        sell_dt = datetime.strptime(sell_date, "%Y-%m-%d")
+        query_start_date = (buy_dt - timedelta(days=42)).strftime("%Y-%m-%d")
+        query_end_date = (sell_dt + timedelta(days=42)).strftime("%Y-%m-%d")
+    else:
+        query_start_date = (buy_dt - timedelta(days=60)).strftime("%Y-%m-%d")
+        query_end_date = (buy_dt + timedelta(days=60)).strftime("%Y-%m-%d")
+
+    # 同一只股票第一次请求时加载全部日线，之后各窗口直接从内存切片
+    web_config = config.get_web_config()
+    cache = get_kline_cache(
+        db_manager.engine,
+        max_stocks=web_config['kline_cache_size'],
+        ttl=web_config['kline_cache_ttl']
+    )
+    return cache.get_window(market, int(stock_code), query_start_date, query_end_date)
 
 
 @app.route('/')
@@ -440,18 +408,26 @@ def get_kline_data():
 
         stock_code = str(stock_code).zfill(6)
 
-        # 使用优化后的查询函数，复用数据库连接
-        kline_data = get_kline_data_optimized(
-            stock_code=stock_code,
-            market=market,
-            buy_date=buy_date,
-            sell_date=sell_date
-        )
+        try:
+            kline_data, etag, last_modified = get_kline_data_optimized(
+                stock_code=stock_code,
+                market=market,
+                buy_date=buy_date,
+                sell_date=sell_date
+            )
+        except Exception as e:
+            print(f"查询K线数据失败: {str(e)}")
+            return jsonify({'success': True, 'data': []})
 
-        return jsonify({
+        # 浏览器带 If-None-Match / If-Modified-Since 且数据未变化时返回 304
+        response = jsonify({
             'success': True,
             'data': kline_data
         })
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -847,125 +823,33 @@ def kronos_predict():
         # 确定市场
         market = determine_market_by_code(stock_code)
 
-        # 查询最新日期
-        max_date_query = f"""
-        SELECT MAX(date) as max_date FROM stock_daily_data
-        WHERE code_int = {int(stock_code)} AND market = '{market}' AND frequency = 'd'
-        """
-        max_date_result = pd.read_sql(max_date_query, db_manager.engine)
-        if max_date_result.empty or max_date_result['max_date'].iloc[0] is None:
+        # 常驻模型 + 预测缓存：同一只股票在没有新 K 线时重复请求直接返回缓存结果
+        from baostock_tool.kronos_master.prediction_server import get_prediction_server
+
+        payload = get_prediction_server().predict(
+            market, stock_code,
+            lookback_days=lookback_days,
+            pred_len=pred_days,
+            temperature=temperature,
+            top_p=top_p / 10.0,  # 转换为0.1-1.0范围
+            sample_count=sample_count,
+            fallback=lambda historical, n: generate_mock_prediction(historical, n, stock_code, market)
+        )
+        if payload is None:
             return jsonify({'success': False, 'error': '未找到该股票的历史数据'})
 
-        max_date = max_date_result['max_date'].iloc[0]
-        start_date = (max_date - timedelta(days=lookback_days * 1.5)).strftime('%Y-%m-%d')
-        end_date = max_date.strftime('%Y-%m-%d')
-
-        # 查询历史K线数据
-        hist_query = f"""
-        SELECT date, open, high, low, close, volume, amount, pctChg
-        FROM stock_daily_data
-        WHERE market = '{market}'
-          AND code_int = {int(stock_code)}
-          AND frequency = 'd'
-          AND date >= '{start_date}'
-          AND date <= '{end_date}'
-        ORDER BY date DESC
-        LIMIT {lookback_days}
-        """
-        hist_df = pd.read_sql(hist_query, db_manager.engine)
-        hist_df = hist_df.sort_values('date').reset_index(drop=True)
-
-        if hist_df.empty:
-            return jsonify({'success': False, 'error': '未找到足够的历史数据'})
-
-        # 构建历史K线数据
-        historical_data = []
-        for _, row in hist_df.iterrows():
-            historical_data.append({
-                'date': row['date'].strftime('%Y-%m-%d') if isinstance(row['date'], datetime) else str(row['date']),
-                'open': float(row['open']) if pd.notna(row['open']) else 0,
-                'high': float(row['high']) if pd.notna(row['high']) else 0,
-                'low': float(row['low']) if pd.notna(row['low']) else 0,
-                'close': float(row['close']) if pd.notna(row['close']) else 0,
-                'volume': int(row['volume']) if pd.notna(row['volume']) else 0,
-                'amount': float(row['amount']) if pd.notna(row['amount']) else 0,
-                'pctChg': float(row['pctChg']) if pd.notna(row['pctChg']) else 0,
-                'isPrediction': False
-            })
-
-        # 获取股票名称
-        name_query = f"""
-        SELECT name FROM stock_basic_info
-        WHERE code_int = {int(stock_code)} AND market = '{market}'
-        LIMIT 1
-        """
-        name_df = pd.read_sql(name_query, db_manager.engine)
-        stock_name = name_df['name'].iloc[0] if not name_df.empty else 'Unknown'
-
-        # 调用Kronos模型进行预测
-        try:
-            from baostock_tool.kronos_master.kronos_service import KronosPredictorService, KronosConfig
-
-            kronos_config = KronosConfig(
-                lookback=lookback_days,
-                pred_len=pred_days,
-                temperature=temperature,
-                top_p=top_p / 10.0,  # 转换为0.1-1.0范围
-                sample_count=sample_count,
-                device='cpu'
-            )
-            service = KronosPredictorService(kronos_config)
-            result = service.predict(f"{market}.{stock_code}", output_dir=None, save_csv=False, save_chart=False)
-
-            # 构建预测K线数据
-            prediction_data = []
-            for _, row in result.prediction_df.iterrows():
-                date_val = row['date']
-                if isinstance(date_val, datetime):
-                    date_str = date_val.strftime('%Y-%m-%d')
-                elif hasattr(date_val, 'strftime'):
-                    date_str = date_val.strftime('%Y-%m-%d')
-                else:
-                    date_str = str(date_val)
-                prediction_data.append({
-                    'date': date_str,
-                    'open': float(row['open']) if pd.notna(row['open']) else 0,
-                    'high': float(row['high']) if pd.notna(row['high']) else 0,
-                    'low': float(row['low']) if pd.notna(row['low']) else 0,
-                    'close': float(row['close']) if pd.notna(row['close']) else 0,
-                    'volume': int(row['volume']) if pd.notna(row['volume']) else 0,
-                    'amount': float(row['amount']) if pd.notna(row['amount']) else 0,
-                    'pctChg': 0,
-                    'isPrediction': True
-                })
-
-            last_close = result.last_close
-            pred_change_pct = result.predicted_change_pct
-
-        except ImportError as ie:
-            # 如果Kronos模块未安装，生成模拟预测数据
-            print(f"Kronos模块未安装: {ie}")
-            prediction_data = generate_mock_prediction(historical_data, pred_days, stock_code, market)
-            last_close = historical_data[-1]['close'] if historical_data else 0
-            pred_change_pct = 0
-        except Exception as e:
-            print(f"预测出错: {e}")
-            traceback.print_exc()
-            prediction_data = generate_mock_prediction(historical_data, pred_days, stock_code, market)
-            last_close = historical_data[-1]['close'] if historical_data else 0
-            pred_change_pct = 0
-
         return jsonify({
             'success': True,
             'data': {
                 'stock_code': stock_code,
-                'stock_name': stock_name,
+                'stock_name': payload['stock_name'],
                 'market': market,
-                'historical': historical_data,
-                'prediction': prediction_data,
-                'last_close': last_close,
-                'pred_change_pct': pred_change_pct,
-                'pred_days': pred_days
+                'historical': payload['historical'],
+                'prediction': payload['prediction'],
+                'last_close': payload['last_close'],
+                'pred_change_pct': payload['pred_change_pct'],
+                'pred_days': pred_days,
+                'cached': payload['cached']
             }
         })
 
@@ -6,6 +6,7 @@ from sqlalchemy import create_engine
 import time
 from datetime import datetime, timedelta
 import logging
+from baostock_tool.utils.throttle import RateLimiter, backoff_delay
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,6 +22,13 @@ DB_CONFIG = {
     'charset': 'utf8mb4'
 }
 
+# 请求限流：每秒最多请求次数（替代每次请求后固定 sleep）
+REQUEST_RATE = 10
+# 剩余查询次数低于该值时暂停，按抖动退避轮询直到额度恢复
+QUOTA_LOW_WATERMARK = 100
+QUOTA_BASE_DELAY = 30
+QUOTA_MAX_DELAY = 600
+
 # 认证
 auth('13877907589', 'aA*963.-+')
 
@@ -35,8 +43,30 @@ class StockDataToMySQL:
         self.db_config = db_config
         self.engine = None
         self.connection = None
+        self.rate_limiter = RateLimiter(REQUEST_RATE)
         self.connect_db()
 
+    @staticmethod
+    def get_remaining_queries():
+        """剩余查询次数（get_query_count 可能返回字典或整数）"""
+        remaining_queries = get_query_count()
+        if isinstance(remaining_queries, dict):
+            return remaining_queries.get('spare', 0)
+        return remaining_queries
+
+    def wait_for_quota(self):
+        """剩余查询次数不足时按指数退避（带随机抖动）等待，直到额度恢复"""
+        attempt = 0
+        while True:
+            remaining_queries = self.get_remaining_queries()
+            logger.info(f"剩余查询次数: {remaining_queries}")
+            if remaining_queries >= QUOTA_LOW_WATERMARK:
+                return
+            delay = backoff_delay(attempt, QUOTA_BASE_DELAY, QUOTA_MAX_DELAY)
+            logger.warning(f"查询次数不足，{delay:.0f} 秒后重新检查")
+            time.sleep(delay)
+            attempt += 1
+
     def connect_db(self):
         """建立数据库连接"""
         try:
@@ -231,6 +261,8 @@ class StockDataToMySQL:
                             successful_codes += 1
                             continue
 
+                    # 避免请求频率过高
+                    self.rate_limiter.acquire()
                     daily_data = self.get_stock_daily_data(code, actual_start_date, end_date)
                     if daily_data is not None and not daily_data.empty:
                         batch_data.append(daily_data)
@@ -240,9 +272,6 @@ class StockDataToMySQL:
                         failed_codes += 1
                         logger.warning(f"股票 {code} 无数据或获取失败")
 
-                    # 避免请求频率过高
-                    time.sleep(0.1)
-
                 except Exception as e:
                     logger.warning(f"处理股票 {code} 时出错: {e}")
                     failed_codes += 1
@@ -265,21 +294,9 @@ class StockDataToMySQL:
                 except Exception as e:
                     logger.error(f"保存批次数据失败: {e}")
 
-            # 查询计数检查（修复后的版本）
+            # 查询计数检查
             if (i + batch_size) % 200 == 0:
-                remaining_queries = get_query_count()
-                logger.info(f"剩余查询次数: {remaining_queries}")
-
-                # 修复：比较剩余查询次数而不是字典
-                if isinstance(remaining_queries, dict) and 'spare' in remaining_queries:
-                    if remaining_queries['spare'] < 100:
-                        logger.warning("查询次数不足，暂停10分钟")
-                        time.sleep(600)
-                else:
-                    # 如果返回的不是字典，直接使用
-                    if remaining_queries < 100:
-                        logger.warning("查询次数不足，暂停10分钟")
-                        time.sleep(600)
+                self.wait_for_quota()
 
         logger.info(f"日线数据获取完成！成功: {successful_codes}, 失败: {failed_codes}")
 